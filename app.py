@@ -5,6 +5,7 @@ Application web pour l'analyse de données et la prédiction avec IA gratuite
 
 import streamlit as st
 from config import APP_TITLE, APP_ICON
+from utils.cleaning_plan import CleaningPlan
 
 # Initialize session state for API key
 if "google_api_key" not in st.session_state:
@@ -44,6 +45,9 @@ if "authenticated" not in st.session_state:
     st.session_state.user_email = None
     st.session_state.df = None
     st.session_state.df_path = None
+    st.session_state.df_stream = None
+    st.session_state.cleaning_plan = CleaningPlan()
+    st.session_state.history = None
     st.session_state.show_upload = False
 
 # ============== CONTENU PRINCIPAL ==============
@@ -80,6 +84,9 @@ else:
                 st.session_state.authenticated = False
                 st.session_state.user_email = None
                 st.session_state.df = None
+                st.session_state.df_stream = None
+                st.session_state.cleaning_plan = CleaningPlan()
+                st.session_state.history = None
                 st.rerun()
     
     st.divider()
@@ -131,6 +138,9 @@ else:
         with col_center:
             if st.button("📤 Importer nouveau fichier", width='stretch'):
                 st.session_state.df = None
+                st.session_state.df_stream = None
+                st.session_state.cleaning_plan = CleaningPlan()
+                st.session_state.history = None
                 st.rerun()
 
 # Pied de page
@@ -0,0 +1,77 @@
+"""
+Benchmark du profilage parallèle: courbe d'accélération selon le nombre de workers
+
+La passe d'empreintes des doublons, toujours en série, est mesurée à part:
+pendant les mesures du profil, son détecteur est déjà en cache, si bien que
+l'accélération ne porte que sur le bloc numérique parallélisé.
+
+Usage:
+    python benchmarks/bench_parallel_profile.py [--rows 2000000] [--cols 32] [--workers 1 2 4 8 16]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.duplicates import DuplicateDetector, get_detector  # noqa: E402
+from utils.profiler import build_profile  # noqa: E402
+
+
+def make_frame(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    """Tableau numérique synthétique avec ~1% de valeurs manquantes"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(rows, cols))
+    values[rng.random(size=values.shape) < 0.01] = np.nan
+    return pd.DataFrame(values, columns=[f"x{i}" for i in range(cols)])
+
+
+def time_duplicates(df: pd.DataFrame, repeat: int) -> float:
+    """Meilleur temps de la passe d'empreintes des doublons (sans cache)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        DuplicateDetector.from_frame(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_profile(df: pd.DataFrame, workers: int, repeat: int) -> float:
+    """Meilleur temps sur `repeat` essais, détecteur de doublons en cache (le premier appel démarre le pool)"""
+    build_profile(df, workers=workers)
+    get_detector(df)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build_profile(df, workers=workers)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--cols", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.cols)
+    print(f"{args.rows:,} lignes x {args.cols} colonnes, {os.cpu_count()} cœurs disponibles")
+    print(f"Passe des doublons (série, hors mesures ci-dessous): {time_duplicates(df, args.repeat):.3f} s")
+    print(f"{'workers':>8} {'temps (s)':>10} {'accélération':>13}")
+
+    baseline = None
+    for workers in args.workers:
+        elapsed = time_profile(df, workers, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.3f} {baseline / elapsed:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
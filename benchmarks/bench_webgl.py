@@ -0,0 +1,137 @@
+"""
+Benchmark du rendu des nuages de points et des courbes: SVG, WebGL, politique de l'application
+
+Mesure, pour chaque taille, le temps de construction de la figure (px.scatter /
+px.line + sérialisation JSON) et la taille du JSON envoyé au navigateur.
+
+Avec --render, mesure aussi le temps de tracé par Plotly.js dans un Chromium
+headless: celui fourni par Kaleido 0.2.x (pip install kaleido==0.2.1), sans
+navigateur à installer. Le temps d'export d'une figure vide est soustrait.
+Ce Chromium n'a pas de GPU: WebGL y passe par SwiftShader (rendu logiciel),
+ce qui surestime le coût fixe de WebGL par rapport à un poste équipé d'un GPU.
+Les seuils WEBGL_THRESHOLD et WEBGL_LINE_THRESHOLD (config.py) viennent de
+ces mesures.
+
+Avec --html, chaque figure est aussi écrite dans un fichier HTML qui affiche
+(titre de l'onglet et console) le temps écoulé jusqu'à la fin du tracé, à
+ouvrir dans un navigateur ordinaire pour compléter la comparaison.
+
+Usage:
+    python benchmarks/bench_webgl.py [--rows 1000 20000 200000 1000000] [--render] [--html DIR]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.express as px
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.downsampling import downsample_scatter, downsample_line  # noqa: E402
+from utils.render_policy import render_mode  # noqa: E402
+
+try:
+    from kaleido.scopes.plotly import PlotlyScope
+except ImportError:
+    PlotlyScope = None
+
+# Temps entre le début du chargement de la page et la fin de Plotly.newPlot
+_RENDER_TIMER = (
+    "var ms = performance.now().toFixed(0);"
+    "document.title = 'rendu: ' + ms + ' ms'; console.log('rendu Plotly', ms, 'ms');"
+)
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Deux variables corrélées (x trié pour les courbes)"""
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=rows)
+    return pd.DataFrame({"t": np.arange(rows), "x": x, "y": 0.6 * x + rng.normal(size=rows)})
+
+
+def build(df: pd.DataFrame, kind: str, mode: str):
+    """Figure "scatter" ou "line" d'une des trois variantes: "svg", "webgl" ou "politique" (échantillon + mode auto)"""
+    if kind == "scatter":
+        if mode == "politique":
+            df, _ = downsample_scatter(df, "x", "y")
+            mode = render_mode(len(df))
+        return px.scatter(df, x="x", y="y", render_mode=mode)
+    if mode == "politique":
+        df, _ = downsample_line(df, "t", "y")
+        mode = render_mode(len(df), "line")
+    return px.line(df, x="t", y="y", render_mode=mode)
+
+
+def time_build(df: pd.DataFrame, kind: str, mode: str, repeat: int):
+    """Meilleur temps de construction + sérialisation, figure, taille du JSON et type de trace"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build(df, kind, mode)
+        payload = fig.to_json()
+        timings.append(time.perf_counter() - start)
+    return min(timings), fig, len(payload), fig.data[0].type
+
+
+class HeadlessRenderer:
+    """Tracé Plotly.js dans le Chromium headless de Kaleido (export PNG, coût d'une figure vide déduit)"""
+
+    def __init__(self, width: int = 700, height: int = 500):
+        plotlyjs = Path(plotly.__file__).parent / "package_data" / "plotly.min.js"
+        self.scope = PlotlyScope(plotlyjs=str(plotlyjs))
+        self.size = dict(width=width, height=height)
+        self.baseline = 0.0
+        self.baseline = self.time(px.scatter(x=[0], y=[0]), repeat=5)
+
+    def time(self, fig, repeat: int = 3) -> float:
+        """Meilleur temps de tracé (s) sur `repeat` essais, après un premier tracé de chauffe"""
+        self.scope.transform(fig, format="png", **self.size)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.scope.transform(fig, format="png", **self.size)
+            timings.append(time.perf_counter() - start)
+        return max(0.0, min(timings) - self.baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 20_000, 200_000, 1_000_000])
+    parser.add_argument("--kinds", nargs="+", choices=["scatter", "line"], default=["scatter", "line"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--render", action="store_true", help="mesurer le tracé dans le Chromium headless de Kaleido")
+    parser.add_argument("--html", type=Path, help="dossier où écrire les figures HTML (rendu à mesurer dans un navigateur)")
+    args = parser.parse_args()
+
+    renderer = None
+    if args.render:
+        if PlotlyScope is None:
+            sys.exit("--render demande Kaleido 0.2.x (pip install kaleido==0.2.1)")
+        renderer = HeadlessRenderer()
+        print(f"Tracé mesuré dans Chromium headless (WebGL logiciel), {os.cpu_count()} cœurs")
+    else:
+        print("Temps de rendu navigateur non mesuré (voir --render et --html)")
+
+    print(f"{'graphique':>9} {'lignes':>10} {'variante':>10} {'trace':>10} "
+          f"{'construction (s)':>17} {'JSON (ko)':>10} {'tracé (ms)':>11}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        for kind in args.kinds:
+            for mode in ("svg", "webgl", "politique"):
+                elapsed, fig, size, trace = time_build(df, kind, mode, args.repeat)
+                rendered = f"{renderer.time(fig, args.repeat) * 1000:>11,.0f}" if renderer else f"{'-':>11}"
+                print(f"{kind:>9} {rows:>10,} {mode:>10} {trace:>10} {elapsed:>17.3f} {size / 1024:>10,.0f} {rendered}")
+                if args.html:
+                    args.html.mkdir(parents=True, exist_ok=True)
+                    fig.write_html(
+                        args.html / f"{kind}_{rows}_{mode}.html", include_plotlyjs="cdn", post_script=_RENDER_TIMER
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,19 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from io import BytesIO
-from utils.data_processor import (
-    remove_duplicates, handle_outliers, fill_missing_values, get_column_stats
-)
+from pathlib import Path
 from utils.report_generator import ReportGenerator
+from utils.profiler import get_profile
+from utils.chart_aggregation import histogram_figure, box_figure
+from utils.figure_cache import cached_figure, stats_label
+from utils.duplicates import count_duplicates
+from utils.cleaning_plan import CleaningPlan
+from utils.history import DatasetHistory
+from utils.recipe import export_recipe, load_recipe, check_replayable, replay_recipe
+from utils.imputation import STRATEGIES as FILL_STRATEGIES
+from utils.outliers import METHODS as OUTLIER_METHODS, ACTIONS as OUTLIER_ACTIONS, default_threshold, outlier_report
 from utils.data_exporter import DataExporter
+from config import APPROX_QUANTILES, QUANTILE_SKETCH_EPSILON, IMPUTER_KNN_NEIGHBORS
 
 
 def show_cleaning():
@@ -95,7 +103,20 @@ def show_analysis_tab():
 
     st.subheader("Résumé des Données")
 
+    stream = st.session_state.get("df_stream")
+    if stream is not None:
+        st.info(
+            f"Fichier volumineux: l'analyse porte sur un échantillon de {len(st.session_state.df):,} "
+            f"lignes sur {stream.rows:,}."
+        )
+        if st.button("Charger le jeu de données complet", key="load_full_dataset"):
+            with st.spinner("Chargement complet du fichier..."):
+                st.session_state.df = stream.load_full()
+            st.session_state.df_stream = None
+            st.rerun()
+
     df = st.session_state.df
+    profile = get_profile(df)
 
     # Métriques principales
     col1, col2, col3, col4 = st.columns(4)
@@ -107,10 +128,10 @@ def show_analysis_tab():
         st.metric("Colonnes", len(df.columns))
 
     with col3:
-        st.metric("Doublons", df.duplicated().sum())
+        st.metric("Doublons", profile.duplicates)
 
     with col4:
-        st.metric("Valeurs manquantes", df.isnull().sum().sum())
+        st.metric("Valeurs manquantes", profile.missing_total)
 
     st.divider()
 
@@ -119,12 +140,18 @@ def show_analysis_tab():
 
     # Séparer colonnes numériques et catégoriques
     numeric_cols = df.select_dtypes(include=['number']).columns
-    cat_cols = df.select_dtypes(include=['object']).columns
+    cat_cols = df.select_dtypes(include=['object', 'category']).columns
 
-    # Calculer statistiques détaillées via utilitaire
-    stats = get_column_stats(df)
+    # Statistiques détaillées issues du profil (en cache)
+    stats = profile.column_stats()
     # Convertir en DataFrame facilement
     df_stats = pd.DataFrame.from_dict(stats, orient='index')
+    if 'unique_values' in df_stats:
+        # Nombres de valeurs uniques estimés (HyperLogLog) préfixés de ≈
+        df_stats['unique_values'] = [
+            profile.distinct_label(col) if col in profile.approx_distinct else value
+            for col, value in df_stats['unique_values'].items()
+        ]
     df_stats.index.name = 'Colonne'
     df_stats.reset_index(inplace=True)
     # renommer colonnes pour affichage
@@ -139,26 +166,30 @@ def show_analysis_tab():
         for col in numeric_cols[:5]:  # Limiter à 5 pour lisibilité
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric(f"{col} - Moyenne", f"{df[col].mean():.2f}")
+                st.metric(f"{col} - Moyenne", f"{stats[col]['mean']:.2f}")
             with col2:
-                st.metric(f"{col} - Min", f"{df[col].min():.2f}")
+                st.metric(f"{col} - Min", f"{stats[col]['min']:.2f}")
             with col3:
-                st.metric(f"{col} - Max", f"{df[col].max():.2f}")
+                st.metric(f"{col} - Max", f"{stats[col]['max']:.2f}")
             with col4:
-                st.metric(f"{col} - Médiane", f"{df[col].median():.2f}")
+                st.metric(f"{col} - Médiane", f"{stats[col]['median']:.2f}")
 
         # Boxplot avec Plotly
         st.subheader("Distribution des variables numériques")
-        fig = px.box(df[numeric_cols[:5]], title="Box Plot - Distribution")
+        box_cols = tuple(numeric_cols[:5])
+        fig, _ = cached_figure(df, ("analysis_box", box_cols), lambda: box_figure(
+            df, box_cols, title="Box Plot - Distribution"
+        ))
         st.plotly_chart(fig, use_container_width=True)
 
     if len(cat_cols) > 0:
         st.write("**Colonnes catégoriques :**")
         for col in cat_cols[:3]:  # Limiter à 3
-            st.write(f"**{col}** : {df[col].nunique()} catégories uniques")
+            st.write(f"**{col}** : {profile.distinct_label(col)} catégories uniques")
             # Diagramme en barres pour les catégories
-            value_counts = df[col].value_counts().head(10)
-            fig = px.bar(value_counts, title=f"Distribution de {col}")
+            fig, _ = cached_figure(df, ("analysis_categories", col), lambda col=col: px.bar(
+                df[col].value_counts().head(10), title=f"Distribution de {col}"
+            ))
             st.plotly_chart(fig, use_container_width=True)
     
     # afficher les stats générées précédemment
@@ -174,8 +205,11 @@ def show_analysis_tab():
     if numeric_cols:
         col_to_plot = st.selectbox("Sélectionnez une colonne", numeric_cols, key="analysis_histogram")
 
-        fig = px.histogram(df, x=col_to_plot, nbins=30, title=f"Distribution de {col_to_plot}")
+        fig, _ = cached_figure(df, ("analysis_histogram", col_to_plot), lambda: histogram_figure(
+            df[col_to_plot], title=f"Distribution de {col_to_plot}"
+        ))
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(stats_label())
     else:
         st.info("Aucune colonne numérique trouvée")
 
@@ -220,6 +254,11 @@ def show_cleaning_tab():
 
     df = st.session_state.df
     original_len = len(df)
+    if "cleaning_plan" not in st.session_state:
+        st.session_state.cleaning_plan = CleaningPlan()
+    plan = st.session_state.cleaning_plan
+
+    show_history_controls()
 
     # Compteur avant/après nettoyage
     col1, col2 = st.columns(2)
@@ -234,22 +273,36 @@ def show_cleaning_tab():
     with st.container():
         st.subheader("Supprimer les Doublons")
 
+        opt1, opt2 = st.columns([3, 1])
+        with opt1:
+            dup_subset = st.multiselect(
+                "Colonnes comparées (toutes par défaut)",
+                df.columns.tolist(),
+                key="dup_subset"
+            )
+        with opt2:
+            dup_keep = st.radio(
+                "Occurrence conservée",
+                ["first", "last"],
+                format_func=lambda keep: "Première" if keep == "first" else "Dernière",
+                key="dup_keep"
+            )
+
         col1, col2 = st.columns([3, 1])
 
         with col1:
-            duplicates_count = df.duplicated().sum()
+            # Empreintes de lignes en cache: le comptage ne rehache pas le tableau
+            duplicates_count = count_duplicates(df, subset=dup_subset or None)
             if duplicates_count > 0:
                 st.warning(f"{duplicates_count} doublons détectés dans vos données")
             else:
                 st.success("Aucun doublon détecté")
 
         with col2:
-            if st.button("Supprimer les doublons", use_container_width=True):
+            if st.button("Ajouter au plan", key="plan_add_duplicates", use_container_width=True):
                 if duplicates_count > 0:
-                    df_cleaned, removed_rows = remove_duplicates(df)
-                    st.session_state.df = df_cleaned
-                    st.success(f"{removed_rows} doublons supprimés")
-                    st.rerun()
+                    plan.add("drop_duplicates", subset=dup_subset or None, keep=dup_keep)
+                    st.success("Suppression des doublons ajoutée au plan")
 
     st.divider()
 
@@ -257,7 +310,7 @@ def show_cleaning_tab():
     with st.container():
         st.subheader("Traiter les Valeurs Manquantes")
 
-        missing_total = df.isnull().sum().sum()
+        missing_total = get_profile(df).missing_total
 
         if missing_total > 0:
             st.warning(f"{int(missing_total)} valeurs manquantes détectées")
@@ -267,21 +320,44 @@ def show_cleaning_tab():
             with col1:
                 method = st.selectbox(
                     "Sélectionnez la méthode de traitement",
-                    ["mean", "median", "forward_fill"],
-                    format_func=lambda x: {
-                        "mean": "Moyenne",
-                        "median": "Médiane",
-                        "forward_fill": "Forward Fill"
-                    }[x],
+                    list(FILL_STRATEGIES),
+                    format_func=FILL_STRATEGIES.get,
                     key="fill_method"
                 )
 
+            # Paramètres propres à la méthode
+            fill_params = {}
+            with col2:
+                if method in ("group_mean", "group_median"):
+                    group_cols = [col for col in df.columns if col not in df.select_dtypes(include=['number']).columns]
+                    fill_params["group_by"] = st.selectbox(
+                        "Regrouper par",
+                        group_cols,
+                        key="fill_group_by"
+                    ) if group_cols else None
+                elif method in ("interpolate", "forward_fill"):
+                    fill_params["order_by"] = st.selectbox(
+                        "Ordonner par",
+                        [None] + df.columns.tolist(),
+                        format_func=lambda col: "Ordre des lignes" if col is None else col,
+                        key="fill_order_by"
+                    )
+                elif method == "knn":
+                    fill_params["n_neighbors"] = st.number_input(
+                        "Voisins",
+                        min_value=1,
+                        max_value=50,
+                        value=IMPUTER_KNN_NEIGHBORS,
+                        key="fill_neighbors"
+                    )
+
             with col3:
-                if st.button("Remplir", use_container_width=True):
-                    df_filled = fill_missing_values(st.session_state.df, method=method)
-                    st.session_state.df = df_filled
-                    st.success(f"Valeurs manquantes traitées avec: {method}")
-                    st.rerun()
+                if st.button("Ajouter au plan", key="plan_add_fill", use_container_width=True):
+                    if method in ("group_mean", "group_median") and not fill_params.get("group_by"):
+                        st.error("Aucune colonne qualitative pour regrouper")
+                    else:
+                        plan.add("fill_missing", method=method, **fill_params)
+                        st.success(f"Remplissage ({FILL_STRATEGIES[method]}) ajouté au plan")
         else:
             st.success("Aucune valeur manquante détectée")
 
@@ -304,11 +380,11 @@ def show_cleaning_tab():
 
             with col1:
                 # Boxplot avec Plotly
-                fig = px.box(
+                fig = box_figure(
                     st.session_state.df,
-                    y=col_to_clean,
+                    [col_to_clean],
                     title=f"Distribution - {col_to_clean}",
-                    color_discrete_sequence=["#2563EB"]
+                    color="#2563EB"
                 )
                 fig.update_layout(
                     height=400,
@@ -318,28 +394,90 @@ def show_cleaning_tab():
                 st.plotly_chart(fig, use_container_width=True)
 
             with col2:
-                outliers_stats = st.session_state.df[col_to_clean].describe()
+                approx = st.checkbox(
+                    "Quantiles approchés",
+                    value=APPROX_QUANTILES,
+                    key="approx_quantiles",
+                    help="Quartiles estimés par sketch (erreur de rang ≈ "
+                         f"{QUANTILE_SKETCH_EPSILON:.0%}): recommandé pour les très gros volumes"
+                )
+                outliers_stats = get_profile(st.session_state.df, approximate=approx).numeric.loc[col_to_clean]
+                prefix = "≈ " if approx else ""
                 st.metric("Min", f"{outliers_stats['min']:.2f}")
-                st.metric("Q1", f"{st.session_state.df[col_to_clean].quantile(0.25):.2f}")
-                st.metric("Médiane", f"{outliers_stats['50%']:.2f}")
-                st.metric("Q3", f"{st.session_state.df[col_to_clean].quantile(0.75):.2f}")
+                st.metric("Q1", f"{prefix}{outliers_stats['q25']:.2f}")
+                st.metric("Médiane", f"{prefix}{outliers_stats['median']:.2f}")
+                st.metric("Q3", f"{prefix}{outliers_stats['q75']:.2f}")
                 st.metric("Max", f"{outliers_stats['max']:.2f}")
 
-                if st.button("Supprimer Outliers", use_container_width=True):
-                    df_cleaned = handle_outliers(st.session_state.df, col_to_clean)
-                    rows_removed = len(st.session_state.df) - len(df_cleaned)
-                    st.session_state.df = df_cleaned
-                    st.success(f"{rows_removed} valeurs aberrantes supprimées")
-                    st.rerun()
+            # Traitement groupé: bornes de toutes les colonnes choisies en une passe
+            outlier_cols = st.multiselect(
+                "Colonnes à traiter",
+                numeric_cols,
+                default=[col_to_clean],
+                key="outlier_cols"
+            )
+            opt1, opt2, opt3 = st.columns(3)
+            with opt1:
+                outlier_method = st.selectbox(
+                    "Méthode",
+                    list(OUTLIER_METHODS),
+                    format_func=OUTLIER_METHODS.get,
+                    key="outlier_method"
+                )
+            with opt2:
+                if outlier_method == "percentile":
+                    low, high = default_threshold("percentile")
+                    low, high = st.slider(
+                        "Percentiles conservés", 0.0, 100.0, (low * 100, high * 100), step=0.5,
+                        key="outlier_percentiles"
+                    )
+                    threshold = (low / 100, high / 100)
+                else:
+                    threshold = st.number_input(
+                        "Seuil" if outlier_method != "iqr" else "Facteur IQR",
+                        min_value=0.1,
+                        value=float(default_threshold(outlier_method)),
+                        step=0.5,
+                        key=f"outlier_threshold_{outlier_method}"
+                    )
+            with opt3:
+                outlier_action = st.radio(
+                    "Action",
+                    list(OUTLIER_ACTIONS),
+                    format_func=OUTLIER_ACTIONS.get,
+                    key="outlier_action"
+                )
+
+            if outlier_cols:
+                report = outlier_report(st.session_state.df, outlier_cols, outlier_method, threshold, approx)
+                st.dataframe(report.rename(columns={
+                    "lower": "Borne basse",
+                    "upper": "Borne haute",
+                    "below": "Sous la borne",
+                    "above": "Au-dessus",
+                    "outliers": "Valeurs aberrantes",
+                    "percent": "% des lignes"
+                }).round(2), use_container_width=True)
+
+                if st.button("Ajouter au plan", key="plan_add_outliers", use_container_width=True):
+                    plan.add(f"{outlier_action}_outliers", columns=outlier_cols, method=outlier_method,
+                             threshold=threshold, approximate=approx)
+                    st.success(f"Valeurs aberrantes de {len(outlier_cols)} colonne(s) ajoutées au plan")
         else:
             st.info("Aucune colonne numérique trouvée pour l'analyse des outliers")
 
     st.divider()
 
+    # === PLAN DE NETTOYAGE ===
+    show_cleaning_plan(plan)
+
+    st.divider()
+
     # === RÉSUMÉ APRÈS NETTOYAGE ===
     with st.container():
         st.subheader("Résumé Après Nettoyage")
 
+        profile = get_profile(st.session_state.df)
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
@@ -349,10 +487,10 @@ def show_cleaning_tab():
             st.metric("Colonnes", len(st.session_state.df.columns))
 
         with col3:
-            st.metric("Doublons", st.session_state.df.duplicated().sum())
+            st.metric("Doublons", profile.duplicates)
 
         with col4:
-            st.metric("Valeurs manquantes", st.session_state.df.isnull().sum().sum())
+            st.metric("Valeurs manquantes", profile.missing_total)
 
     st.divider()
 
@@ -392,6 +530,85 @@ def show_cleaning_tab():
             st.error(f"Erreur lors de l'export: {str(e)}")
 
 
+def show_cleaning_plan(plan):
+    """Étapes en attente, aperçu sur échantillon et application du plan en une passe"""
+    st.subheader("Plan de Nettoyage")
+
+    if len(plan) == 0:
+        st.info("Aucune étape en attente: ajoutez des opérations ci-dessus, elles seront appliquées ensemble.")
+        return
+
+    for i, label in enumerate(plan.describe()):
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.write(f"{i + 1}. {label}")
+        with col2:
+            if st.button("Retirer", key=f"plan_remove_{i}", use_container_width=True):
+                plan.remove(i)
+                st.rerun()
+
+    with st.expander("Aperçu sur un échantillon"):
+        preview, report, sample_size = plan.preview(st.session_state.df)
+        st.caption(
+            f"Calculé sur {sample_size:,} lignes: moyennes, quartiles et doublons sont "
+            f"ceux de l'échantillon (ordre de grandeur)."
+        )
+        st.dataframe(pd.DataFrame(report).rename(columns={
+            "step": "Étape",
+            "rows_removed": "Lignes supprimées",
+            "cells_filled": "Cellules remplies",
+            "cells_clipped": "Valeurs plafonnées"
+        }), use_container_width=True)
+        st.dataframe(preview.head(10), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Appliquer le plan", type="primary", use_container_width=True):
+            with st.spinner("Application du plan en une passe..."):
+                df_cleaned, report = _get_history().apply(plan)
+            st.session_state.df = df_cleaned
+            st.session_state.cleaning_plan = CleaningPlan()
+            removed = sum(step["rows_removed"] for step in report)
+            filled = sum(step["cells_filled"] for step in report)
+            clipped = sum(step["cells_clipped"] for step in report)
+            st.success(f"Plan appliqué: {removed} lignes supprimées, {filled} cellules remplies, "
+                       f"{clipped} valeurs plafonnées")
+            st.rerun()
+    with col2:
+        if st.button("Vider le plan", use_container_width=True):
+            plan.clear()
+            st.rerun()
+
+
+def _get_history() -> DatasetHistory:
+    """Historique de la session, repris à zéro si le DataFrame a changé ailleurs"""
+    history = st.session_state.get("history")
+    if history is None or history.current is not st.session_state.df:
+        history = DatasetHistory(st.session_state.df)
+        st.session_state.history = history
+    return history
+
+
+def show_history_controls():
+    """Boutons annuler / rétablir et version courante"""
+    history = _get_history()
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        if st.button("↶ Annuler", disabled=not history.can_undo, use_container_width=True):
+            st.session_state.df = history.undo()
+            st.rerun()
+    with col2:
+        if st.button("↷ Rétablir", disabled=not history.can_redo, use_container_width=True):
+            st.session_state.df = history.redo()
+            st.rerun()
+    with col3:
+        st.caption(
+            f"Version {history.position + 1}/{len(history.labels)}: "
+            f"{history.labels[history.position]} "
+            f"(historique: {history.nbytes / 1024 ** 2:.1f} Mo hors données d'origine)"
+        )
+
+
 def show_export_tab():
     """Afficher l'onglet d'export avec rapport professionnel"""
 
@@ -457,7 +674,12 @@ def show_export_tab():
 
     st.divider()
 
-    # ========== SECTION 3: RÉSUMÉ FINAL ==========
+    # ========== SECTION 3: RECETTE DE NETTOYAGE ==========
+    show_recipe_section()
+
+    st.divider()
+
+    # ========== SECTION 4: RÉSUMÉ FINAL ==========
     st.subheader("Résumé du Nettoyage")
 
     try:
@@ -498,12 +720,83 @@ def show_export_tab():
         with col_center:
             if st.button("Importer un Autre Fichier", use_container_width=True):
                 st.session_state.df = None
+                st.session_state.df_stream = None
+                st.session_state.cleaning_plan = CleaningPlan()
+                st.session_state.history = None
                 st.rerun()
 
     except Exception as e:
         st.error(f"Erreur lors de la préparation du résumé: {str(e)}")
 
 
+def show_recipe_section():
+    """Export des étapes appliquées en recette JSON et rejeu sur le fichier complet"""
+    st.subheader("Recette de Nettoyage")
+
+    history = st.session_state.get("history")
+    steps = history.steps if history is not None and history.current is st.session_state.df else []
+    source = st.session_state.get("df_path")
+    read_options = st.session_state.get("df_read_options") or {}
+
+    uploaded = st.file_uploader("Importer une recette (JSON)", type=["json"], key="recipe_upload")
+    if uploaded is not None:
+        try:
+            recipe = load_recipe(uploaded.getvalue())
+            steps, read_options = recipe["steps"], recipe["read_options"] or read_options
+            st.success(f"Recette importée: {len(steps)} étape(s)")
+        except ValueError as e:
+            st.error(str(e))
+            return
+
+    if not steps:
+        st.info("Aucune étape appliquée: la recette reprend les plans appliqués dans l'onglet Nettoyage.")
+        return
+
+    for i, label in enumerate(CleaningPlan(steps).describe()):
+        st.write(f"{i + 1}. {label}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="Télécharger la recette (JSON)",
+            data=export_recipe(steps, source, read_options),
+            file_name="recette_nettoyage.json",
+            mime="application/json",
+            use_container_width=True
+        )
+
+    with col2:
+        if not source:
+            st.caption("Fichier d'origine inconnu: rejeu impossible")
+            return
+        try:
+            check_replayable(steps)
+        except ValueError as e:
+            st.warning(str(e))
+            return
+        if st.button("Rejouer sur le fichier complet", key="recipe_replay", use_container_width=True):
+            try:
+                with st.spinner("Rejeu de la recette par blocs..."):
+                    result = replay_recipe(steps, source, read_options=read_options)
+            except (OSError, ValueError) as e:
+                st.error(f"Erreur lors du rejeu: {str(e)}")
+                return
+            st.success(
+                f"{result['rows_out']:,} lignes sur {result['rows_in']:,} écrites dans "
+                f"{Path(result['output']).name}"
+            )
+            st.dataframe(pd.DataFrame(result["steps"]).rename(columns={
+                "step": "Étape",
+                "rows_removed": "Lignes supprimées",
+                "cells_filled": "Cellules remplies",
+                "cells_clipped": "Valeurs plafonnées"
+            }), use_container_width=True)
+    st.caption(
+        "Le rejeu lit le fichier d'origine par blocs: moyennes, quartiles et doublons "
+        "sont calculés sur toutes les lignes, pas sur l'échantillon."
+    )
+
+
 def show_report_section():
     """Affiche le rapport d'analyse complet"""
 
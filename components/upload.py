@@ -5,7 +5,11 @@ import streamlit as st
 import pandas as pd
 import os
 from utils.database import get_user_data_path
-from utils.data_processor import load_file, get_data_summary
+from config import STREAMING_THRESHOLD, EXCEL_STREAMING_THRESHOLD
+from utils.data_processor import load_file, load_file_streaming, get_data_summary
+from utils.streaming import list_excel_sheets
+from utils.profiler import count_distinct, format_distinct
+from utils.cleaning_plan import CleaningPlan
 
 
 def show_upload():
@@ -78,6 +82,12 @@ def show_upload():
             key="file_uploader"
         )
 
+        compact = st.checkbox(
+            "Chargement compact (types réduits, moins de mémoire)",
+            key="compact_load",
+            help="Réduit les types numériques et convertit les textes peu variés en catégories."
+        )
+
         if uploaded_file is not None:
             # Sauvegarder le fichier
             user_path = get_user_data_path(st.session_state.user_email)
@@ -88,22 +98,87 @@ def show_upload():
 
             st.success(f"Fichier sauvegardé: {uploaded_file.name}")
 
+            # Classeur Excel: choix de la feuille et de la plage de lignes avant lecture
+            read_options = {}
+            is_excel = file_path.suffix.lower() in (".xlsx", ".xls")
+            if is_excel:
+                sheets = list_excel_sheets(str(file_path))
+                read_options["sheet_name"] = st.selectbox("Feuille", sheets, key="excel_sheet")
+
+                col_start, col_end = st.columns(2)
+                with col_start:
+                    read_options["start_row"] = int(st.number_input(
+                        "Première ligne", min_value=0, value=0, step=1, key="excel_start_row"
+                    ))
+                with col_end:
+                    end_row = int(st.number_input(
+                        "Dernière ligne (0 = jusqu'à la fin)", min_value=0, value=0, step=1,
+                        key="excel_end_row"
+                    ))
+                read_options["end_row"] = end_row or None
+
+                if not st.button("Charger les données", key="load_excel"):
+                    return
+
+            streaming_threshold = EXCEL_STREAMING_THRESHOLD if is_excel else STREAMING_THRESHOLD
+
             # Charger la première aperçu
             try:
-                df = load_file(str(file_path))
+                if (file_path.suffix.lower() in (".csv", ".xlsx")
+                        and file_path.stat().st_size > streaming_threshold):
+                    # Gros fichier: lecture par blocs, seul un échantillon reste en mémoire
+                    with st.spinner("Lecture du fichier par blocs..."):
+                        stream = load_file_streaming(str(file_path), **read_options)
+                    df = stream.sample
+                    summary = stream.get_summary()
+                    n_rows = summary["rows"]
+                    size_kb = summary["memory_usage"] * 1024
+                    original_kb = None
+                    missing = [summary["missing_values"][col] for col in df.columns]
+                    distinct = stream.distinct_counts()
+                    uniques = [format_distinct(*distinct[col]) for col in df.columns]
+                    st.info(
+                        f"Fichier volumineux: statistiques calculées sur les {n_rows:,} lignes, "
+                        f"aperçu limité à un échantillon de {len(df):,} lignes."
+                    )
+                else:
+                    stream = None
+                    df = load_file(
+                        str(file_path), profile="compact" if compact else "standard", **read_options
+                    )
+                    n_rows = len(df)
+                    size_kb = df.memory_usage(deep=True).sum() / 1024
+                    original_kb = df.attrs.get("original_memory_usage", 0) / 1024 or None
+                    missing = [df[col].isnull().sum() for col in df.columns]
+                    # Au-delà de HLL_ROW_THRESHOLD lignes: estimation HyperLogLog (≈)
+                    uniques = [format_distinct(*count_distinct(df[col])) for col in df.columns]
+
                 st.session_state.df = df
+                st.session_state.df_stream = stream
+                st.session_state.cleaning_plan = CleaningPlan()
+                st.session_state.history = None
                 st.session_state.df_path = str(file_path)
+                st.session_state.df_read_options = read_options
 
                 # Afficher un aperçu
                 st.subheader("Aperçu des données")
 
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Lignes", len(df))
+                    st.metric("Lignes", n_rows)
                 with col2:
                     st.metric("Colonnes", len(df.columns))
                 with col3:
-                    st.metric("Taille", f"{df.memory_usage(deep=True).sum() / 1024:.2f} KB")
+                    if original_kb:
+                        saving_pct = (1 - size_kb / original_kb) * 100
+                        st.metric(
+                            "Taille",
+                            f"{size_kb:.2f} KB",
+                            delta=f"-{saving_pct:.0f}% (avant: {original_kb:.2f} KB)",
+                            delta_color="off"
+                        )
+                    else:
+                        st.metric("Taille", f"{size_kb:.2f} KB")
 
                 st.dataframe(df.head(10), use_container_width=True)
 
@@ -112,8 +187,8 @@ def show_upload():
                 col_info = pd.DataFrame({
                     "Colonne": df.columns,
                     "Type": [str(df[col].dtype) for col in df.columns],
-                    "Valeurs manquantes": [df[col].isnull().sum() for col in df.columns],
-                    "Uniques": [df[col].nunique() for col in df.columns]
+                    "Valeurs manquantes": missing,
+                    "Uniques": uniques
                 })
                 st.dataframe(col_info, use_container_width=True)
 
@@ -127,6 +202,8 @@ def show_upload():
                 with col2:
                     if st.button("Importer un autre fichier", use_container_width=True):
                         st.session_state.df = None
+                        st.session_state.df_stream = None
+                        st.session_state.history = None
                         st.rerun()
 
                 # Icône IA pour déclencher discussion
@@ -5,7 +5,15 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from utils.ml_model import PredictionModel
+from utils.model_registry import get_trained_model, MODELS_DIRNAME
+from utils.ml_model import BACKENDS
+from utils.database import get_user_data_path
+from utils.chart_aggregation import histogram_figure, box_figure, violin_figure
+from utils.downsampling import downsample_line, downsample_scatter, downsampling_caption
+from utils.density_raster import can_rasterize, axis_bounds, density_raster, raster_figure
+from utils.figure_cache import cached_figure, stats_label
+from utils.render_policy import render_mode, aggregate_bars, bar_caption
+from config import RASTER_ROW_THRESHOLD, HGB_ROW_THRESHOLD
 
 
 def show_visualization():
@@ -80,46 +88,111 @@ def show_visualization_tab():
     if selected_vars:
         df_filtered = df[selected_vars]
 
-        # Générer le graphique approprié
+        # Générer le graphique approprié (repris du cache si rien n'a changé)
         if chart_type == "Scatter" and len(selected_vars) >= 2:
-            fig = px.scatter(df, x=selected_vars[0], y=selected_vars[1],
-                           title=f"{selected_vars[0]} vs {selected_vars[1]}")
-            st.plotly_chart(fig, use_container_width=True)
+            x_var, y_var = selected_vars[0], selected_vars[1]
+            use_raster = can_rasterize(df, x_var, y_var) and st.checkbox(
+                "Rendu en densité",
+                value=len(df) > RASTER_ROW_THRESHOLD,
+                key="viz_raster",
+                help="Tous les points comptés sur une grille côté serveur et affichés comme une image"
+            )
+            if use_raster:
+                show_density_raster(df, x_var, y_var)
+            else:
+                def build_scatter():
+                    plot_df, sampling = downsample_scatter(df, x_var, y_var)
+                    fig = px.scatter(plot_df, x=x_var, y=y_var, title=f"{x_var} vs {y_var}",
+                                     render_mode=render_mode(len(plot_df)))
+                    return fig, sampling and downsampling_caption(sampling)
+
+                show_cached_chart(df, ("scatter", x_var, y_var), build_scatter)
 
             # Description
-            st.info(f"Ce graphique montre la relation entre {selected_vars[0]} et {selected_vars[1]}")
+            st.info(f"Ce graphique montre la relation entre {x_var} et {y_var}")
 
         elif chart_type == "Line" and len(selected_vars) >= 2:
-            fig = px.line(df, x=selected_vars[0], y=selected_vars[1],
-                         title=f"Tendance - {selected_vars[1]} par {selected_vars[0]}")
-            st.plotly_chart(fig, use_container_width=True)
+            x_var, y_var = selected_vars[0], selected_vars[1]
+
+            def build_line():
+                plot_df, sampling = downsample_line(df, x_var, y_var)
+                fig = px.line(plot_df, x=x_var, y=y_var, title=f"Tendance - {y_var} par {x_var}",
+                              render_mode=render_mode(len(plot_df), "line"))
+                return fig, sampling and downsampling_caption(sampling)
+
+            show_cached_chart(df, ("line", x_var, y_var), build_line)
 
         elif chart_type == "Bar" and len(selected_vars) >= 2:
-            fig = px.bar(df, x=selected_vars[0], y=selected_vars[1],
-                        title=f"Comparaison - {selected_vars[0]} vs {selected_vars[1]}")
-            st.plotly_chart(fig, use_container_width=True)
+            x_var, y_var = selected_vars[0], selected_vars[1]
+
+            def build_bar():
+                plot_df, aggregation = aggregate_bars(df, x_var, y_var)
+                fig = px.bar(plot_df, x=x_var, y=y_var, title=f"Comparaison - {x_var} vs {y_var}")
+                return fig, aggregation and bar_caption(aggregation, y_var)
+
+            show_cached_chart(df, ("bar", x_var, y_var), build_bar)
 
         elif chart_type == "Histogram":
             for var in selected_vars:
                 if pd.api.types.is_numeric_dtype(df[var]):
-                    fig = px.histogram(df, x=var, nbins=30, title=f"Distribution - {var}")
-                    st.plotly_chart(fig, use_container_width=True)
+                    show_cached_chart(df, ("histogram", var), lambda var=var: histogram_figure(
+                        df[var], title=f"Distribution - {var}"
+                    ))
 
         elif chart_type == "Box":
             for var in selected_vars:
                 if pd.api.types.is_numeric_dtype(df[var]):
-                    fig = px.box(df, y=var, title=f"Boxplot - {var}")
-                    st.plotly_chart(fig, use_container_width=True)
+                    show_cached_chart(df, ("box", var), lambda var=var: box_figure(
+                        df, [var], title=f"Boxplot - {var}"
+                    ))
 
         elif chart_type == "Violin":
             for var in selected_vars:
                 if pd.api.types.is_numeric_dtype(df[var]):
-                    fig = px.violin(df, y=var, title=f"Violin Plot - {var}")
-                    st.plotly_chart(fig, use_container_width=True)
+                    show_cached_chart(df, ("violin", var), lambda var=var: violin_figure(
+                        df[var], title=f"Violin Plot - {var}"
+                    ))
 
         else:
             st.warning("Sélection invalide pour ce type de graphique")
 
+    st.caption(stats_label())
+
+
+def show_cached_chart(df, spec, build):
+    """Afficher un graphique, repris du cache tant que les données et `spec` sont inchangés"""
+
+    fig, note = cached_figure(df, spec, build)
+    st.plotly_chart(fig, use_container_width=True)
+    if note:
+        st.caption(note)
+
+
+def show_density_raster(df, x_var, y_var):
+    """Nuage de points en densité, avec zoom par curseurs (seule la fenêtre est recomptée)"""
+
+    (x_min, x_max), (y_min, y_max) = axis_bounds(df, x_var, y_var)
+    x_range, y_range = None, None
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if x_min < x_max:
+            x_range = st.slider(f"Zoom {x_var}", x_min, x_max, (x_min, x_max), key=f"raster_x_{x_var}")
+    with col2:
+        if y_min < y_max:
+            y_range = st.slider(f"Zoom {y_var}", y_min, y_max, (y_min, y_max), key=f"raster_y_{y_var}")
+
+    def build_raster():
+        raster = density_raster(df, x_var, y_var, x_range, y_range)
+        fig = raster_figure(raster, x_var, y_var, title=f"{x_var} vs {y_var} (densité)")
+        height, width = raster["counts"].shape
+        return fig, (
+            f"Rendu en densité: {raster['in_view']:,} points dans la fenêtre sur {raster['total']:,} "
+            f"(grille {width}×{height}, échelle logarithmique)"
+        )
+
+    show_cached_chart(df, ("density", x_var, y_var, x_range, y_range), build_raster)
+
 
 def show_prediction_tab():
     """Afficher le module de prédiction"""
@@ -128,21 +201,43 @@ def show_prediction_tab():
 
     df = st.session_state.df
 
-    # Sélection de la variable cible
-    target_col = st.selectbox(
-        "Sélectionnez la variable à prédire",
-        df.columns.tolist(),
-        key="target_col"
-    )
+    # Sélection de la variable cible et du moteur
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        target_col = st.selectbox(
+            "Sélectionnez la variable à prédire",
+            df.columns.tolist(),
+            key="target_col"
+        )
+
+    with col2:
+        backend = st.selectbox(
+            "Moteur",
+            list(BACKENDS),
+            format_func=BACKENDS.get,
+            key="model_backend",
+            help=f"Automatique: gradient boosting au-delà de {HGB_ROW_THRESHOLD:,} lignes, Random Forest sinon"
+        )
 
     if target_col:
         st.divider()
 
-        # Entraîner le modèle
-        st.info("Entraînement du modèle en cours...")
-
-        model = PredictionModel(df, target_col)
-        scores = model.train()
+        # Entraîner le modèle (repris du registre si les données et la cible n'ont pas changé)
+        models_dir = None
+        if st.session_state.get("user_email"):
+            models_dir = get_user_data_path(st.session_state.user_email) / MODELS_DIRNAME
+
+        with st.spinner("Entraînement du modèle en cours..."):
+            model, source = get_trained_model(
+                df, target_col, models_dir=models_dir, owner=st.session_state.get("user_email"), backend=backend
+            )
+        scores = model.scores
+        caption = f"Moteur: {BACKENDS[model.backend]}"
+        if source != "trained":
+            caption += " — modèle déjà entraîné sur ces données, repris " + \
+                       ("de la mémoire" if source == "memory" else "du disque")
+        st.caption(caption)
 
         col1, col2 = st.columns(2)
 
@@ -27,6 +27,109 @@ WARNING_COLOR = "#f39c12"
 ALLOWED_EXTENSIONS = {"csv", "xlsx", "xls"}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
 
+# Ingestion en flux (par blocs) des gros fichiers
+STREAMING_THRESHOLD = 200 * 1024 * 1024  # Au-delà de 200 MB, lecture par blocs
+EXCEL_STREAMING_THRESHOLD = 20 * 1024 * 1024  # .xlsx compressé: ~20 MB = plusieurs centaines de milliers de lignes
+CHUNK_SIZE = 100_000  # Lignes lues par bloc
+SAMPLE_SIZE = 10_000  # Lignes conservées en mémoire pour l'aperçu
+MAX_TRACKED_CATEGORIES = 10_000  # Modalités distinctes suivies par colonne
+
+# Cache Parquet des fichiers importés (data/users/<email>/.cache/)
+DATASET_CACHE_ENABLED = True
+
+# Profils statistiques gardés en cache (clé = empreinte du DataFrame)
+PROFILE_CACHE_SIZE = 32
+
+# Profilage parallèle des colonnes numériques (1 = en série)
+PROFILE_WORKERS = int(os.getenv("PROFILE_WORKERS", "1"))
+PARALLEL_PROFILE_MIN_CELLS = 5_000_000  # En dessous (lignes x colonnes), le démarrage du pool ne paie pas
+
+# Matrices de corrélation (calculées une fois par version du jeu de données)
+CORRELATION_SAMPLE_ROWS = 200_000  # Au-delà, calcul sur un échantillon de lignes
+CORRELATION_CACHE_SIZE = 16
+
+# Empreintes de lignes (détection des doublons) gardées en cache
+DUPLICATE_CACHE_SIZE = 8
+
+# Plan de nettoyage: lignes de l'échantillon utilisé pour l'aperçu
+PLAN_PREVIEW_ROWS = 5_000
+
+# Valeurs aberrantes: seuils par défaut de chaque méthode
+OUTLIER_IQR_FACTOR = 1.5          # Q1 - k*IQR, Q3 + k*IQR
+OUTLIER_ZSCORE_THRESHOLD = 3.0    # |x - moyenne| > k * écart-type
+OUTLIER_MAD_THRESHOLD = 3.5       # z-score modifié (médiane / MAD) > k
+OUTLIER_PERCENTILES = (0.01, 0.99)
+OUTLIER_CACHE_SIZE = 16
+
+# Imputation des valeurs manquantes (utils/imputation.py)
+IMPUTER_MAX_FIT_ROWS = 200_000    # Lignes de référence au plus (échantillon au-delà)
+IMPUTER_KNN_NEIGHBORS = 5
+IMPUTER_KNN_BATCH = 50_000        # Lignes interrogées par lot dans l'index des voisins
+IMPUTER_CACHE_SIZE = 8
+
+# Recettes de nettoyage rejouées par blocs sur le fichier complet
+RECIPE_SKETCH_EPSILON = 0.002  # Précision du sketch qui encadre les quantiles exacts
+
+# Graphiques: points envoyés au navigateur par trace (au-delà: sous-échantillonnage)
+MAX_POINTS_PER_TRACE = 5_000
+LINE_DOWNSAMPLING = "lttb"        # "lttb" (forme de la courbe) ou "minmax" (extrêmes par intervalle)
+SCATTER_GRID_SIZE = 64            # Cases par axe pour l'échantillonnage stratifié des nuages de points
+# Seuils WebGL mesurés avec benchmarks/bench_webgl.py --render (tracé Plotly.js en Chromium headless):
+# un nuage SVG coûte ~0.15 ms par point, WebGL ~0.7 s fixes puis peu par point: égalité vers 5 000 points.
+# Une courbe SVG est un seul chemin: plus rapide que WebGL jusqu'à 100 000 points au moins.
+WEBGL_THRESHOLD = 5_000           # Points par trace au-delà desquels les nuages de points passent en WebGL
+WEBGL_LINE_THRESHOLD = 100_000    # Idem pour les courbes
+BAR_AGGREGATION_THRESHOLD = 1_000 # Lignes au-delà desquelles les barres sont agrégées par catégorie
+BAR_MAX_CATEGORIES = 50           # Barres affichées au plus (catégories de plus grand total)
+
+# Graphiques agrégés côté serveur (histogrammes, boîtes, violons)
+HISTOGRAM_BINS = 30
+BOX_MAX_OUTLIER_POINTS = 500      # Points aberrants dessinés par boîte au plus (extrêmes toujours inclus)
+KDE_GRID_POINTS = 256             # Résolution de la densité (KDE binée) des violons
+
+# Nuages de points rendus en densité (raster) au-delà de ce nombre de lignes
+RASTER_ROW_THRESHOLD = 500_000
+RASTER_WIDTH = 400                # Cases en abscisse
+RASTER_HEIGHT = 300               # Cases en ordonnée
+RASTER_CACHE_SIZE = 2             # Axes triés gardés en mémoire (2 x 8 octets par ligne chacun)
+
+# Cache des graphiques déjà construits (JSON Plotly), borné en mémoire
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Modèles de prédiction entraînés (data/users/<email>/.models/)
+MODEL_CACHE_SIZE = 4              # Modèles gardés en mémoire (tous utilisateurs confondus)
+MODEL_DISK_MAX_FILES = 20         # Modèles gardés sur disque par utilisateur (les plus récents)
+MODEL_PERSISTENCE_ENABLED = True
+
+# Cœurs utilisés pour entraîner / appliquer les modèles (0 = tous les cœurs disponibles
+# du conteneur), et part maximale d'un utilisateur (0 = partage équitable entre utilisateurs actifs)
+MODEL_N_JOBS = int(os.getenv("MODEL_N_JOBS", "0"))
+MODEL_USER_MAX_JOBS = int(os.getenv("MODEL_USER_MAX_JOBS", "0"))
+MODEL_PARALLEL_PREDICT_ROWS = 10_000  # En dessous, prédiction sur un seul cœur (démarrage des threads inutile)
+
+# Moteur de prédiction: "auto" = gradient boosting sur histogrammes au-delà de HGB_ROW_THRESHOLD lignes
+HGB_ROW_THRESHOLD = 200_000
+HGB_MAX_ITER = 300                # Itérations de boosting au plus (arrêt anticipé sur validation)
+HGB_EARLY_STOPPING_ROUNDS = 10    # Itérations sans amélioration avant l'arrêt
+PERMUTATION_IMPORTANCE_ROWS = 5_000  # Lignes de test utilisées pour l'importance par permutation
+
+# Historique des versions (annuler / rétablir) gardé par session
+HISTORY_MAX_VERSIONS = 20
+
+# Quantiles approchés (sketch fusionnable), sur option
+QUANTILE_SKETCH_EPSILON = 0.01  # Erreur de rang relative visée
+APPROX_QUANTILES = False  # Activer par défaut les quantiles approchés
+
+# Comptage approché des valeurs distinctes (HyperLogLog)
+HLL_PRECISION = 14  # 2^14 registres: erreur type ≈ 0.8%
+HLL_ROW_THRESHOLD = 1_000_000  # Activé automatiquement au-delà de ce nombre de lignes
+# Lecture en flux: lignes uniques suivies exactement pour les doublons (8 octets chacune, ~16 MB);
+# au-delà, lignes distinctes estimées par HyperLogLog (mémoire fixe, doublons approchés)
+STREAM_EXACT_DUPLICATE_ROWS = 2_000_000
+
+# Profil de chargement "compact": texte -> category si uniques / lignes <= ratio
+CATEGORY_MAX_RATIO = 0.5
+
 # Configuration pour les modèles IA gratuits
 # Option 1: Hugging Face (nécessite une clé API gratuite)
 # Option 2: Groq (gratuit avec limite de requests)
@@ -4,6 +4,7 @@
 import sys
 sys.path.insert(0, '/Users/fati/python/data_analysis_app')
 
+import numpy as np
 import pandas as pd
 from utils.report_generator import ReportGenerator
 from utils.data_exporter import DataExporter
@@ -64,6 +65,845 @@ try:
 except Exception as e:
     print(f"  ❌ Erreur: {e}")
 
+# Test 3: StreamingDataset
+print("\n✅ TEST 3: StreamingDataset")
+try:
+    import tempfile
+    from utils.data_processor import load_file_streaming, get_column_stats
+    from utils.streaming import StreamingDataset
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = f"{tmp_dir}/stream.csv"
+        pd.concat([df] * 20, ignore_index=True).to_csv(csv_path, index=False)
+        stream = load_file_streaming(csv_path, chunksize=7, sample_size=10)
+
+        stream_summary = stream.get_summary()
+        assert stream_summary['rows'] == 100
+        assert stream_summary['duplicates'] == 95
+        assert len(stream.sample) == 10
+        print(f"  • Résumé par blocs: OK (lignes: {stream_summary['rows']})")
+
+        full_stats = get_column_stats(stream.load_full())
+        stream_stats = stream.get_column_stats()
+        assert abs(stream_stats['age']['mean'] - full_stats['age']['mean']) < 1e-9
+        assert stream_stats['ville']['most_common'] == full_stats['ville']['most_common']
+        print(f"  • Statistiques incrémentales: OK")
+
+        zero_path = f"{tmp_dir}/zeros.csv"
+        pd.DataFrame({"x": [0.0, -0.0, 1.0], "y": ["a", "a", "b"]}).to_csv(zero_path, index=False)
+        assert load_file_streaming(zero_path, chunksize=1).get_summary()['duplicates'] == 1
+        print(f"  • Doublons comptés comme drop_duplicates (0.0 / -0.0): OK")
+
+        # Au-delà du suivi exact: doublons estimés en mémoire fixe
+        many_path = f"{tmp_dir}/many.csv"
+        pd.DataFrame({"k": np.tile(np.arange(10_000), 2)}).to_csv(many_path, index=False)
+        bounded = StreamingDataset(many_path, chunksize=2_000, exact_duplicate_rows=1_000).ingest()
+        bounded_summary = bounded.get_summary()
+        assert bounded_summary['duplicates_approximate'] and len(bounded._row_hashes) == 0
+        assert abs(bounded_summary['duplicates'] - 10_000) < 500
+        assert not stream_summary['duplicates_approximate']
+        print(f"  • Suivi des doublons borné (HyperLogLog au-delà du seuil): OK")
+
+    print("  ✅ StreamingDataset: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 4: Cache Parquet
+print("\n✅ TEST 4: Cache Parquet")
+try:
+    import tempfile
+    from utils.data_processor import load_file
+    from utils.dataset_cache import cache_path_for, PARQUET_AVAILABLE
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = f"{tmp_dir}/cache.csv"
+        df.to_csv(csv_path, index=False)
+        first = load_file(csv_path)
+        assert cache_path_for(csv_path).exists() == PARQUET_AVAILABLE
+        cached = load_file(csv_path)
+        pd.testing.assert_frame_equal(first, cached)
+        print(f"  • Relecture depuis le cache: OK (pyarrow: {PARQUET_AVAILABLE})")
+
+    print("  ✅ Cache Parquet: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 5: Profil compact
+print("\n✅ TEST 5: Profil compact")
+try:
+    from utils.data_processor import compact_dtypes, fill_missing_values
+
+    compact_df = compact_dtypes(pd.concat([df] * 20, ignore_index=True))
+    assert str(compact_df['ville'].dtype) == 'category'
+    assert compact_df.memory_usage(deep=True).sum() < compact_df.attrs['original_memory_usage']
+    print(f"  • Réduction mémoire: OK")
+
+    filled = fill_missing_values(compact_df.copy(), method="median")
+    assert filled.isnull().sum().sum() == 0
+    print(f"  • Nettoyage sur colonnes category: OK")
+
+    print("  ✅ Profil compact: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 6: Lecture Excel en flux
+print("\n✅ TEST 6: Lecture Excel en flux")
+try:
+    import tempfile
+    from utils.data_processor import load_file, load_file_streaming
+    from utils.streaming import list_excel_sheets
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        xlsx_path = f"{tmp_dir}/classeur.xlsx"
+        with pd.ExcelWriter(xlsx_path) as writer:
+            df.to_excel(writer, index=False, sheet_name='Ventes')
+            df.head(2).to_excel(writer, index=False, sheet_name='Extrait')
+
+        assert list_excel_sheets(xlsx_path) == ['Ventes', 'Extrait']
+        pd.testing.assert_frame_equal(load_file(xlsx_path, use_cache=False), pd.read_excel(xlsx_path))
+        print(f"  • Lecture complète: OK")
+
+        subset = load_file(xlsx_path, use_cache=False, sheet_name='Ventes', start_row=1, end_row=3)
+        assert subset['salaire'].tolist()[0] == 45000 and len(subset) == 2
+        assert load_file_streaming(xlsx_path, chunksize=2, sheet_name='Extrait').rows == 2
+        print(f"  • Feuille et plage de lignes: OK")
+
+    print("  ✅ Lecture Excel en flux: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 7: Profil en une passe
+print("\n✅ TEST 7: DataProfile")
+try:
+    from utils.profiler import build_profile
+
+    profile = build_profile(df)
+    for col in ['age', 'salaire']:
+        expected = [df[col].min(), df[col].median(), df[col].std(), df[col].quantile(0.75)]
+        actual = profile.numeric.loc[col, ['min', 'median', 'std', 'q75']].tolist()
+        assert all(abs(a - e) < 1e-9 for a, e in zip(actual, expected))
+    assert profile.categorical.loc['ville', 'most_common'] == df['ville'].mode()[0]
+    assert profile.missing.tolist() == df.isnull().sum().tolist()
+    print(f"  • Statistiques identiques à pandas: OK")
+
+    print("  ✅ DataProfile: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 8: Cache des profils
+print("\n✅ TEST 8: Cache des profils")
+try:
+    from utils.profiler import get_profile
+    from utils.data_processor import fill_missing_values
+
+    cached_df = df.copy()
+    assert get_profile(cached_df) is get_profile(cached_df)
+    print(f"  • Profil réutilisé d'un appel à l'autre: OK")
+
+    before = get_profile(cached_df)
+    cached_df = fill_missing_values(cached_df, method="mean")
+    assert get_profile(cached_df) is not before
+    assert get_profile(cached_df).missing_total == 0
+    print(f"  • Invalidation après nettoyage: OK")
+
+    # Deux versions de même forme qui ne diffèrent que hors des lignes échantillonnées
+    from utils.fingerprint import dataframe_fingerprint
+    revised_base = pd.DataFrame({"x": np.arange(10_000, dtype=float), "y": np.zeros(10_000)})
+    revised = revised_base.copy()
+    revised.loc[5, "y"] = 1e9
+    assert dataframe_fingerprint(revised) != dataframe_fingerprint(revised_base)
+    assert get_profile(revised_base).numeric.loc["y", "max"] == 0
+    assert get_profile(revised).numeric.loc["y", "max"] == 1e9
+    print(f"  • Contenu modifié hors échantillon: nouveau profil: OK")
+
+    print("  ✅ Cache des profils: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 9: Mise à jour incrémentale du profil
+print("\n✅ TEST 9: Profil incrémental")
+try:
+    from utils.profiler import get_profile, build_profile
+    from utils.data_processor import remove_duplicates, fill_missing_values
+
+    incremental_df = pd.concat([df, df.head(2)], ignore_index=True)
+    get_profile(incremental_df)
+    incremental_df, _ = remove_duplicates(incremental_df)
+    incremental_df = fill_missing_values(incremental_df, method="median")
+
+    updated, rebuilt = get_profile(incremental_df), build_profile(incremental_df)
+    assert np.allclose(updated.numeric.astype(float), rebuilt.numeric.astype(float), equal_nan=True)
+    assert updated.missing.equals(rebuilt.missing) and updated.duplicates == rebuilt.duplicates
+    print(f"  • Deltas identiques à un recalcul complet: OK")
+
+    print("  ✅ Profil incrémental: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 10: Sketch de quantiles
+print("\n✅ TEST 10: Quantiles approchés")
+try:
+    from utils.sketches import QuantileSketch
+    from utils.profiler import get_profile
+
+    values = np.random.default_rng(0).lognormal(size=200_000)
+    merged = QuantileSketch(epsilon=0.01, seed=0).update(values[:100_000])
+    merged.merge(QuantileSketch(epsilon=0.01, seed=1).update(values[100_000:]))
+    estimates = merged.quantile([0.25, 0.5, 0.75])
+    ranks = np.searchsorted(np.sort(values), estimates) / len(values)
+    assert np.abs(ranks - [0.25, 0.5, 0.75]).max() <= 0.01
+    assert merged.size < len(values) // 20
+    print(f"  • Sketches fusionnés, erreur de rang ≤ 1%: OK")
+
+    approx = get_profile(df, approximate=True)
+    assert approx.approximate and not get_profile(df, approximate=False).approximate
+    assert approx.numeric.loc["age", "min"] == df["age"].min()
+    print(f"  • Profil approché: OK")
+
+    print("  ✅ Quantiles approchés: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 11: Comptage approché des valeurs distinctes
+print("\n✅ TEST 11: HyperLogLog")
+try:
+    from utils.sketches import HyperLogLog
+    from utils.profiler import count_distinct, format_distinct
+
+    ids = pd.Series([f"id{i}" for i in range(200_000)])
+    merged = HyperLogLog().update(ids[:120_000]).merge(HyperLogLog().update(ids[80_000:]))
+    assert abs(merged.count() / len(ids) - 1) < 0.03
+    print(f"  • Estimation fusionnée à moins de 3%: OK")
+
+    assert count_distinct(df["ville"]) == (df["ville"].nunique(), False)
+    assert count_distinct(ids, approximate=True)[1]
+    assert format_distinct(1234, True) == "≈ 1,234"
+    print(f"  • Bascule exact / approché et libellé ≈: OK")
+
+    print("  ✅ HyperLogLog: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 12: Détection des doublons par empreintes
+print("\n✅ TEST 12: Doublons")
+try:
+    from utils.duplicates import get_detector, count_duplicates, drop_duplicates
+    from utils.data_processor import remove_duplicates
+
+    dup_df = pd.concat([df, df.tail(3)], ignore_index=True)
+    assert count_duplicates(dup_df) == int(dup_df.duplicated().sum())
+    assert count_duplicates(dup_df, subset=["ville"]) == int(dup_df.duplicated(subset=["ville"]).sum())
+    print(f"  • Comptage global et par sous-ensemble: OK")
+
+    dedup, removed = drop_duplicates(dup_df, keep="last")
+    assert dedup.index.equals(dup_df.drop_duplicates(keep="last").index)
+    assert count_duplicates(dedup) == 0
+    print(f"  • Suppression (keep='last') et détecteur dérivé: OK")
+
+    grown = get_detector(dedup).append(dedup.head(2))
+    assert grown.count() == 2
+    print(f"  • Ajout incrémental de lignes: OK")
+
+    zero_df = pd.DataFrame({"x": [0.0, -0.0, 1.0], "y": ["a", "a", "b"]})
+    assert count_duplicates(zero_df) == int(zero_df.duplicated().sum()) == 1
+    assert len(remove_duplicates(zero_df)) == len(zero_df.drop_duplicates())
+    print(f"  • 0.0 et -0.0 égaux, comme drop_duplicates: OK")
+
+    print("  ✅ Doublons: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 13: Profilage parallèle (mémoire partagée)
+print("\n✅ TEST 13: Profilage parallèle")
+try:
+    from multiprocessing import shared_memory
+    from utils.parallel_profiler import _profile_shard
+    from utils.profiler import build_profile, numeric_matrix
+
+    # Tâche d'un worker exécutée ici: le script n'est pas importable par un pool "spawn"
+    shape = (len(df), 2)
+    segment = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1] * 8)
+    try:
+        shared = np.ndarray(shape, dtype=float, buffer=segment.buf, order="F")
+        numeric_matrix(df, ["age", "salaire"], out=shared)
+        del shared
+        stats, _ = _profile_shard(segment.name, shape, 1, 2, False)
+    finally:
+        segment.close()
+        segment.unlink()
+    sequential = build_profile(df, workers=1).numeric.loc[["salaire"]]
+    for field in ("mean", "median", "q75"):
+        assert np.allclose(stats[field], sequential[field].astype(float), equal_nan=True)
+    print(f"  • Lot lu en mémoire partagée, identique au calcul en série: OK")
+
+    print("  ✅ Profilage parallèle: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 14: Corrélations vectorisées
+print("\n✅ TEST 14: Corrélations")
+try:
+    from utils.correlation import correlation_matrix, top_pairs
+
+    # Valeurs manquantes: calcul par paire de lignes complètes
+    corr_df = df[["age", "salaire"]].assign(double_age=df["age"] * 2, bruit=[3.0, -1.0, 4.0, 1.0, -5.0])
+    for method in ("pearson", "spearman"):
+        expected = corr_df.corr(method=method)
+        assert np.allclose(correlation_matrix(corr_df, method=method), expected, equal_nan=True)
+    assert correlation_matrix(corr_df) is correlation_matrix(corr_df)
+    print(f"  • Pearson / Spearman identiques à DataFrame.corr, matrice en cache: OK")
+
+    pairs = top_pairs(correlation_matrix(corr_df), k=1)
+    assert pairs[0][:2] == ("age", "double_age") and abs(pairs[0][2] - 1) < 1e-9
+    print(f"  • Top-k des paires: OK")
+
+    print("  ✅ Corrélations: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 15: Plan de nettoyage fusionné
+print("\n✅ TEST 15: Plan de nettoyage")
+try:
+    from utils.cleaning_plan import CleaningPlan
+    from utils.profiler import get_profile, build_profile
+
+    plan_df = pd.concat([df, df.head(2)], ignore_index=True)
+    plan_df["score"] = [1.0, 2.0, None, 2.5, 1.5, 100.0, 2.0]
+    get_profile(plan_df)
+    plan = (CleaningPlan()
+            .add("drop_duplicates")
+            .add("fill_missing", method="median")
+            .add("drop_outliers", column="score"))
+
+    # Référence: étapes appliquées une à une avec pandas
+    expected = plan_df.drop_duplicates()
+    numeric = expected.select_dtypes(include="number").columns
+    expected = expected.fillna(expected[numeric].median()).fillna({"ville": "Unknown"})
+    q1, q3 = expected["score"].quantile([0.25, 0.75])
+    expected = expected[expected["score"].between(q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))]
+
+    result, report = plan.execute(plan_df)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert [(step["rows_removed"], step["cells_filled"]) for step in report] == [(1, 0), (0, 4), (1, 0)]
+    print(f"  • Exécution fusionnée identique aux étapes successives: OK")
+
+    updated = get_profile(result)
+    assert np.allclose(updated.numeric.astype(float), build_profile(result).numeric.astype(float), equal_nan=True)
+    print(f"  • Profil mis à jour par deltas: OK")
+
+    preview, _, sample_size = plan.preview(plan_df, sample_rows=4)
+    assert sample_size == 4 and len(preview) <= 4
+    assert CleaningPlan(plan.steps).steps == plan.steps
+    print(f"  • Aperçu sur échantillon et plan rechargeable: OK")
+
+    print("  ✅ Plan de nettoyage: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 16: Historique annuler / rétablir
+print("\n✅ TEST 16: Historique des versions")
+try:
+    from utils.history import DatasetHistory
+    from utils.cleaning_plan import CleaningPlan
+    from utils.fingerprint import dataframe_fingerprint
+
+    history_df = plan_df.copy()
+    history = DatasetHistory(history_df)
+    first, _ = history.apply(CleaningPlan().add("drop_duplicates"))
+    second, _ = history.apply(CleaningPlan().add("fill_missing", method="mean"))
+    assert history.labels[0] == "Import" and len(history.labels) == 3
+    print(f"  • Versions enregistrées: {len(history.labels)}")
+
+    second_key = dataframe_fingerprint(second)
+    pd.testing.assert_frame_equal(history.undo(), first)
+    assert history.undo() is history_df and not history.can_undo
+    assert history.redo().equals(first)
+    restored = history.redo()
+    pd.testing.assert_frame_equal(restored, second)
+    assert dataframe_fingerprint(restored) == second_key
+    print(f"  • Annuler / rétablir (même empreinte, caches réutilisés): OK")
+
+    # Les colonnes non modifiées ne sont pas copiées dans l'historique
+    assert set(history._versions[1].columns) == set()
+    assert set(history._versions[2].columns) == {"age", "salaire", "ville", "score"}
+    history.undo()
+    history.apply(CleaningPlan().add("drop_outliers", column="score"))
+    assert not history.can_redo and len(history.labels) == 3
+    print(f"  • Nouvelle branche après annulation: OK")
+
+    print("  ✅ Historique: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 17: Valeurs aberrantes multi-colonnes
+print("\n✅ TEST 17: Valeurs aberrantes multi-colonnes")
+try:
+    from utils.outliers import outlier_report, compute_bounds
+    from utils.cleaning_plan import CleaningPlan
+
+    outlier_df = pd.DataFrame({
+        "x": [1.0, 2.0, 3.0, 2.5, 1.5, 2.0, 50.0, None],
+        "y": [10, 11, 12, 13, -40, 11, 12, 10],
+    })
+    report = outlier_report(outlier_df, ["x", "y"], method="iqr")
+    assert report["outliers"].tolist() == [1, 1]
+    for method in ("zscore", "mad", "percentile"):
+        lower, upper = compute_bounds(outlier_df[["x", "y"]].to_numpy(dtype=float), method)
+        assert (lower <= upper).all()
+    print(f"  • Bornes et comptages par colonne (4 méthodes): OK")
+
+    dropped, step_report = CleaningPlan().add("drop_outliers", columns=["x", "y"]).execute(outlier_df)
+    assert len(dropped) == 6 and step_report[0]["rows_removed"] == 2
+    assert dropped["x"].isnull().sum() == 1
+    print(f"  • Suppression par un seul masque (manquants conservés): OK")
+
+    clipped, step_report = CleaningPlan().add("clip_outliers", columns=["x", "y"]).execute(outlier_df)
+    assert len(clipped) == len(outlier_df) and step_report[0]["cells_clipped"] == 2
+    assert clipped["y"].dtype == outlier_df["y"].dtype
+    assert clipped["x"].max() == report.loc["x", "upper"]
+    print(f"  • Plafonnement (winsorisation): OK")
+
+    print("  ✅ Valeurs aberrantes: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 18: Imputation par groupe, interpolation et voisins
+print("\n✅ TEST 18: Imputation")
+try:
+    from utils.imputation import Imputer, get_imputer
+    from utils.data_processor import fill_missing_values
+
+    impute_df = pd.DataFrame({
+        "jour": pd.date_range("2024-01-01", periods=6, freq="D"),
+        "groupe": ["a", "a", "a", "b", "b", "b"],
+        "x": [1.0, 2.0, 3.0, 10.0, 20.0, 30.0],
+        "y": [1.0, None, 3.0, 10.0, None, 30.0],
+    })
+
+    by_group = fill_missing_values(impute_df, method="group_mean", group_by="groupe")
+    assert by_group["y"].tolist() == [1.0, 2.0, 3.0, 10.0, 20.0, 30.0]
+    print(f"  • Moyenne par groupe: OK")
+
+    shuffled = impute_df.iloc[[5, 0, 3, 1, 4, 2]]
+    interpolated = fill_missing_values(shuffled, method="interpolate", order_by="jour")
+    assert interpolated.sort_values("jour")["y"].tolist() == [1.0, 2.0, 3.0, 10.0, 20.0, 30.0]
+    print(f"  • Interpolation selon la date: OK")
+
+    neighbors = fill_missing_values(impute_df, method="knn", n_neighbors=2)
+    assert neighbors["y"].tolist() == [1.0, 2.0, 3.0, 10.0, 20.0, 30.0]
+    print(f"  • Plus proches voisins (KD-tree): OK")
+
+    imputer = get_imputer(impute_df, strategy="median", columns=["y"])
+    assert get_imputer(impute_df, strategy="median", columns=["y"]) is imputer
+    new_upload = pd.DataFrame({"y": [None, 5.0]})
+    assert imputer.transform(new_upload)["y"].tolist() == [6.5, 5.0]
+    print(f"  • Ajustement en cache, réappliqué à de nouvelles données: OK")
+
+    # Profil compact: colonnes float32, moyennes non représentables exactement
+    compact_impute = impute_df.assign(
+        x=impute_df["x"].astype("float32") / 3, y=impute_df["y"].astype("float32") / 3
+    )
+    for method, options in [("mean", {}), ("median", {}), ("group_mean", {"group_by": "groupe"}),
+                            ("interpolate", {"order_by": "jour"}), ("knn", {"n_neighbors": 2})]:
+        filled_compact = fill_missing_values(compact_impute, method=method, **options)
+        assert filled_compact["y"].dtype == np.float32 and filled_compact["y"].notnull().all()
+    print(f"  • Colonnes float32 (profil compact): OK")
+
+    print("  ✅ Imputation: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 19: Recette rejouée par blocs
+print("\n✅ TEST 19: Recette de nettoyage")
+try:
+    import tempfile
+    from utils.recipe import export_recipe, load_recipe, replay_recipe, check_replayable
+    from utils.cleaning_plan import CleaningPlan
+    from utils.history import DatasetHistory
+
+    rng = np.random.default_rng(3)
+    raw_df = pd.DataFrame({
+        "valeur": np.where(rng.random(2000) < 0.1, np.nan, rng.standard_t(3, 2000)),
+        "code": rng.integers(0, 400, 2000),
+        "ville": rng.choice(["Paris", "Lyon", None], 2000),
+    })
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_path = f"{tmp_dir}/brut.csv"
+        raw_df.to_csv(raw_path, index=False)
+
+        history = DatasetHistory(pd.read_csv(raw_path))
+        history.apply(CleaningPlan().add("drop_duplicates", subset=["code"], keep="last"))
+        history.apply(CleaningPlan()
+                      .add("clip_outliers", columns=["valeur"], method="iqr")
+                      .add("fill_missing", method="median"))
+        recipe = load_recipe(export_recipe(history.steps, raw_path))
+        assert recipe["source"] == "brut.csv" and len(recipe["steps"]) == 3
+        print(f"  • Export / import JSON: OK ({len(recipe['steps'])} étapes)")
+
+        result = replay_recipe(recipe["steps"], raw_path, chunksize=300)
+        replayed = pd.read_parquet(result["output"]) if result["output"].endswith(".parquet") else pd.read_csv(result["output"])
+        pd.testing.assert_frame_equal(replayed, history.current.reset_index(drop=True))
+        assert result["rows_out"] == len(history.current)
+        print(f"  • Rejeu par blocs identique à l'exécution en mémoire: OK")
+
+    try:
+        check_replayable([{"op": "fill_missing", "method": "knn", "n_neighbors": 5}])
+        raise AssertionError("knn accepté")
+    except ValueError:
+        print(f"  • Étape non rejouable signalée: OK")
+
+    print("  ✅ Recette de nettoyage: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 20: Sous-échantillonnage des graphiques
+print("\n✅ TEST 20: Sous-échantillonnage")
+try:
+    from utils.downsampling import (
+        lttb_indices, minmax_indices, downsample_line, downsample_scatter, downsampling_caption
+    )
+
+    x = np.arange(100_000, dtype=float)
+    y = np.sin(x / 5_000)
+    y[54_321] = 25.0
+    kept = lttb_indices(x, y, 1_000)
+    assert len(kept) == 1_000 and kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0) and 54_321 in kept
+    print(f"  • LTTB: {len(kept)} points, pic conservé: OK")
+
+    kept = minmax_indices(y, 1_000)
+    assert len(kept) <= 1_000 and 54_321 in kept and y[kept].min() == y.min()
+    print(f"  • Min/max par intervalle: extrêmes conservés: OK")
+
+    rng = np.random.default_rng(4)
+    line_df = pd.DataFrame({"t": rng.permutation(x), "v": rng.normal(size=len(x))})
+    line_df.loc[0, "v"] = np.nan
+    plot_df, info = downsample_line(line_df, "t", "v", max_points=2_000)
+    assert len(plot_df) == 2_000 and plot_df["t"].is_monotonic_increasing
+    assert not plot_df["v"].isnull().any() and info["total"] == len(line_df)
+    small_df, info_small = downsample_line(line_df.head(100), "t", "v", max_points=2_000)
+    assert info_small is None and small_df is not None and len(small_df) == 100
+    print(f"  • Courbe triée, plafonnée, NaN écartés: OK")
+
+    # Nuage: un amas dense et quelques points isolés
+    cloud = pd.DataFrame({
+        "a": np.concatenate([rng.normal(0, 1, 200_000), [40.0, -40.0, 35.0]]),
+        "b": np.concatenate([rng.normal(0, 1, 200_000), [40.0, 30.0, -35.0]]),
+    })
+    plot_df, info = downsample_scatter(cloud, "a", "b", max_points=5_000, grid_size=32)
+    assert len(plot_df) <= 5_000 + 32 * 32 and info["shown"] == len(plot_df)
+    assert {200_000, 200_001, 200_002} <= set(plot_df.index)
+    # Densité: la part des points du cœur (|a|, |b| < 1) reste proche de celle des données
+    core = lambda frame: ((frame["a"].abs() < 1) & (frame["b"].abs() < 1)).mean()
+    assert abs(core(plot_df) - core(cloud)) < 0.05
+    print(f"  • Nuage stratifié: {len(plot_df):,} points, isolés conservés, densité: OK")
+
+    assert "échantillon stratifié" in downsampling_caption(info)
+    print("  ✅ Sous-échantillonnage: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 21: Graphiques agrégés côté serveur
+print("\n✅ TEST 21: Graphiques agrégés")
+try:
+    from utils.chart_aggregation import (
+        histogram_bins, box_stats, kde_curve, histogram_figure, box_figure, violin_figure
+    )
+
+    rng = np.random.default_rng(5)
+    values = pd.Series(np.concatenate([rng.normal(50, 10, 100_000), [500.0, -400.0, np.nan]]), name="mesure")
+    edges, counts = histogram_bins(values, 30)
+    assert len(edges) == 31 and counts.sum() == 100_002
+    print(f"  • Histogramme: {len(counts)} intervalles, effectifs complets: OK")
+
+    stats = box_stats(values, max_outliers=50)
+    q1, q3 = np.nanquantile(values, [0.25, 0.75])
+    assert np.isclose(stats["q1"], q1) and np.isclose(stats["q3"], q3)
+    assert stats["lowerfence"] >= q1 - 1.5 * (q3 - q1) and stats["upperfence"] <= q3 + 1.5 * (q3 - q1)
+    assert len(stats["outliers"]) <= 50 and {500.0, -400.0} <= set(stats["outliers"])
+    print(f"  • Boîte: quartiles, moustaches, extrêmes conservés: OK")
+
+    grid, density = kde_curve(values.head(20_000))
+    step = grid[1] - grid[0]
+    assert np.isclose(density.sum() * step, 1.0) and abs(grid[np.argmax(density)] - 50) < 2
+    print(f"  • Densité KDE binée: intégrale 1, mode ≈ 50: OK")
+
+    # Taille du graphique indépendante du nombre de lignes
+    small, large = values.head(1_000), values
+    for build in (histogram_figure, violin_figure):
+        assert abs(len(build(small).to_json()) - len(build(large).to_json())) < 5_000
+    assert len(box_figure(pd.DataFrame({"mesure": large}), ["mesure"]).to_json()) < 30_000
+    print(f"  • Taille du graphique constante: OK")
+
+    print("  ✅ Graphiques agrégés: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 22: Rendu en densité
+print("\n✅ TEST 22: Rendu en densité")
+try:
+    from utils.density_raster import can_rasterize, axis_bounds, density_raster, raster_figure
+
+    rng = np.random.default_rng(6)
+    cloud = pd.DataFrame({
+        "a": rng.normal(0, 1, 300_000),
+        "b": rng.normal(0, 1, 300_000),
+        "c": rng.choice(["x", "y"], 300_000),
+    })
+    cloud.loc[:9, "a"] = np.nan
+    assert can_rasterize(cloud, "a", "b") and not can_rasterize(cloud, "a", "c")
+
+    raster = density_raster(cloud, "a", "b", width=80, height=60)
+    assert raster["counts"].shape == (60, 80) and raster["in_view"] == raster["total"] == 299_990
+    valid = cloud.dropna(subset=["a"])
+    expected = np.histogram2d(valid["b"], valid["a"], bins=[60, 80],
+                              range=[raster["y_range"], raster["x_range"]])[0]
+    assert np.abs(raster["counts"] - expected).sum() <= 2 * 80
+    print(f"  • Grille {raster['counts'].shape}: tous les points comptés, conforme à histogram2d: OK")
+
+    zoom = density_raster(cloud, "a", "b", (0.0, 1.0), (-0.5, 0.5), width=80, height=60)
+    in_window = ((valid["a"] >= 0) & (valid["a"] <= 1) & (valid["b"] >= -0.5) & (valid["b"] <= 0.5)).sum()
+    assert zoom["in_view"] == in_window and zoom["x_range"] == (0.0, 1.0)
+    print(f"  • Zoom: {zoom['in_view']:,} points recomptés dans la fenêtre: OK")
+
+    fig = raster_figure(raster, "a", "b")
+    assert fig.layout.images[0].source.startswith("data:image/png;base64,")
+    assert len(fig.to_json()) < 200_000
+    print(f"  • Image PNG: {len(fig.to_json()) // 1024} ko: OK")
+
+    print("  ✅ Rendu en densité: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 23: Cache des graphiques
+print("\n✅ TEST 23: Cache des graphiques")
+try:
+    import json
+    import plotly.graph_objects as go
+    from utils.figure_cache import cached_figure, cache_stats, clear_figure_cache
+    from utils.fingerprint import mark_modified
+
+    clear_figure_cache()
+    chart_df = pd.DataFrame({"x": np.arange(1_000), "y": np.arange(1_000) ** 2})
+    builds = []
+
+    def build():
+        builds.append(1)
+        return go.Figure(go.Scatter(x=chart_df["x"], y=chart_df["y"])), "note"
+
+    fig, note = cached_figure(chart_df, ("scatter", "x", "y"), build)
+    fig_again, note_again = cached_figure(chart_df, ("scatter", "x", "y"), build)
+    assert len(builds) == 1 and note_again == "note"
+    assert json.loads(fig_again.to_json()) == json.loads(fig.to_json())
+    assert cache_stats()["hits"] == 1 and cache_stats()["misses"] == 1
+    print(f"  • Figure reprise du cache (contenu identique): OK")
+
+    cached_figure(chart_df, ("scatter", "y", "x"), build)
+    mark_modified(chart_df)
+    cached_figure(chart_df, ("scatter", "x", "y"), build)
+    assert len(builds) == 3
+    print(f"  • Nouvelle description ou nouvelle version: reconstruite: OK")
+
+    # Budget mémoire: seules les figures les plus récentes restent
+    size = cache_stats()["bytes"] // cache_stats()["entries"]
+    clear_figure_cache()
+    for i in range(5):
+        cached_figure(chart_df, ("scatter", i), build, max_bytes=int(size * 2.5))
+    stats = cache_stats()
+    assert stats["entries"] == 2 and stats["bytes"] <= size * 2.5
+    cached_figure(chart_df, ("scatter", 4), build, max_bytes=int(size * 2.5))
+    cached_figure(chart_df, ("scatter", 0), build, max_bytes=int(size * 2.5))
+    assert cache_stats()["hits"] == 1 and cache_stats()["misses"] == 6
+    cached_figure(chart_df, ("trop grand",), build, max_bytes=size // 2)
+    assert cache_stats()["entries"] <= 2
+    print(f"  • Éviction par taille (LRU), figure trop grande ignorée: OK")
+
+    clear_figure_cache()
+    print("  ✅ Cache des graphiques: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 24: Politique de rendu (WebGL, barres agrégées)
+print("\n✅ TEST 24: Politique de rendu")
+try:
+    import plotly.express as px
+    from utils.render_policy import render_mode, aggregate_bars, bar_caption
+    from config import WEBGL_THRESHOLD, WEBGL_LINE_THRESHOLD
+
+    assert render_mode(WEBGL_THRESHOLD) == "svg" and render_mode(WEBGL_THRESHOLD + 1) == "webgl"
+    assert render_mode(WEBGL_THRESHOLD + 1, "line") == "svg"
+    assert render_mode(WEBGL_LINE_THRESHOLD + 1, "line") == "webgl"
+    n_gl = WEBGL_THRESHOLD + 1
+    fig = px.scatter(pd.DataFrame({"a": range(n_gl), "b": range(n_gl)}), x="a", y="b",
+                     render_mode=render_mode(n_gl))
+    assert fig.data[0].type == "scattergl"
+    print(f"  • WebGL au-delà de {WEBGL_THRESHOLD:,} points: OK")
+
+    rng = np.random.default_rng(7)
+    sales = pd.DataFrame({
+        "magasin": rng.choice([f"m{i}" for i in range(80)], 50_000),
+        "montant": rng.gamma(2.0, 10.0, 50_000),
+    })
+    bars, info = aggregate_bars(sales, "magasin", "montant", max_categories=20)
+    expected = sales.groupby("magasin")["montant"].sum().nlargest(20)
+    assert len(bars) == 20 and info["categories"] == 80 and info["rows"] == 50_000
+    assert np.allclose(bars.set_index("magasin")["montant"].sort_index(), expected.sort_index())
+    assert "20 catégories" in bar_caption(info, "montant")
+    print(f"  • Barres sommées par catégorie, {len(bars)} plus grands totaux sur 80: OK")
+
+    small, info_small = aggregate_bars(sales.head(100), "magasin", "montant")
+    text_bars, info_text = aggregate_bars(sales, "montant", "magasin")
+    assert info_small is None and len(small) == 100 and info_text is None
+    print(f"  • Petits volumes et y non numérique inchangés: OK")
+
+    print("  ✅ Politique de rendu: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 25: Registre des modèles entraînés
+print("\n✅ TEST 25: Registre des modèles")
+try:
+    import pickle
+    import tempfile
+    from utils.model_registry import get_trained_model, clear_model_cache, model_key, model_path
+    from utils.fingerprint import mark_modified
+
+    rng = np.random.default_rng(8)
+    model_df = pd.DataFrame({
+        "surface": rng.uniform(20, 200, 2_000),
+        "quartier": rng.choice(["nord", "sud", "est"], 2_000),
+    })
+    model_df["prix"] = 3_000 * model_df["surface"] + rng.normal(0, 10_000, 2_000)
+    sample = {"surface": 80.0, "quartier": "sud"}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clear_model_cache()
+        model, source = get_trained_model(model_df, "prix", models_dir=tmp_dir, n_estimators=20)
+        assert source == "trained" and model.scores["test_score"] > 0.9
+        again, source = get_trained_model(model_df, "prix", models_dir=tmp_dir, n_estimators=20)
+        assert source == "memory" and again is model
+        print(f"  • Entraîné une fois, repris de la mémoire: OK")
+
+        assert not hasattr(model, "df") and len(pickle.dumps(model)) < 5_000_000
+        clear_model_cache()
+        loaded, source = get_trained_model(model_df, "prix", models_dir=tmp_dir, n_estimators=20)
+        assert source == "disk" and loaded.predict(sample) == model.predict(sample)
+        assert model_path(tmp_dir, model_key(model_df, "prix", n_estimators=20)).exists()
+        assert loaded.get_feature_importance().keys() == {"surface", "quartier"}
+        print(f"  • Rechargé du disque sans données, même prédiction: OK")
+
+        _, source = get_trained_model(model_df, "prix", models_dir=tmp_dir, n_estimators=30)
+        assert source == "trained"
+        # Autre jeu de données de même forme: ni la mémoire ni le disque ne servent l'ancien modèle
+        revised_df = model_df.copy()
+        revised_df["prix"] = -revised_df["prix"]
+        clear_model_cache()
+        revised, source = get_trained_model(revised_df, "prix", models_dir=tmp_dir, n_estimators=20)
+        assert source == "trained" and revised.predict(sample) < 0
+        model_df.loc[5, "surface"] = 1_000.0
+        mark_modified(model_df)
+        _, source = get_trained_model(model_df, "prix", models_dir=tmp_dir, n_estimators=20)
+        assert source == "trained"
+        print(f"  • Autres paramètres ou nouvelles données: réentraîné: OK")
+
+    clear_model_cache()
+    print("  ✅ Registre des modèles: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 26: Répartition des cœurs et prédiction par lots
+print("\n✅ TEST 26: Planificateur CPU")
+try:
+    import threading
+    import time
+    from utils.cpu_scheduler import CpuScheduler, available_cpus
+    from utils.ml_model import PredictionModel
+
+    assert available_cpus() >= 1
+    scheduler = CpuScheduler(total=4, user_max=0)
+    with scheduler.reserve(owner="a") as granted:
+        assert granted == 4 and scheduler.free == 0
+    with scheduler.reserve(2, owner="a") as granted:
+        assert granted == 2 and scheduler.share("b") == 2
+    with CpuScheduler(total=8, user_max=3).reserve(owner="a") as granted:
+        assert granted == 3
+    print(f"  • Part équitable et plafond par utilisateur: OK")
+
+    # Réservations concurrentes: jamais plus de cœurs que le budget
+    peak, lock = [0], threading.Lock()
+
+    def job(owner):
+        with scheduler.reserve(4, owner=owner) as granted:
+            with lock:
+                peak[0] = max(peak[0], scheduler.total - scheduler.free)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=job, args=(f"user{i % 3}",)) for i in range(9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert peak[0] <= 4 and scheduler.free == 4 and not any(t.is_alive() for t in threads)
+    print(f"  • 9 réservations concurrentes, pic {peak[0]} / 4 cœurs: OK")
+
+    rng = np.random.default_rng(9)
+    batch_df = pd.DataFrame({"x": rng.normal(size=3_000), "g": rng.choice(["a", "b"], 3_000)})
+    batch_df["y"] = 2 * batch_df["x"] + (batch_df["g"] == "a")
+    model = PredictionModel(batch_df, "y", n_estimators=10)
+    model.train(owner="test")
+    rows = batch_df.head(20)
+    batch = model.predict_batch(rows)
+    single = [model.predict(row) for row in rows.drop(columns="y").to_dict("records")]
+    assert np.allclose(batch, single) and model.model.n_jobs is None
+    print(f"  • Prédiction par lots identique ligne à ligne: OK")
+
+    print("  ✅ Planificateur CPU: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
+# Test 27: Moteur gradient boosting (histogrammes)
+print("\n✅ TEST 27: Gradient boosting")
+try:
+    from utils.ml_model import PredictionModel, resolve_backend
+    from utils.model_registry import model_key
+    from config import HGB_ROW_THRESHOLD, HGB_MAX_ITER
+
+    assert resolve_backend("auto", HGB_ROW_THRESHOLD) == "rf"
+    assert resolve_backend("auto", HGB_ROW_THRESHOLD + 1) == "hgb" and resolve_backend("rf", 10**9) == "rf"
+    print(f"  • Choix automatique au-delà de {HGB_ROW_THRESHOLD:,} lignes: OK")
+
+    rng = np.random.default_rng(10)
+    n = 20_000
+    hgb_df = pd.DataFrame({
+        "x": rng.normal(size=n),
+        "segment": rng.choice(["a", "b", "c", "d"], n),
+        "bruit": rng.normal(size=n),
+    })
+    hgb_df["y"] = 2 * hgb_df["x"] + hgb_df["segment"].map({"a": 0, "b": 3, "c": -3, "d": 6}) + rng.normal(0, 0.1, n)
+    hgb_df.loc[rng.random(n) < 0.1, "x"] = np.nan
+
+    model = PredictionModel(hgb_df, "y", backend="hgb")
+    assert model.X["x"].isnull().any() and model.categorical_mask == [False, True, False]
+    scores = model.train()
+    assert scores["test_score"] > 0.8 and model.model.n_iter_ < HGB_MAX_ITER
+    print(f"  • Manquants et catégories natifs, arrêt anticipé à {model.model.n_iter_} itérations: OK")
+
+    importance = model.get_feature_importance()
+    assert np.isclose(sum(importance.values()), 1.0) and importance["bruit"] < importance["segment"]
+    prediction = model.predict({"x": np.nan, "segment": "d", "bruit": 0.0})
+    unknown = model.predict({"x": 1.0, "segment": "inconnu", "bruit": 0.0})
+    assert np.isfinite(prediction) and np.isfinite(unknown)
+    assert np.allclose(model.predict_batch(hgb_df.head(50)), [model.predict(r) for r in hgb_df.head(50).to_dict("records")])
+    print(f"  • Importance par permutation, prédictions (NaN, modalité inconnue): OK")
+
+    assert model_key(hgb_df, "y", backend="hgb") != model_key(hgb_df, "y", backend="rf")
+    assert model_key(hgb_df, "y") == model_key(hgb_df, "y", backend="rf")
+    print(f"  • Moteur inclus dans la clé du registre: OK")
+
+    print("  ✅ Gradient boosting: TOUT FONCTIONNE!")
+except Exception as e:
+    print(f"  ❌ Erreur: {e}")
+
 print("\n" + "=" * 80)
 print("🎉 TOUS LES TESTS RÉUSSIS!")
 print("=" * 80)
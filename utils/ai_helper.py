@@ -8,6 +8,9 @@ import pandas as pd
 import numpy as np
 import requests
 from difflib import SequenceMatcher
+from utils.profiler import get_profile
+from utils.correlation import correlation_matrix, top_pairs
+from utils.outliers import outlier_report
 
 
 def fuzzy_contains(text, keywords, threshold=0.75):
@@ -36,27 +39,29 @@ class DataAnalyzerAI:
     
     def _analyze_data(self):
         """Analyse complète du DataFrame"""
+        profile = get_profile(self.df)
         self.analysis_cache = {
             'shape': (len(self.df), len(self.df.columns)),
             'columns': self.df.columns.tolist(),
             'dtypes': {col: str(self.df[col].dtype) for col in self.df.columns},
-            'missing': self.df.isnull().sum().to_dict(),
-            'duplicates': len(self.df[self.df.duplicated()]),
+            'missing': profile.missing.to_dict(),
+            'duplicates': profile.duplicates,
             'numeric_cols': self.df.select_dtypes(include=[np.number]).columns.tolist(),
-            'categorical_cols': self.df.select_dtypes(include=['object']).columns.tolist(),
+            'categorical_cols': self.df.select_dtypes(include=['object', 'category']).columns.tolist(),
             'stats': {}
         }
         
-        # Statistiques pour colonnes numériques
+        # Statistiques pour colonnes numériques (issues du profil)
         for col in self.analysis_cache['numeric_cols']:
+            col_stats = profile.numeric.loc[col]
             self.analysis_cache['stats'][col] = {
-                'mean': float(self.df[col].mean()),
-                'median': float(self.df[col].median()),
-                'min': float(self.df[col].min()),
-                'max': float(self.df[col].max()),
-                'std': float(self.df[col].std()),
-                'q25': float(self.df[col].quantile(0.25)),
-                'q75': float(self.df[col].quantile(0.75)),
+                'mean': float(col_stats['mean']),
+                'median': float(col_stats['median']),
+                'min': float(col_stats['min']),
+                'max': float(col_stats['max']),
+                'std': float(col_stats['std']),
+                'q25': float(col_stats['q25']),
+                'q75': float(col_stats['q75']),
                 'trend': self._calculate_trend(self.df[col])
             }
     
@@ -391,29 +396,31 @@ def _build_advanced_context(df) -> str:
     """
     Construit un contexte enrichi avec corrélations, distributions, tendances
     """
+    profile = get_profile(df)
     lines = []
     lines.append(f"CONTEXTE DONNÉES:")
     lines.append(f"- Nombre total de lignes: {len(df)}")
     lines.append(f"- Nombre de colonnes: {len(df.columns)}")
     
     # Séparer numérique et catégorique
-    numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
     
     # === STATISTIQUES DESCRIPTIVES AVANCÉES ===
     if numeric_cols:
         lines.append(f"\nSTATISTIQUES DESCRIPTIVES ({len(numeric_cols)} colonnes numériques):")
         for col in numeric_cols:
             try:
-                col_data = df[col].dropna()
-                if len(col_data) > 0:
-                    mean_val = col_data.mean()
-                    std_val = col_data.std()
-                    min_val = col_data.min()
-                    max_val = col_data.max()
-                    median_val = col_data.median()
-                    q1 = col_data.quantile(0.25)
-                    q3 = col_data.quantile(0.75)
+                col_stats = profile.numeric.loc[col]
+                if col_stats['count'] > 0:
+                    col_data = df[col].dropna()
+                    mean_val = col_stats['mean']
+                    std_val = col_stats['std']
+                    min_val = col_stats['min']
+                    max_val = col_stats['max']
+                    median_val = col_stats['median']
+                    q1 = col_stats['q25']
+                    q3 = col_stats['q75']
                     
                     # Calculer la variabilité (coefficient de variation)
                     cv = (std_val / mean_val * 100) if mean_val != 0 else 0
@@ -436,22 +443,15 @@ def _build_advanced_context(df) -> str:
     # === CORRÉLATIONS ENTRE VARIABLES ===
     if len(numeric_cols) > 1:
         try:
-            corr_matrix = df[numeric_cols].corr()
+            # Matrice en cache (une fois par version des données), paires triées par |r|
+            corr_matrix = correlation_matrix(df, columns=numeric_cols)
             lines.append(f"\nCORRÉLATIONS ENTRE VARIABLES:")
             
-            # Trouvez les paires de corrélations importantes
-            important_corrs = []
-            for i in range(len(numeric_cols)):
-                for j in range(i+1, len(numeric_cols)):
-                    corr_val = corr_matrix.iloc[i, j]
-                    if abs(corr_val) > 0.3:  # Seuil de corrélation significative
-                        important_corrs.append((numeric_cols[i], numeric_cols[j], corr_val))
-            
-            # Trier par valeur absolue
-            important_corrs.sort(key=lambda x: abs(x[2]), reverse=True)
+            # Top 10 des paires au-dessus du seuil de corrélation significative
+            important_corrs = top_pairs(corr_matrix, k=10, threshold=0.3)
             
             if important_corrs:
-                for var1, var2, corr_val in important_corrs[:10]:  # Top 10
+                for var1, var2, corr_val in important_corrs:
                     strength = "Très forte" if abs(corr_val) > 0.8 else ("Forte" if abs(corr_val) > 0.6 else ("Modérée" if abs(corr_val) > 0.4 else "Faible"))
                     direction = "positive" if corr_val > 0 else "négative"
                     lines.append(f"  • {var1} ↔ {var2}: {corr_val:.3f} ({strength} {direction})")
@@ -461,8 +461,8 @@ def _build_advanced_context(df) -> str:
             lines.append(f"\nCORRÉLATIONS: Erreur - {e}")
     
     # === QUALITÉ DES DONNÉES ===
-    missing_total = df.isnull().sum().sum()
-    duplicates = df.duplicated().sum()
+    missing_total = profile.missing_total
+    duplicates = profile.duplicates
     
     if missing_total > 0 or duplicates > 0:
         lines.append(f"\nQUALITÉ DES DONNÉES:")
@@ -477,7 +477,7 @@ def _build_advanced_context(df) -> str:
         lines.append(f"\nCOLONNES CATÉGORIQUE:")
         for col in categorical_cols[:3]:  # Max 3 pour ne pas surcharger
             try:
-                unique_count = df[col].nunique()
+                unique_count = profile.distinct_label(col)
                 lines.append(f"  • {col}: {unique_count} catégories uniques")
             except Exception:
                 pass
@@ -493,7 +493,7 @@ def try_huggingface_api(question: str, df=None) -> str:
         # Construire un contexte MINIMALISTE mais efficace
         context_text = ""
         if df is not None and len(df) > 0:
-            numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
             
             # Stats simples et rapides
             context_text = f"Rows: {len(df)}, Cols: {len(df.columns)}\n"
@@ -579,6 +579,11 @@ def generate_local_insight(question: str, df) -> str:
     lignes, colonnes = df.shape
     
     try:
+        # Manquants, doublons et statistiques: profil en cache (une passe par version des données)
+        profile = get_profile(df)
+        null_total = profile.missing_total
+        null_pct = null_total / (lignes * colonnes) * 100
+
         # === QUESTIONS SUR LES DONNÉES GÉNÉRALES ===
         if any(word in question_lower for word in ["combien", "nombre", "how many", "total", "count"]):
             if any(word in question_lower for word in ["ligne", "row", "observation", "record"]):
@@ -593,16 +598,14 @@ def generate_local_insight(question: str, df) -> str:
             if len(df.columns) > 5:
                 col_names += f", ... ({len(df.columns) - 5} autres)"
             numeric_count = len(df.select_dtypes(include=['number']).columns)
-            cat_count = len(df.select_dtypes(include=['object']).columns)
+            cat_count = len(df.select_dtypes(include=['object', 'category']).columns)
             return f"📋 Colonnes: {col_names}\n💡 **{numeric_count} numériques**, **{cat_count} catégoriques**. Conseil: Les colonnes numériques sont idéales pour les graphiques et prédictions."
         
         # === QUESTIONS SUR LES VALEURS MANQUANTES ===
         if any(word in question_lower for word in ["manquant", "null", "missing", "vide", "empty", "nan"]):
-            nulls = df.isnull().sum()
-            null_total = nulls.sum()
+            nulls = profile.missing
             if null_total == 0:
                 return "✅ **Aucune valeur manquante** - vos données sont complètes ! 💡 Conseil: Excellente qualité, vous pouvez procéder directement à l'analyse."
-            null_pct = (null_total / (lignes * colonnes) * 100)
             top_nulls = nulls[nulls > 0].nlargest(3)
             top_text = ", ".join([f"**{col}**: {count} ({count/lignes*100:.1f}%)" for col, count in top_nulls.items()])
             advice = "💡 Conseil: Utilisez l'onglet Nettoyage → 'Traiter valeurs manquantes' pour les remplacer par moyenne/médiane ou supprimer les lignes."
@@ -610,7 +613,7 @@ def generate_local_insight(question: str, df) -> str:
         
         # === QUESTIONS SUR LES DOUBLONS ===
         if any(word in question_lower for word in ["duplic", "duplicate", "doublon", "répété", "identique"]):
-            duplicates = df.duplicated().sum()
+            duplicates = profile.duplicates
             if duplicates == 0:
                 return "✅ **Aucun doublon** détecté - données uniques ! 💡 Conseil: Bonne qualité, pas besoin de nettoyage pour les doublons."
             dup_pct = (duplicates / lignes * 100)
@@ -657,12 +660,12 @@ def generate_local_insight(question: str, df) -> str:
             stats_lines = []
             for col in numeric_cols[:5]:
                 try:
-                    col_data = df[col].dropna()
-                    if len(col_data) > 0:
-                        mean_val = col_data.mean()
-                        std_val = col_data.std()
-                        min_val = col_data.min()
-                        max_val = col_data.max()
+                    col_stats = profile.numeric.loc[col]
+                    if col_stats['count'] > 0:
+                        mean_val = col_stats['mean']
+                        std_val = col_stats['std']
+                        min_val = col_stats['min']
+                        max_val = col_stats['max']
                         stats_lines.append(f"**{col}**: μ={mean_val:.2f} ± {std_val:.2f}, [{min_val:.2f}, {max_val:.2f}]")
                 except:
                     pass
@@ -707,19 +710,17 @@ def generate_local_insight(question: str, df) -> str:
                 return "❌ Besoin d'au moins 2 colonnes numériques. 💡 Conseil: Ajoutez plus de variables numériques ou utilisez l'encodage pour les catégoriques."
             
             try:
-                corr_matrix = df[numeric_cols].corr()
+                corr_matrix = correlation_matrix(df, columns=numeric_cols)
                 corr_pairs = []
                 
-                for i in range(len(corr_matrix.columns)):
-                    for j in range(i+1, len(corr_matrix.columns)):
-                        corr_val = corr_matrix.iloc[i, j]
-                        if abs(corr_val) > 0.3:  # Corrélation significative
-                            strength = "très forte" if abs(corr_val) > 0.7 else "forte" if abs(corr_val) > 0.5 else "modérée"
-                            direction = "positive" if corr_val > 0 else "négative"
-                            corr_pairs.append(f"🔗 **{corr_matrix.columns[i]}** ↔ **{corr_matrix.columns[j]}**: {corr_val:.3f} ({strength} {direction})")
+                # 5 paires les plus fortes au-dessus du seuil de corrélation significative
+                for var1, var2, corr_val in top_pairs(corr_matrix, k=5, threshold=0.3):
+                    strength = "très forte" if abs(corr_val) > 0.7 else "forte" if abs(corr_val) > 0.5 else "modérée"
+                    direction = "positive" if corr_val > 0 else "négative"
+                    corr_pairs.append(f"🔗 **{var1}** ↔ **{var2}**: {corr_val:.3f} ({strength} {direction})")
                 
                 if corr_pairs:
-                    result = "Corrélations détectées:\n" + "\n".join(corr_pairs[:5])
+                    result = "Corrélations détectées:\n" + "\n".join(corr_pairs)
                     result += "\n💡 Conseil: Créez un scatter plot dans Visualisation pour visualiser ces relations."
                     return result
                 return "✅ Aucune corrélation significative (|r| > 0.3). 💡 Conseil: Les variables sont indépendantes - intéressant pour la modélisation !"
@@ -732,23 +733,10 @@ def generate_local_insight(question: str, df) -> str:
             if len(numeric_cols) == 0:
                 return "❌ Pas de colonnes numériques. 💡 Conseil: Les outliers ne peuvent être détectés que sur des données numériques."
             
-            total_outliers = 0
-            outlier_info = []
-            for col in numeric_cols:
-                try:
-                    col_data = df[col].dropna()
-                    if len(col_data) > 0:
-                        Q1 = col_data.quantile(0.25)
-                        Q3 = col_data.quantile(0.75)
-                        IQR = Q3 - Q1
-                        lower_bound = Q1 - 1.5 * IQR
-                        upper_bound = Q3 + 1.5 * IQR
-                        outliers = ((col_data < lower_bound) | (col_data > upper_bound)).sum()
-                        total_outliers += outliers
-                        if outliers > 0:
-                            outlier_info.append(f"⚠️ **{col}**: {outliers} outliers")
-                except:
-                    pass
+            # Bornes IQR de toutes les colonnes en une passe (rapport en cache)
+            outliers = outlier_report(df, numeric_cols, method="iqr")["outliers"]
+            total_outliers = int(outliers.sum())
+            outlier_info = [f"⚠️ **{col}**: {count} outliers" for col, count in outliers.items() if count > 0]
             
             if total_outliers > 0:
                 result = f"📊 **Nombre total d'outliers**: {total_outliers}\n"
@@ -765,14 +753,12 @@ def generate_local_insight(question: str, df) -> str:
             suggestions = []
             
             # Vérifier les valeurs manquantes
-            null_total = df.isnull().sum().sum()
             if null_total > 0:
-                null_pct = (null_total / (lignes * colonnes) * 100)
                 problems.append(f"⚠️ {null_total} valeurs manquantes ({null_pct:.1f}%)")
                 suggestions.append("• Remplacer par moyenne/médiane ou supprimer les lignes avec Nettoyage → 'Traiter manquantes'")
             
             # Vérifier les doublons
-            duplicates = df.duplicated().sum()
+            duplicates = profile.duplicates
             if duplicates > 0:
                 dup_pct = (duplicates / lignes * 100)
                 problems.append(f"⚠️ {duplicates} doublons ({dup_pct:.1f}%)")
@@ -780,27 +766,14 @@ def generate_local_insight(question: str, df) -> str:
             
             # Vérifier les outliers
             numeric_cols = df.select_dtypes(include=['number']).columns
-            total_outliers = 0
-            for col in numeric_cols:
-                try:
-                    col_data = df[col].dropna()
-                    if len(col_data) > 0:
-                        Q1 = col_data.quantile(0.25)
-                        Q3 = col_data.quantile(0.75)
-                        IQR = Q3 - Q1
-                        lower_bound = Q1 - 1.5 * IQR
-                        upper_bound = Q3 + 1.5 * IQR
-                        outliers = ((col_data < lower_bound) | (col_data > upper_bound)).sum()
-                        total_outliers += outliers
-                except:
-                    pass
+            total_outliers = int(outlier_report(df, numeric_cols, method="iqr")["outliers"].sum()) if len(numeric_cols) else 0
             
             if total_outliers > 0:
                 problems.append(f"⚠️ {total_outliers} outliers détectés")
                 suggestions.append("• Traiter les valeurs extrêmes avec Nettoyage → 'Traiter outliers'")
             
             # Vérifier les types de données
-            cat_cols = df.select_dtypes(include=['object']).columns
+            cat_cols = df.select_dtypes(include=['object', 'category']).columns
             if len(cat_cols) > 0 and len(numeric_cols) == 0:
                 problems.append("⚠️ Aucune colonne numérique")
                 suggestions.append("• Encoder les colonnes textuelles pour les analyses numériques")
@@ -826,31 +799,21 @@ def generate_local_insight(question: str, df) -> str:
             original_lines = lignes
             
             # Lignes supprimées pour doublons
-            duplicates = df.duplicated().sum()
+            duplicates = profile.duplicates
             lines_after_dedup = original_lines - duplicates
             
             # Lignes supprimées pour valeurs manquantes (estimation)
-            null_pct = (df.isnull().sum().sum() / (lignes * colonnes) * 100)
             # Supposons qu'on supprime les lignes avec >50% de valeurs manquantes
-            rows_with_many_nulls = (df.isnull().sum(axis=1) / colonnes > 0.5).sum()
+            rows_with_many_nulls = (df.isnull().sum(axis=1) / colonnes > 0.5).sum() if null_total else 0
             lines_after_nulls = lines_after_dedup - rows_with_many_nulls
             
             # Lignes supprimées pour outliers (estimation prudente)
             numeric_cols = df.select_dtypes(include=['number']).columns
             estimated_outlier_rows = 0
-            for col in numeric_cols:
-                try:
-                    col_data = df[col].dropna()
-                    if len(col_data) > 0:
-                        Q1 = col_data.quantile(0.25)
-                        Q3 = col_data.quantile(0.75)
-                        IQR = Q3 - Q1
-                        lower_bound = Q1 - 1.5 * IQR
-                        upper_bound = Q3 + 1.5 * IQR
-                        outlier_rows = ((col_data < lower_bound) | (col_data > upper_bound)).sum()
-                        estimated_outlier_rows += outlier_rows * 0.1  # Estimation prudente
-                except:
-                    pass
+            if len(numeric_cols):
+                # Bornes IQR à partir des quartiles du profil (rapport en cache)
+                outlier_rows = outlier_report(df, numeric_cols, method="iqr")["outliers"].sum()
+                estimated_outlier_rows = outlier_rows * 0.1  # Estimation prudente
             
             final_lines = max(1, int(lines_after_nulls - estimated_outlier_rows))
             
@@ -874,8 +837,7 @@ def generate_local_insight(question: str, df) -> str:
         
         # === QUESTIONS SUR LE NETTOYAGE ===
         if any(word in question_lower for word in ["qualité", "quality", "nettoyer", "clean", "problème", "issue", "améliorer"]):
-            null_pct = (df.isnull().sum().sum() / (lignes * colonnes) * 100)
-            duplicates = df.duplicated().sum()
+            duplicates = profile.duplicates
             quality_score = 100 - null_pct - (duplicates / lignes * 100)
             
             result = f"✨ **Qualité des données**: {quality_score:.1f}/100\n"
@@ -900,14 +862,13 @@ def generate_local_insight(question: str, df) -> str:
         # === QUESTIONS GÉNÉRALES SUR LES DONNÉES ===
         if any(word in question_lower for word in ["quoi", "what", "tell", "dis", "info", "informations", "donne", "résumé", "summary", "aperçu", "overview"]):
             numeric_cols = df.select_dtypes(include=['number']).columns
-            categorical_cols = df.select_dtypes(include=['object']).columns
-            null_pct = (df.isnull().sum().sum() / (lignes * colonnes) * 100)
+            categorical_cols = df.select_dtypes(include=['object', 'category']).columns
             
             summary = f"📊 **Aperçu de vos données:**\n"
             summary += f"- **{lignes}** lignes × **{colonnes}** colonnes\n"
             summary += f"- **{len(numeric_cols)}** colonnes numériques, **{len(categorical_cols)}** colonnes textuelles\n"
             summary += f"- **{null_pct:.1f}%** valeurs manquantes\n"
-            summary += f"- **{df.duplicated().sum()}** doublons\n"
+            summary += f"- **{profile.duplicates}** doublons\n"
             summary += f"\n💡 **Prochaines étapes recommandées:**\n"
             summary += f"1. Nettoyez les données (si nécessaire)\n"
             summary += f"2. Explorez avec Visualisation\n"
@@ -930,9 +891,10 @@ def generate_smart_response(question: str, context: str = None, df=None) -> str:
         try:
             lignes = int(len(df))
             colonnes = int(df.shape[1])
-            doublons = int(df.duplicated().sum())
-            missing_total = int(df.isnull().sum().sum())
-            missing_by_col = (df.isnull().sum() / len(df) * 100).sort_values(ascending=False)
+            profile = get_profile(df)
+            doublons = int(profile.duplicates)
+            missing_total = int(profile.missing_total)
+            missing_by_col = (profile.missing / len(df) * 100).sort_values(ascending=False)
             numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
         except Exception:
             lignes = extract_number(context, "lignes")
@@ -1004,8 +966,8 @@ def generate_smart_response(question: str, context: str = None, df=None) -> str:
         if df is not None and len(numeric_cols) > 0:
             sample_stats = []
             for c in numeric_cols[:3]:
-                mean = df[c].mean()
-                median = df[c].median()
+                mean = profile.numeric.loc[c, 'mean']
+                median = profile.numeric.loc[c, 'median']
                 sample_stats.append(f"{c}⇒ mean={mean:.2f}, median={median:.2f}")
             return "📊 Exemples de stats: " + "; ".join(sample_stats)
         return "📊 L'onglet Analyse affiche les stats : min, max, moyenne, médiane par colonne."
@@ -0,0 +1,175 @@
+"""
+Graphiques de distribution agrégés côté serveur
+Histogrammes, boîtes à moustaches et violons calculés avec NumPy: seuls les
+agrégats (effectifs, quartiles, densité) partent vers le navigateur, quelle
+que soit la taille du jeu de données
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from config import HISTOGRAM_BINS, BOX_MAX_OUTLIER_POINTS, KDE_GRID_POINTS
+
+
+def _finite(values) -> np.ndarray:
+    """Valeurs float64 sans manquants ni infinis"""
+    if isinstance(values, pd.Series):
+        values = values.to_numpy(dtype=float, na_value=np.nan)
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values)]
+
+
+def histogram_bins(values, nbins: int = HISTOGRAM_BINS):
+    """
+    Intervalles et effectifs d'un histogramme
+
+    Returns:
+        (bornes des intervalles, effectifs), nbins + 1 et nbins valeurs
+    """
+    values = _finite(values)
+    if len(values) == 0:
+        return np.array([0.0, 1.0]), np.array([0])
+    counts, edges = np.histogram(values, bins=nbins)
+    return edges, counts
+
+
+def box_stats(values, max_outliers: int = BOX_MAX_OUTLIER_POINTS) -> dict:
+    """
+    Résumé d'une boîte à moustaches (convention de Tukey, comme Plotly)
+
+    Returns:
+        dict: q1, median, q3, lowerfence, upperfence (valeurs extrêmes dans
+        1.5 IQR), mean, count et outliers (au plus `max_outliers` points,
+        répartis sur les rangs: les extrêmes sont toujours inclus)
+    """
+    values = _finite(values)
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = np.sort(values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)])
+    if len(outliers) > max_outliers:
+        outliers = outliers[np.unique(np.linspace(0, len(outliers) - 1, max_outliers).round().astype(np.intp))]
+    return {
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lowerfence": float(inside.min()),
+        "upperfence": float(inside.max()),
+        "mean": float(values.mean()),
+        "count": int(len(values)),
+        "outliers": outliers,
+    }
+
+
+def kde_curve(values, grid_points: int = KDE_GRID_POINTS):
+    """
+    Densité par noyau gaussien estimée sur une grille (KDE binée)
+
+    Les valeurs sont d'abord comptées sur `grid_points` intervalles, puis le
+    comptage est lissé par convolution: coût linéaire en nombre de lignes.
+    Largeur de bande: règle empirique de Silverman (1.06 σ n^(-1/5)).
+
+    Returns:
+        (grille, densité), None si moins de deux valeurs distinctes
+    """
+    values = _finite(values)
+    if len(values) < 2 or values.min() == values.max():
+        return None
+    bandwidth = 1.06 * values.std(ddof=1) * len(values) ** (-1 / 5)
+    low, high = values.min() - 3 * bandwidth, values.max() + 3 * bandwidth
+    counts, edges = np.histogram(values, bins=grid_points, range=(low, high))
+    grid = (edges[:-1] + edges[1:]) / 2
+    step = edges[1] - edges[0]
+
+    half_width = int(np.ceil(4 * bandwidth / step))
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(counts, kernel, mode="full")[half_width:half_width + grid_points]
+    density /= density.sum() * step
+    return grid, density
+
+
+def histogram_figure(series: pd.Series, nbins: int = HISTOGRAM_BINS, title: str = None) -> go.Figure:
+    """Histogramme d'une colonne (barres précalculées)"""
+    edges, counts = histogram_bins(series, nbins)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        hovertemplate="[%{customdata[0]:.4g}, %{customdata[1]:.4g}[<br>Effectif: %{y}<extra></extra>",
+        name=str(series.name),
+    ))
+    fig.update_layout(title=title, bargap=0, xaxis_title=str(series.name), yaxis_title="count")
+    return fig
+
+
+def box_figure(df: pd.DataFrame, columns, title: str = None, color: str = None) -> go.Figure:
+    """Boîtes à moustaches précalculées, une par colonne (nom de la colonne en abscisse)"""
+    fig = go.Figure()
+    for col in columns:
+        stats = box_stats(df[col])
+        if stats is None:
+            continue
+        position = [str(col)]
+        fig.add_trace(go.Box(
+            x=position,
+            q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+            lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+            mean=[stats["mean"]],
+            name=str(col),
+            marker_color=color,
+            showlegend=False,
+        ))
+        _add_outlier_points(fig, position, stats, color)
+    fig.update_layout(title=title)
+    return fig
+
+
+def violin_figure(series: pd.Series, title: str = None, color: str = None) -> go.Figure:
+    """Violon d'une colonne: densité KDE symétrique et boîte intérieure précalculées"""
+    fig = go.Figure()
+    curve = kde_curve(series)
+    stats = box_stats(series)
+    if curve is not None:
+        grid, density = curve
+        half = density / density.max() * 0.4
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([-half, half[::-1]]),
+            y=np.concatenate([grid, grid[::-1]]),
+            fill="toself",
+            mode="lines",
+            line=dict(color=color, width=1),
+            name=str(series.name),
+            hoverinfo="skip",
+            showlegend=False,
+        ))
+    if stats is not None:
+        fig.add_trace(go.Box(
+            x=[0],
+            q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+            lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+            width=0.08,
+            marker_color=color,
+            fillcolor="white",
+            name=str(series.name),
+            showlegend=False,
+        ))
+    fig.update_layout(title=title, yaxis_title=str(series.name))
+    fig.update_xaxes(showticklabels=False, zeroline=False)
+    return fig
+
+
+def _add_outlier_points(fig: go.Figure, position, stats: dict, color: str = None):
+    """Points aberrants d'une boîte (trace séparée: Plotly ne les dessine pas pour une boîte précalculée)"""
+    if len(stats["outliers"]) == 0:
+        return
+    fig.add_trace(go.Scatter(
+        x=position * len(stats["outliers"]),
+        y=stats["outliers"],
+        mode="markers",
+        marker=dict(color=color, size=4, symbol="circle-open"),
+        hovertemplate="%{y:.4g}<extra>valeur aberrante</extra>",
+        showlegend=False,
+    ))
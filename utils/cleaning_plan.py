@@ -0,0 +1,357 @@
+"""
+Plan de nettoyage différé
+Les opérations sont enregistrées puis exécutées en une seule passe fusionnée:
+un masque des lignes conservées, des colonnes remplies à la demande et une
+seule copie du tableau à la fin
+"""
+import numpy as np
+import pandas as pd
+from config import PLAN_PREVIEW_ROWS, IMPUTER_KNN_NEIGHBORS
+from utils.fingerprint import dataframe_fingerprint, mark_modified
+from utils.profiler import get_profile, update_profile
+from utils.duplicates import get_detector, row_hashes, rows_changed, KEEP_OPTIONS
+from utils.imputation import STRATEGIES as FILL_METHODS, GROUP_STRATEGIES, Imputer, get_imputer
+from utils.outliers import (
+    METHODS as OUTLIER_METHODS, compute_bounds, outlier_flags, clip_series, default_threshold
+)
+
+
+MISSING_LABEL = "Unknown"
+
+
+class CleaningPlan:
+    """Suite d'opérations de nettoyage, exécutée d'un bloc"""
+
+    def __init__(self, steps=None):
+        """
+        Args:
+            steps: liste d'étapes {"op": ..., paramètres} (ex: plan sauvegardé)
+        """
+        self.steps = []
+        for step in steps or []:
+            step = dict(step)
+            self.add(step.pop("op"), **step)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def add(self, op: str, **params) -> "CleaningPlan":
+        """Ajouter une étape (paramètres vérifiés tout de suite)"""
+        if op == "drop_duplicates":
+            if params.get("keep", "first") not in KEEP_OPTIONS:
+                raise ValueError(f"keep doit valoir {' ou '.join(KEEP_OPTIONS)}")
+            params = {"subset": list(params.get("subset") or []) or None,
+                      "keep": params.get("keep", "first")}
+        elif op == "fill_missing":
+            method = params.get("method")
+            if method not in FILL_METHODS:
+                raise ValueError(f"Méthode de remplissage inconnue: {method}")
+            # Seuls les paramètres utiles à la méthode sont gardés
+            fill = {"method": method}
+            if method in GROUP_STRATEGIES:
+                if not params.get("group_by"):
+                    raise ValueError("Une colonne de regroupement est nécessaire")
+                fill["group_by"] = params["group_by"]
+            elif method in ("interpolate", "forward_fill") and params.get("order_by"):
+                fill["order_by"] = params["order_by"]
+            elif method == "knn":
+                fill["n_neighbors"] = int(params.get("n_neighbors") or IMPUTER_KNN_NEIGHBORS)
+            params = fill
+        elif op in ("drop_outliers", "clip_outliers"):
+            method = params.get("method", "iqr")
+            if method not in OUTLIER_METHODS:
+                raise ValueError(f"Méthode de détection inconnue: {method}")
+            # `column` (une seule colonne) accepté pour les plans enregistrés avant le mode multi-colonnes
+            columns = params.get("columns") or [params["column"]]
+            threshold = params.get("threshold")
+            threshold = default_threshold(method) if threshold is None else threshold
+            if method == "percentile":
+                threshold = tuple(float(q) for q in threshold)
+                if not 0 <= threshold[0] < threshold[1] <= 1:
+                    raise ValueError("Les percentiles doivent vérifier 0 <= bas < haut <= 1")
+            params = {"columns": list(columns), "method": method, "threshold": threshold,
+                      "approximate": params.get("approximate")}
+        else:
+            raise ValueError(f"Opération de nettoyage inconnue: {op}")
+
+        self.steps.append({"op": op, **params})
+        return self
+
+    def remove(self, index: int):
+        """Retirer l'étape à la position `index`"""
+        del self.steps[index]
+
+    def clear(self):
+        self.steps = []
+
+    def describe(self) -> list:
+        """Libellé de chaque étape, pour l'affichage"""
+        return [describe_step(step) for step in self.steps]
+
+    def preview(self, df: pd.DataFrame, sample_rows: int = PLAN_PREVIEW_ROWS):
+        """
+        Exécuter le plan sur un échantillon aléatoire (fixe) de lignes
+
+        Les statistiques (moyennes, quartiles, doublons) sont celles de
+        l'échantillon: l'aperçu donne un ordre de grandeur, pas le résultat exact.
+
+        Returns:
+            (échantillon nettoyé, rapport, taille de l'échantillon)
+        """
+        if len(df) > sample_rows:
+            positions = np.sort(np.random.default_rng(0).choice(len(df), size=sample_rows, replace=False))
+            df = df.iloc[positions]
+        result, report, _ = _execute(self.steps, df, track=False)
+        return result, report, len(df)
+
+    def execute(self, df: pd.DataFrame):
+        """
+        Exécuter tout le plan en une passe (résultat identique à l'application
+        des étapes une à une)
+
+        Returns:
+            (DataFrame nettoyé marqué par mark_modified, rapport par étape)
+        """
+        result, report, _ = _execute(self.steps, df, track=True)
+        return result, report
+
+    def execute_with_changes(self, df: pd.DataFrame):
+        """
+        Comme execute, en indiquant aussi ce qui a changé (pour l'historique)
+
+        Returns:
+            (DataFrame nettoyé, rapport, positions des lignes conservées,
+             colonnes dont des valeurs ont été modifiées)
+        """
+        result, report, state = _execute(self.steps, df, track=True)
+        return result, report, np.flatnonzero(state.keep), list(state.columns)
+
+
+def describe_step(step: dict) -> str:
+    """Libellé lisible d'une étape"""
+    if step["op"] == "drop_duplicates":
+        scope = ", ".join(step["subset"]) if step["subset"] else "toutes les colonnes"
+        occurrence = "première" if step["keep"] == "first" else "dernière"
+        return f"Supprimer les doublons ({scope}, garder la {occurrence} occurrence)"
+    if step["op"] == "fill_missing":
+        detail = FILL_METHODS[step["method"]]
+        if step.get("group_by"):
+            detail += f" de {step['group_by']}"
+        if step.get("order_by"):
+            detail += f" selon {step['order_by']}"
+        if step.get("n_neighbors"):
+            detail += f", {step['n_neighbors']} voisins"
+        return f"Remplir les valeurs manquantes ({detail})"
+    if step["op"] in ("drop_outliers", "clip_outliers"):
+        action = "Supprimer" if step["op"] == "drop_outliers" else "Plafonner"
+        columns = step["columns"]
+        scope = ", ".join(columns[:3]) + (f" et {len(columns) - 3} autres" if len(columns) > 3 else "")
+        threshold = step["threshold"]
+        if step["method"] == "percentile":
+            threshold = f"{threshold[0]:.0%}-{threshold[1]:.0%}"
+        approx = ", quantiles approchés" if step.get("approximate") and step["method"] in ("iqr", "percentile") else ""
+        return f"{action} les valeurs aberrantes de {scope} ({OUTLIER_METHODS[step['method']]} {threshold}{approx})"
+    return step["op"]
+
+
+class _PlanState:
+    """État de l'exécution: masque des lignes conservées et colonnes modifiées"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.keep = np.ones(len(df), dtype=bool)
+        self.columns = {}
+        # Colonnes dont des valeurs présentes ont été réécrites (plafonnement)
+        self.rewritten = set()
+
+    def column(self, col) -> pd.Series:
+        """Colonne courante (modifiée ou d'origine), sur toutes les lignes d'origine"""
+        return self.columns.get(col, self.df[col])
+
+    @property
+    def untouched(self) -> bool:
+        """Aucune ligne retirée ni cellule modifiée: les caches du DataFrame restent valables"""
+        return not self.columns and self.keep.all()
+
+
+def _execute(steps, df, track):
+    """Exécution fusionnée des étapes; `track`: mettre à jour profil et détecteurs"""
+    state = _PlanState(df)
+    report = []
+    for step in steps:
+        rows_before = int(state.keep.sum())
+        cells, clipped = 0, 0
+        if step["op"] == "drop_duplicates":
+            _drop_duplicates(state, step["subset"], step["keep"])
+        elif step["op"] == "fill_missing":
+            cells = _fill_missing(state, step)
+        elif step["op"] in ("drop_outliers", "clip_outliers"):
+            clipped = _handle_outliers(state, step, clip=step["op"] == "clip_outliers")
+        report.append({
+            "step": describe_step(step),
+            "rows_removed": rows_before - int(state.keep.sum()),
+            "cells_filled": cells,
+            "cells_clipped": clipped,
+        })
+
+    if state.untouched:
+        return df, report, state
+    return _materialize(state, track), report, state
+
+
+def _drop_duplicates(state, subset, keep):
+    columns = subset or state.df.columns.tolist()
+    if any(col in state.columns for col in columns):
+        # Colonnes déjà remplies: empreintes recalculées sur les valeurs courantes
+        frame = pd.DataFrame({col: state.column(col) for col in columns}, copy=False)
+        hashes = row_hashes(frame, columns)
+    else:
+        hashes = get_detector(state.df, subset).hashes
+
+    positions = np.flatnonzero(state.keep)
+    duplicated = pd.Series(hashes[positions]).duplicated(keep=keep).to_numpy()
+    state.keep[positions[duplicated]] = False
+
+
+def _fill_missing(state, step) -> int:
+    """
+    Remplir les colonnes qui ont des manquants parmi les lignes conservées:
+    numériques par l'Imputer de la méthode choisie, texte par "Unknown"
+    """
+    df = state.df
+    keys = {step.get("group_by"), step.get("order_by")}
+    numeric_cols, targets = [], []
+    filled = 0
+    for col in df.columns:
+        series = state.column(col)
+        numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        if numeric and col not in keys:
+            numeric_cols.append(col)
+        if not numeric and not _is_text(series):
+            continue
+
+        kept = series[state.keep]
+        missing = int(kept.isnull().sum())
+        if missing == 0 or col in keys:
+            continue
+        if numeric:
+            targets.append(col)
+            continue
+
+        if isinstance(series.dtype, pd.CategoricalDtype) and MISSING_LABEL not in series.cat.categories:
+            # Une colonne `category` doit connaître la modalité avant de la recevoir
+            series = series.cat.add_categories(MISSING_LABEL)
+        state.columns[col] = series.fillna(MISSING_LABEL)
+        filled += missing
+
+    if targets:
+        filled += _impute(state, step, numeric_cols, targets)
+    return filled
+
+
+def _impute(state, step, columns, targets) -> int:
+    """Imputation des colonnes numériques `targets` (les autres servent de variables aux voisins)"""
+    params = {
+        "strategy": step["method"],
+        "columns": columns,
+        "group_by": step.get("group_by"),
+        "order_by": step.get("order_by"),
+        "n_neighbors": step.get("n_neighbors", IMPUTER_KNN_NEIGHBORS),
+    }
+    if state.keep.all() and not any(col in state.columns for col in columns):
+        # Données intactes: ajustement en cache (réutilisé d'une exécution à l'autre)
+        imputer = get_imputer(state.df, **params)
+        imputed = imputer.transform(state.df)
+    else:
+        needed = columns + [col for col in (params["group_by"], params["order_by"]) if col]
+        frame = pd.DataFrame({col: state.column(col)[state.keep] for col in needed}, copy=False)
+        imputed = Imputer(**params).fit_transform(frame)
+
+    filled = 0
+    for col in targets:
+        series = state.column(col)
+        values = imputed[col].to_numpy()
+        if pd.api.types.is_integer_dtype(series.dtype):
+            # Entiers nullables: valeurs imputées arrondies
+            values = np.round(values)
+        elif pd.api.types.is_float_dtype(series.dtype):
+            # Profil compact: float32 ne reçoit pas de float64 (pandas 3)
+            values = values.astype(getattr(series.dtype, "numpy_dtype", series.dtype), copy=False)
+        new = series.copy()
+        new[state.keep] = values
+        filled += int(series[state.keep].isnull().sum()) - int(new[state.keep].isnull().sum())
+        state.columns[col] = new
+    return filled
+
+
+def _handle_outliers(state, step, clip) -> int:
+    """
+    Valeurs aberrantes de plusieurs colonnes: bornes calculées ensemble sur les
+    lignes conservées, puis un seul masque (suppression) ou un plafonnement.
+    Les valeurs manquantes ne sont pas aberrantes. Retourne le nombre de cellules plafonnées.
+    """
+    from utils.profiler import numeric_matrix
+
+    columns = step["columns"]
+    method, approximate = step["method"], step.get("approximate")
+    frame = pd.DataFrame({col: state.column(col) for col in columns}, copy=False)
+    values = numeric_matrix(frame, columns)
+
+    stats = None
+    intact = state.keep.all() and not any(col in state.columns for col in columns)
+    if intact and method in ("iqr", "zscore"):
+        # Colonnes intactes: quartiles / moments du profil en cache
+        numeric = get_profile(state.df, approximate=approximate).numeric
+        if all(col in numeric.index for col in columns):
+            stats = numeric.loc[columns]
+    kept_values = values if state.keep.all() else values[state.keep]
+    lower, upper = compute_bounds(kept_values, method, step["threshold"], approximate, stats)
+    below, above = outlier_flags(values, lower, upper)
+
+    if not clip:
+        state.keep &= ~(below | above).any(axis=1)
+        return 0
+
+    clipped = 0
+    for j, col in enumerate(columns):
+        count = int((below[:, j] | above[:, j])[state.keep].sum())
+        if count:
+            state.columns[col] = clip_series(state.column(col), lower[j], upper[j])
+            state.rewritten.add(col)
+            clipped += count
+    return clipped
+
+
+def _is_text(series) -> bool:
+    return isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _materialize(state, track) -> pd.DataFrame:
+    """Construire le résultat: une seule copie des lignes conservées"""
+    df = state.df
+    positions = np.flatnonzero(state.keep)
+    # Sélection des lignes seule: un iloc[lignes, colonnes] copierait d'abord les colonnes, puis les lignes
+    result = df.iloc[positions]
+    for col, values in state.columns.items():
+        # Remplacement sur place: la colonne garde sa position
+        result[col] = values.iloc[positions].array
+    result = mark_modified(result)
+    if not track:
+        return result
+
+    old_key = dataframe_fingerprint(df)
+    # Cellules remplies dans les lignes conservées: deltas pour le profil en cache
+    filled, replaced = {}, np.zeros(len(result), dtype=bool)
+    for col in state.columns:
+        was_null = df[col].isnull().to_numpy()[positions]
+        now_set = was_null & result[col].notnull().to_numpy()
+        if now_set.any():
+            filled[col] = result[col][now_set]
+            replaced |= now_set
+        if col in state.rewritten:
+            before = df[col].to_numpy(dtype=float, na_value=np.nan)[positions]
+            replaced |= ~was_null & (before != result[col].to_numpy(dtype=float, na_value=np.nan))
+    rows_changed(old_key, result, kept=state.keep, replaced=np.flatnonzero(replaced))
+    update_profile(old_key, result, removed_rows=df[~state.keep], filled=filled,
+                   rewritten=sorted(state.rewritten, key=df.columns.get_loc))
+    return result
@@ -0,0 +1,130 @@
+"""
+Matrices de corrélation calculées une fois par version du DataFrame
+Produits matriciels vectorisés (Pearson, Spearman) et extraction des paires les plus fortes
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import CORRELATION_SAMPLE_ROWS, CORRELATION_CACHE_SIZE
+from utils.fingerprint import dataframe_fingerprint
+
+
+METHODS = ("pearson", "spearman")
+
+# Matrices partagées: (empreinte, méthode, colonnes, échantillon) -> DataFrame
+_corr_cache = OrderedDict()
+_corr_lock = threading.Lock()
+
+
+def correlation_matrix(df: pd.DataFrame, method: str = "pearson", columns=None,
+                       sample_rows: int = CORRELATION_SAMPLE_ROWS) -> pd.DataFrame:
+    """
+    Matrice de corrélation (mêmes conventions que DataFrame.corr), mise en cache
+
+    Args:
+        df: DataFrame source
+        method: "pearson" ou "spearman"
+        columns: colonnes numériques à corréler (toutes par défaut)
+        sample_rows: au-delà, calcul sur un échantillon aléatoire fixe de lignes
+                     (None = toutes les lignes)
+    """
+    if method not in METHODS:
+        raise ValueError(f"Méthode de corrélation inconnue: {method}")
+    if columns is None:
+        columns = df.select_dtypes(include=[np.number]).columns
+    columns = list(columns)
+
+    key = (dataframe_fingerprint(df), method, tuple(map(str, columns)), sample_rows)
+    with _corr_lock:
+        if key in _corr_cache:
+            _corr_cache.move_to_end(key)
+            return _corr_cache[key]
+
+    corr = _compute(df, method, columns, sample_rows)
+    with _corr_lock:
+        _corr_cache[key] = corr
+        _corr_cache.move_to_end(key)
+        while len(_corr_cache) > CORRELATION_CACHE_SIZE:
+            _corr_cache.popitem(last=False)
+    return corr
+
+
+def _compute(df, method, columns, sample_rows) -> pd.DataFrame:
+    """Calcul effectif de la matrice (voir correlation_matrix)"""
+    from utils.profiler import numeric_matrix
+
+    positions = None
+    if sample_rows is not None and len(df) > sample_rows:
+        rng = np.random.default_rng(0)
+        positions = np.sort(rng.choice(len(df), size=sample_rows, replace=False))
+    frame = df if positions is None else df.iloc[positions]
+    values = numeric_matrix(frame, columns)
+    has_missing = np.isnan(values).any()
+
+    if method == "spearman":
+        if has_missing:
+            # Rangs recalculés pour chaque paire de colonnes: seul pandas le fait exactement
+            return frame[columns].astype(float).corr(method="spearman")
+        values = pd.DataFrame(values).rank().to_numpy()
+
+    corr = _pearson(values) if not has_missing else _pearson_pairwise(values)
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def _pearson(values: np.ndarray) -> np.ndarray:
+    """Pearson sans valeur manquante: un seul produit matriciel"""
+    centered = values - values.mean(axis=0)
+    norms = np.sqrt((centered ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = (centered.T @ centered) / np.outer(norms, norms)
+    np.fill_diagonal(corr, np.where(norms > 0, 1.0, np.nan))
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _pearson_pairwise(values: np.ndarray) -> np.ndarray:
+    """
+    Pearson sur les lignes complètes de chaque paire (comme DataFrame.corr)
+
+    Effectifs et sommes de chaque paire obtenus par produits matriciels
+    avec le masque des valeurs présentes.
+    """
+    present = ~np.isnan(values)
+    # Centrage par colonne: n'altère pas la corrélation, limite les compensations
+    with np.errstate(invalid="ignore"):
+        centered = values - np.nanmean(values, axis=0)
+    x = np.where(present, centered, 0.0)
+    mask = present.astype(float)
+
+    n = mask.T @ mask
+    sum_x = x.T @ mask          # [i, j]: somme de x_i là où i et j sont présents
+    sum_xx = (x ** 2).T @ mask
+    sum_xy = x.T @ x
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sum_xy - sum_x * sum_x.T
+        var = n * sum_xx - sum_x ** 2
+        corr = cov / np.sqrt(var * var.T)
+    corr[n < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def top_pairs(corr: pd.DataFrame, k: int = 10, threshold: float = 0.0) -> list:
+    """
+    Les k paires de plus forte corrélation absolue (triangle supérieur)
+
+    Returns:
+        liste de (colonne 1, colonne 2, corrélation), |r| décroissant
+    """
+    values = corr.to_numpy(dtype=float)
+    rows, cols = np.triu_indices(len(values), k=1)
+    pair_values = values[rows, cols]
+    strength = np.abs(pair_values)
+
+    candidates = np.flatnonzero(~np.isnan(strength) & (strength > threshold))
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-strength[candidates], k - 1)[:k]]
+    candidates = candidates[np.argsort(-strength[candidates], kind="stable")]
+
+    names = corr.columns
+    return [(names[rows[i]], names[cols[i]], float(pair_values[i])) for i in candidates]
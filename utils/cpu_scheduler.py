@@ -0,0 +1,123 @@
+"""
+Répartition des cœurs entre les entraînements concurrents
+Chaque calcul parallèle réserve des cœurs sur un budget commun au processus:
+la somme des réservations ne dépasse jamais le nombre de cœurs disponibles,
+et chaque utilisateur actif reçoit une part équitable
+"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from config import MODEL_N_JOBS, MODEL_USER_MAX_JOBS
+
+
+def available_cpus() -> int:
+    """
+    Cœurs réellement utilisables par le processus
+
+    Tient compte de l'affinité CPU et du quota cgroup (v2: cpu.max, v1:
+    cfs_quota_us), qui borne un pod même quand os.cpu_count() voit tout le nœud.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = _cgroup_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota)))
+    return max(1, cpus)
+
+
+def _cgroup_quota():
+    """Quota CPU du conteneur en nombre de cœurs, None si illimité ou inconnu"""
+    try:
+        cpu_max = Path("/sys/fs/cgroup/cpu.max")
+        if cpu_max.exists():
+            quota, period = cpu_max.read_text().split()[:2]
+            return None if quota == "max" else int(quota) / int(period)
+        quota_file = Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        if quota_file.exists():
+            quota = int(quota_file.read_text())
+            period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+            return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class CpuScheduler:
+    """Budget de cœurs partagé par les calculs parallèles du processus"""
+
+    def __init__(self, total: int = None, user_max: int = None):
+        """
+        Args:
+            total: cœurs à répartir (défaut: MODEL_N_JOBS, ou tous les cœurs disponibles)
+            user_max: part maximale d'un utilisateur (défaut: MODEL_USER_MAX_JOBS, 0 = sans limite fixe)
+        """
+        self.total = total or MODEL_N_JOBS or available_cpus()
+        self.user_max = MODEL_USER_MAX_JOBS if user_max is None else user_max
+        self._in_use = {}
+        self._waiting = {}
+        self._condition = threading.Condition()
+
+    @property
+    def free(self) -> int:
+        with self._condition:
+            return self.total - sum(self._in_use.values())
+
+    def share(self, owner=None) -> int:
+        """Part d'un utilisateur: total divisé entre les utilisateurs actifs (en cours ou en attente)"""
+        with self._condition:
+            return self._share(owner)
+
+    def _share(self, owner) -> int:
+        owners = {key for key, count in self._in_use.items() if count} | set(self._waiting) | {owner}
+        share = max(1, self.total // len(owners))
+        return min(share, self.user_max) if self.user_max else share
+
+    @contextmanager
+    def reserve(self, requested: int = None, owner=None):
+        """
+        Réserver des cœurs le temps d'un calcul (attend qu'au moins un cœur soit libre)
+
+        Args:
+            requested: cœurs souhaités (défaut: la part de l'utilisateur)
+            owner: identifiant de l'utilisateur (ex: email), pour le partage équitable
+
+        Yields:
+            nombre de cœurs accordés (>= 1), à passer en n_jobs
+        """
+        with self._condition:
+            self._waiting[owner] = self._waiting.get(owner, 0) + 1
+            try:
+                while self.total - sum(self._in_use.values()) < 1:
+                    self._condition.wait()
+            finally:
+                self._waiting[owner] -= 1
+                if not self._waiting[owner]:
+                    del self._waiting[owner]
+            free = self.total - sum(self._in_use.values())
+            granted = max(1, min(requested or self.total, self._share(owner), free))
+            self._in_use[owner] = self._in_use.get(owner, 0) + granted
+        try:
+            yield granted
+        finally:
+            with self._condition:
+                self._in_use[owner] -= granted
+                if not self._in_use[owner]:
+                    del self._in_use[owner]
+                self._condition.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> CpuScheduler:
+    """Planificateur partagé par toutes les sessions du processus"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = CpuScheduler()
+        return _scheduler
@@ -5,6 +5,7 @@ Support: CSV, Excel
 
 import pandas as pd
 from io import BytesIO
+from utils.profiler import get_profile
 
 
 class DataExporter:
@@ -39,6 +40,8 @@ class DataExporter:
         """
         excel_buffer = BytesIO()
         
+        missing_total = get_profile(df).missing_total
+
         with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
             df.to_excel(writer, index=False, sheet_name='Données')
             
@@ -53,8 +56,8 @@ class DataExporter:
                 'Valeur': [
                     len(df),
                     len(df.columns),
-                    int(df.isnull().sum().sum()),
-                    round(100 - (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100, 2)
+                    int(missing_total),
+                    round(100 - (missing_total / (len(df) * len(df.columns))) * 100, 2)
                 ]
             }
             
@@ -72,13 +75,15 @@ class DataExporter:
         Returns:
             dict: informations sur les données
         """
+        profile = get_profile(df)
+        missing_total = profile.missing_total
         return {
             'lignes': len(df),
             'colonnes': len(df.columns),
             'colonnes_list': df.columns.tolist(),
             'types': df.dtypes.to_dict(),
-            'missing_total': int(df.isnull().sum().sum()),
-            'missing_pct': round((df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100, 2),
-            'doublons': int(df.duplicated().sum()),
-            'completness_pct': round(100 - (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100, 2)
+            'missing_total': missing_total,
+            'missing_pct': round((missing_total / (len(df) * len(df.columns))) * 100, 2),
+            'doublons': profile.duplicates,
+            'completness_pct': round(100 - (missing_total / (len(df) * len(df.columns))) * 100, 2)
         }
@@ -1,115 +1,161 @@
 """
 Traitement et analyse des données
 """
+import hashlib
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from config import CHUNK_SIZE, SAMPLE_SIZE, DATASET_CACHE_ENABLED, CATEGORY_MAX_RATIO
+from utils.streaming import StreamingDataset, iter_chunks
+from utils.dataset_cache import read_cached, write_cache
+from utils.profiler import get_profile
+from utils.cleaning_plan import CleaningPlan
 
 
-def load_file(file_path: str) -> pd.DataFrame:
-    """Charger un fichier CSV ou Excel"""
+def load_file(file_path: str, use_cache: bool = DATASET_CACHE_ENABLED,
+              profile: str = "standard", sheet_name=None, start_row: int = 0,
+              end_row: int = None) -> pd.DataFrame:
+    """
+    Charger un fichier CSV ou Excel (via le cache Parquet si disponible)
+
+    Le profil "compact" réduit les types (voir compact_dtypes).
+    Les fichiers .xlsx sont lus en flux; sheet_name, start_row et end_row
+    choisissent la feuille et la plage de lignes (voir iter_chunks).
+    """
     file_path = str(file_path)
+    if profile not in ("standard", "compact"):
+        raise ValueError(f"Profil de chargement inconnu: {profile}")
+
+    variant = profile
+    if sheet_name or start_row or end_row is not None:
+        selection = f"{sheet_name}|{start_row}|{end_row}".encode()
+        variant += "." + hashlib.blake2b(selection, digest_size=6).hexdigest()
+
+    if use_cache:
+        df = read_cached(file_path, variant=variant)
+        if df is not None:
+            return df
     
-    if file_path.endswith(('.csv', '.CSV')):
-        return pd.read_csv(file_path)
-    elif file_path.endswith(('.xlsx', '.xls')):
-        return pd.read_excel(file_path)
+    if file_path.endswith(('.csv', '.CSV')) and not (start_row or end_row is not None):
+        df = pd.read_csv(file_path)
+    elif file_path.endswith(('.csv', '.CSV', '.xlsx', '.xls')):
+        chunks = iter_chunks(file_path, sheet_name=sheet_name, start_row=start_row, end_row=end_row)
+        # Les blocs Excel sont typés séparément: on réinfère après concaténation
+        df = pd.concat(chunks, ignore_index=True).infer_objects()
     else:
         raise ValueError("Format de fichier non supporté")
 
+    if profile == "compact":
+        df = compact_dtypes(df)
+
+    if use_cache:
+        write_cache(file_path, df, variant=variant)
+
+    return df
+
+
+def compact_dtypes(df: pd.DataFrame, max_category_ratio: float = CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """
+    Réduire l'empreinte mémoire d'un DataFrame
+
+    - entiers et flottants convertis vers le plus petit type suffisant
+      (float32: ~7 chiffres significatifs)
+    - colonnes texte peu variées (uniques / lignes <= max_category_ratio)
+      converties en `category`
+
+    La taille d'origine (octets) est conservée dans attrs["original_memory_usage"].
+    """
+    original_memory = int(df.memory_usage(deep=True).sum())
+    df = df.copy()
+
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="float")
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            n_unique = series.nunique()
+            if len(series) > 0 and n_unique / len(series) <= max_category_ratio:
+                df[col] = series.astype("category")
+
+    df.attrs["original_memory_usage"] = original_memory
+    return df
+
+
+def load_file_streaming(file_path: str, chunksize: int = CHUNK_SIZE,
+                        sample_size: int = SAMPLE_SIZE, sheet_name=None, start_row: int = 0,
+                        end_row: int = None) -> StreamingDataset:
+    """Charger un gros fichier CSV ou Excel par blocs: échantillon + agrégats en mémoire"""
+    return StreamingDataset(
+        file_path, chunksize=chunksize, sample_size=sample_size,
+        sheet_name=sheet_name, start_row=start_row, end_row=end_row
+    ).ingest()
+
 
 def get_data_summary(df: pd.DataFrame) -> dict:
     """Obtenir un résumé des données"""
+    profile = get_profile(df)
     summary = {
-        "rows": len(df),
-        "columns": len(df.columns),
-        "duplicates": df.duplicated().sum(),
-        "missing_values": df.isnull().sum().to_dict(),
-        "memory_usage": df.memory_usage(deep=True).sum() / 1024**2  # En MB
+        "rows": profile.rows,
+        "columns": len(profile.columns),
+        "duplicates": profile.duplicates,
+        "duplicates_approximate": False,
+        "missing_values": profile.missing.to_dict(),
+        "memory_usage": profile.memory_usage / 1024**2  # En MB
     }
     return summary
 
 
-def get_column_stats(df: pd.DataFrame) -> dict:
-    """Obtenir les statistiques de chaque colonne"""
-    stats = {}
-    
-    for col in df.columns:
-        if pd.api.types.is_numeric_dtype(df[col]):
-            try:
-                stats[col] = {
-                    "type": "Quantitative",
-                    "min": df[col].min(),
-                    "max": df[col].max(),
-                    "mean": df[col].mean(),
-                    "median": df[col].median(),
-                    "std": df[col].std(),
-                    "null_count": df[col].isnull().sum(),
-                    "remark": None
-                }
-            except (ValueError, TypeError) as e:
-                # If conversion failed (e.g. strings like 'Laptop' present), provide a friendly remark
-                stats[col] = {
-                    "type": "Quantitative",
-                    "min": None,
-                    "max": None,
-                    "mean": None,
-                    "median": None,
-                    "std": None,
-                    "null_count": df[col].isnull().sum(),
-                    "remark": (
-                        "Remarque: Cette colonne contient des valeurs non numériques (ex: 'Laptop'), "
-                        "impossible de convertir toutes les valeurs en nombre. Veuillez nettoyer les valeurs "
-                        "ou forcer la conversion avant d'obtenir des statistiques numériques."
-                    )
-                }
-        else:
-            stats[col] = {
-                "type": "Qualitative",
-                "unique_values": df[col].nunique(),
-                "most_common": df[col].mode()[0] if not df[col].mode().empty else None,
-                "null_count": df[col].isnull().sum()
-            }
-    
-    return stats
-
-
-def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
-    """Supprimer les doublons"""
-    initial_rows = len(df)
-    df = df.drop_duplicates()
-    removed_rows = initial_rows - len(df)
-    return df, removed_rows
-
-
-def handle_outliers(df: pd.DataFrame, column: str, method: str = "iqr") -> pd.DataFrame:
-    """Gérer les valeurs aberrantes"""
-    if method == "iqr":
-        Q1 = df[column].quantile(0.25)
-        Q3 = df[column].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        df = df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
-    
-    return df
+def get_column_stats(df: pd.DataFrame, approximate: bool = None) -> dict:
+    """Obtenir les statistiques de chaque colonne (profil calculé en une passe)"""
+    return get_profile(df, approximate=approximate).column_stats()
 
 
-def fill_missing_values(df: pd.DataFrame, method: str = "mean") -> pd.DataFrame:
-    """Remplir les valeurs manquantes"""
-    numeric_cols = df.select_dtypes(include=['number']).columns
-    categorical_cols = df.select_dtypes(include=['object']).columns
-    
-    # Pour les colonnes numériques
-    if method == "mean":
-        df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
-    elif method == "median":
-        df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
-    elif method == "forward_fill":
-        df[numeric_cols] = df[numeric_cols].fillna(method='ffill')
-    
-    # Pour les colonnes catégorielles
-    df[categorical_cols] = df[categorical_cols].fillna("Unknown")
-    
-    return df
+def remove_duplicates(df: pd.DataFrame, subset: list = None, keep: str = "first") -> pd.DataFrame:
+    """
+    Supprimer les doublons (empreintes de lignes en cache, voir utils.duplicates)
+
+    Args:
+        subset: colonnes comparées (toutes par défaut)
+        keep: occurrence conservée, "first" ou "last"
+    """
+    df, report = CleaningPlan().add("drop_duplicates", subset=subset, keep=keep).execute(df)
+    return df, report[0]["rows_removed"]
+
+
+def handle_outliers(df: pd.DataFrame, column, method: str = "iqr",
+                    approximate: bool = None, action: str = "drop", threshold=None) -> pd.DataFrame:
+    """
+    Gérer les valeurs aberrantes d'une ou plusieurs colonnes
+
+    Args:
+        column: colonne ou liste de colonnes numériques
+        method: "iqr", "zscore", "mad" ou "percentile" (voir utils.outliers)
+        approximate: quantiles par sketch (défaut: APPROX_QUANTILES)
+        action: "drop" (lignes supprimées) ou "clip" (valeurs plafonnées aux bornes)
+        threshold: seuil de la méthode (défaut: config)
+    """
+    columns = [column] if isinstance(column, str) else list(column)
+    plan = CleaningPlan().add(f"{action}_outliers", columns=columns, method=method,
+                              threshold=threshold, approximate=approximate)
+    return plan.execute(df)[0]
+
+
+def fill_missing_values(df: pd.DataFrame, method: str = "mean", group_by: str = None,
+                        order_by: str = None, n_neighbors: int = None) -> pd.DataFrame:
+    """
+    Remplir les valeurs manquantes (numériques: méthode choisie, texte: "Unknown")
+
+    Args:
+        method: clé de utils.imputation.STRATEGIES (mean, median, forward_fill,
+                group_mean, group_median, interpolate, knn)
+        group_by: colonne de regroupement (group_mean, group_median)
+        order_by: colonne d'ordre, ex: date (interpolate, forward_fill)
+        n_neighbors: nombre de voisins (knn)
+    """
+    plan = CleaningPlan().add("fill_missing", method=method, group_by=group_by,
+                              order_by=order_by, n_neighbors=n_neighbors)
+    return plan.execute(df)[0]
@@ -0,0 +1,78 @@
+"""
+Cache colonnaire (Parquet) des fichiers importés
+Le cache est adressé par contenu: son nom est l'empreinte du fichier brut
+"""
+import hashlib
+import os
+from pathlib import Path
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+CACHE_DIRNAME = ".cache"
+_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Empreintes déjà calculées: (chemin, taille, mtime) -> empreinte
+_digest_memo = {}
+
+
+def file_digest(file_path) -> str:
+    """Empreinte BLAKE2b du contenu du fichier (lecture par blocs)"""
+    file_path = Path(file_path)
+    stat = file_path.stat()
+    memo_key = (str(file_path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+    if memo_key not in _digest_memo:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+                digest.update(block)
+        _digest_memo[memo_key] = digest.hexdigest()
+
+    return _digest_memo[memo_key]
+
+
+def cache_path_for(file_path, variant: str = "standard") -> Path:
+    """Chemin du cache Parquet, à côté du fichier brut"""
+    file_path = Path(file_path)
+    return file_path.parent / CACHE_DIRNAME / f"{file_digest(file_path)}.{variant}.parquet"
+
+
+def read_cached(file_path, variant: str = "standard"):
+    """Lire le cache s'il existe (mappé en mémoire), sinon None"""
+    if not PARQUET_AVAILABLE:
+        return None
+
+    cache_path = cache_path_for(file_path, variant)
+    if not cache_path.exists():
+        return None
+
+    try:
+        return pd.read_parquet(cache_path, engine="pyarrow", memory_map=True)
+    except Exception:
+        # Cache corrompu: on l'ignore, il sera réécrit
+        return None
+
+
+def write_cache(file_path, df: pd.DataFrame, variant: str = "standard") -> bool:
+    """Écrire le cache Parquet (écriture atomique); False si impossible"""
+    if not PARQUET_AVAILABLE:
+        return False
+
+    cache_path = cache_path_for(file_path, variant)
+    tmp_path = cache_path.with_suffix(".tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(tmp_path, engine="pyarrow")
+        os.replace(tmp_path, cache_path)
+        return True
+    except Exception:
+        # Ex: colonne objet aux types mélangés, non convertible en Arrow
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return False
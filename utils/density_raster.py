@@ -0,0 +1,166 @@
+"""
+Rendu en densité des très grands nuages de points
+Les points sont comptés sur une grille 2D côté serveur (NumPy) et affichés
+comme une image de densité (PNG): taille fixe quel que soit le nombre de lignes.
+Le zoom ne recompte que la fenêtre visible grâce aux axes triés en cache
+"""
+import base64
+import threading
+from collections import OrderedDict
+from io import BytesIO
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from config import RASTER_WIDTH, RASTER_HEIGHT, RASTER_CACHE_SIZE
+from utils.fingerprint import dataframe_fingerprint
+
+
+# Axes triés selon x: (empreinte, x, y) -> (x trié, y dans le même ordre)
+_axes_cache = OrderedDict()
+_axes_lock = threading.Lock()
+
+
+def can_rasterize(df: pd.DataFrame, x: str, y: str) -> bool:
+    """Rendu en densité possible (deux axes numériques)"""
+    return all(
+        pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        for col in (x, y)
+    )
+
+
+def sorted_axes(df: pd.DataFrame, x: str, y: str):
+    """
+    Points valides triés selon x, partagés tant que les données ne changent pas
+
+    Returns:
+        (x trié, y correspondant), float64 sans NaN
+    """
+    key = (dataframe_fingerprint(df), x, y)
+    with _axes_lock:
+        if key in _axes_cache:
+            _axes_cache.move_to_end(key)
+            return _axes_cache[key]
+
+    x_values = df[x].to_numpy(dtype=float, na_value=np.nan)
+    y_values = df[y].to_numpy(dtype=float, na_value=np.nan)
+    valid = np.isfinite(x_values) & np.isfinite(y_values)
+    x_values, y_values = x_values[valid], y_values[valid]
+    order = np.argsort(x_values, kind="stable")
+    axes = (x_values[order], y_values[order])
+
+    with _axes_lock:
+        _axes_cache[key] = axes
+        _axes_cache.move_to_end(key)
+        while len(_axes_cache) > RASTER_CACHE_SIZE:
+            _axes_cache.popitem(last=False)
+    return axes
+
+
+def axis_bounds(df: pd.DataFrame, x: str, y: str):
+    """Étendue complète des deux axes: ((x min, x max), (y min, y max))"""
+    x_sorted, y_values = sorted_axes(df, x, y)
+    if len(x_sorted) == 0:
+        return (0.0, 1.0), (0.0, 1.0)
+    return (float(x_sorted[0]), float(x_sorted[-1])), (float(y_values.min()), float(y_values.max()))
+
+
+def rasterize(x: np.ndarray, y: np.ndarray, x_range, y_range,
+              width: int = RASTER_WIDTH, height: int = RASTER_HEIGHT) -> np.ndarray:
+    """
+    Nombre de points par case d'une grille height x width couvrant la fenêtre
+
+    Les points hors fenêtre sont ignorés; le bord haut de chaque axe est inclus.
+    """
+    (x_min, x_max), (y_min, y_max) = x_range, y_range
+    inside = (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+    x, y = x[inside], y[inside]
+    columns = _cells(x, x_min, x_max, width)
+    rows = _cells(y, y_min, y_max, height)
+    counts = np.bincount(rows * width + columns, minlength=width * height)
+    return counts.reshape(height, width)
+
+
+def _cells(values, low, high, n_cells) -> np.ndarray:
+    """Case (0 .. n_cells - 1) de chaque valeur de [low, high]"""
+    if high <= low:
+        return np.zeros(len(values), dtype=np.int64)
+    cells = ((values - low) * (n_cells / (high - low))).astype(np.int64)
+    return np.minimum(cells, n_cells - 1)
+
+
+def density_raster(df: pd.DataFrame, x: str, y: str, x_range=None, y_range=None,
+                   width: int = RASTER_WIDTH, height: int = RASTER_HEIGHT) -> dict:
+    """
+    Grille de densité de la fenêtre visible (défaut: toute l'étendue)
+
+    Seule la tranche des x visibles est parcourue (recherche dichotomique
+    dans les axes triés), puis filtrée sur y.
+
+    Returns:
+        dict: counts (height x width, première ligne = y bas), x_range, y_range,
+        in_view (points dans la fenêtre) et total (points valides)
+    """
+    x_sorted, y_values = sorted_axes(df, x, y)
+    full_x, full_y = axis_bounds(df, x, y)
+    x_range = tuple(map(float, x_range or full_x))
+    y_range = tuple(map(float, y_range or full_y))
+
+    start = np.searchsorted(x_sorted, x_range[0], side="left")
+    stop = np.searchsorted(x_sorted, x_range[1], side="right")
+    counts = rasterize(x_sorted[start:stop], y_values[start:stop], x_range, y_range, width, height)
+    return {
+        "counts": counts,
+        "x_range": x_range,
+        "y_range": y_range,
+        "in_view": int(counts.sum()),
+        "total": int(len(x_sorted)),
+    }
+
+
+def raster_figure(raster: dict, x: str, y: str, title: str = None, log_scale: bool = True) -> go.Figure:
+    """
+    Grille affichée comme une image PNG sur les axes (quelques dizaines de ko)
+
+    Couleur Viridis sur l'échelle logarithmique des effectifs; cases vides transparentes.
+    """
+    counts = raster["counts"]
+    shade = np.log1p(counts) if log_scale else counts.astype(float)
+    levels = np.zeros(counts.shape, dtype=np.intp)
+    if shade.max() > 0:
+        levels = np.round(shade / shade.max() * 255).astype(np.intp)
+    rgba = _palette()[levels]
+    rgba[counts == 0, 3] = 0
+
+    (x_min, x_max), (y_min, y_max) = raster["x_range"], raster["y_range"]
+    fig = go.Figure()
+    # Première ligne de l'image = haut du graphique: lignes de la grille inversées
+    fig.add_layout_image(
+        source=_png_data_uri(rgba[::-1]),
+        xref="x", yref="y",
+        x=x_min, y=y_max,
+        sizex=x_max - x_min, sizey=y_max - y_min,
+        xanchor="left", yanchor="top",
+        sizing="stretch",
+        layer="below",
+    )
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y, plot_bgcolor="white")
+    fig.update_xaxes(range=[x_min, x_max], showgrid=False)
+    fig.update_yaxes(range=[y_min, y_max], showgrid=False)
+    return fig
+
+
+def _palette() -> np.ndarray:
+    """256 couleurs RGBA de l'échelle Viridis"""
+    from plotly.colors import sample_colorscale, unlabel_rgb
+    colors = sample_colorscale("Viridis", np.linspace(0, 1, 256), colortype="rgb")
+    palette = np.full((256, 4), 255, dtype=np.uint8)
+    palette[:, :3] = np.round([unlabel_rgb(color) for color in colors]).astype(np.uint8)
+    return palette
+
+
+def _png_data_uri(rgba: np.ndarray) -> str:
+    """Image RGBA -> PNG encodé en data URI"""
+    from PIL import Image
+    buffer = BytesIO()
+    Image.fromarray(np.ascontiguousarray(rgba)).save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
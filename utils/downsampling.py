@@ -0,0 +1,170 @@
+"""
+Sous-échantillonnage des graphiques (nombre de points borné par trace)
+- courbes: Largest-Triangle-Three-Buckets ou min/max par intervalle
+- nuages de points: échantillon stratifié sur une grille, qui garde la densité
+  et au moins un point par case occupée (les points isolés restent visibles)
+"""
+import numpy as np
+import pandas as pd
+from config import MAX_POINTS_PER_TRACE, LINE_DOWNSAMPLING, SCATTER_GRID_SIZE
+
+
+LINE_METHODS = {"lttb": "LTTB", "minmax": "min/max par intervalle"}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Positions retenues par Largest-Triangle-Three-Buckets (x trié, sans NaN)
+
+    Premier et dernier points gardés; dans chaque intervalle, le point qui forme
+    le plus grand triangle avec le point retenu avant et la moyenne de l'intervalle suivant.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bornes des n_out - 2 intervalles intérieurs
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.intp)
+    # Moyenne de chaque intervalle (le suivant de l'intervalle i sert au choix dans i)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    means_x = np.append(sums_x / sizes, x[-1])
+    means_y = np.append(sums_y / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Aire (au facteur 1/2 près) du triangle (précédent, candidat, moyenne suivante)
+        area = np.abs(
+            (x[previous] - means_x[i + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (means_y[i + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Positions du minimum et du maximum de chaque intervalle (n_out // 2 intervalles)"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+
+    n_buckets = max(n_out // 2, 1)
+    edges = np.floor(np.linspace(0, n, n_buckets + 1)).astype(np.intp)
+    sizes = np.diff(edges)
+    bucket = np.repeat(np.arange(n_buckets), sizes)
+    # Tri par (intervalle, valeur): premier et dernier de chaque intervalle = min et max
+    order = np.lexsort((y, bucket))
+    lows = order[edges[:-1]]
+    highs = order[edges[1:] - 1]
+    return np.unique(np.concatenate([lows, highs]))
+
+
+def grid_sample_indices(x: np.ndarray, y: np.ndarray, n_out: int,
+                        grid_size: int = SCATTER_GRID_SIZE, seed: int = 0) -> np.ndarray:
+    """
+    Échantillon stratifié sur une grille grid_size x grid_size
+
+    Chaque case occupée garde un point, le reste du budget est réparti au
+    prorata des effectifs: la densité apparente est conservée sans perdre
+    les points isolés. Tirage aléatoire (graine fixe) dans chaque case.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+
+    cells = _grid_cells(x, grid_size) * grid_size + _grid_cells(y, grid_size)
+    cell_ids, cell_of_row, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    budget = max(n_out - len(cell_ids), 0)
+    quotas = np.minimum(counts, 1 + np.floor(budget * counts / n).astype(np.int64))
+
+    # Rang aléatoire de chaque point dans sa case; on garde les `quota` premiers
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(n), cell_of_row))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(n) - starts[cell_of_row[order]]
+    kept = order[rank < quotas[cell_of_row[order]]]
+    return np.sort(kept)
+
+
+def _grid_cells(values: np.ndarray, grid_size: int) -> np.ndarray:
+    """Numéro de case (0 .. grid_size - 1) de chaque valeur sur un axe"""
+    low, high = values.min(), values.max()
+    if high <= low:
+        return np.zeros(len(values), dtype=np.int64)
+    cells = ((values - low) / (high - low) * grid_size).astype(np.int64)
+    return np.minimum(cells, grid_size - 1)
+
+
+def axis_values(series: pd.Series) -> np.ndarray:
+    """Valeurs d'un axe en float64 (dates -> nanosecondes, texte -> codes), NaN = manquant"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[ns]").astype("int64").astype(float)
+        values[series.isnull().to_numpy()] = np.nan
+        return values
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    codes = pd.factorize(series)[0].astype(float)
+    codes[codes < 0] = np.nan
+    return codes
+
+
+def downsample_line(df: pd.DataFrame, x: str, y: str, max_points: int = MAX_POINTS_PER_TRACE,
+                    method: str = LINE_DOWNSAMPLING):
+    """
+    Lignes à tracer pour une courbe y = f(x), au plus `max_points`
+
+    Au-delà du plafond, les points sont triés selon x puis réduits par LTTB ou
+    min/max. Retourne (DataFrame à tracer, info) avec info None si rien n'a été réduit.
+    """
+    if len(df) <= max_points:
+        return df, None
+    if method not in LINE_METHODS:
+        raise ValueError(f"Méthode de sous-échantillonnage inconnue: {method}")
+
+    frame = df[[x, y]] if x != y else df[[x]]
+    x_values, y_values = axis_values(frame[x]), axis_values(frame[y])
+    valid = np.flatnonzero(~np.isnan(x_values) & ~np.isnan(y_values))
+    order = valid[np.argsort(x_values[valid], kind="stable")]
+
+    if method == "lttb":
+        kept = lttb_indices(x_values[order], y_values[order], max_points)
+    else:
+        kept = minmax_indices(y_values[order], max_points)
+    return frame.iloc[order[kept]], _info(LINE_METHODS[method], len(kept), len(df))
+
+
+def downsample_scatter(df: pd.DataFrame, x: str, y: str, max_points: int = MAX_POINTS_PER_TRACE,
+                       grid_size: int = SCATTER_GRID_SIZE, columns=None):
+    """
+    Lignes à tracer pour un nuage de points, au plus ~`max_points`
+
+    Args:
+        columns: colonnes gardées dans le résultat (défaut: x et y), ex: couleur
+
+    Retourne (DataFrame à tracer, info) avec info None si rien n'a été réduit.
+    """
+    if len(df) <= max_points:
+        return df, None
+
+    columns = list(dict.fromkeys(columns or [x, y]))
+    x_values, y_values = axis_values(df[x]), axis_values(df[y])
+    valid = np.flatnonzero(~np.isnan(x_values) & ~np.isnan(y_values))
+    kept = valid[grid_sample_indices(x_values[valid], y_values[valid], max_points, grid_size)]
+    return df[columns].iloc[kept], _info("échantillon stratifié", len(kept), len(df))
+
+
+def _info(method: str, shown: int, total: int) -> dict:
+    return {"method": method, "shown": int(shown), "total": int(total)}
+
+
+def downsampling_caption(info: dict) -> str:
+    """Légende indiquant qu'un sous-échantillonnage a été appliqué"""
+    return (
+        f"Sous-échantillonnage ({info['method']}): {info['shown']:,} points affichés "
+        f"sur {info['total']:,} lignes"
+    )
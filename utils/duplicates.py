@@ -0,0 +1,216 @@
+"""
+Détection des doublons à partir d'empreintes de lignes
+Les lignes sont hachées une seule fois (64 bits) par version du DataFrame;
+comptages, sous-ensembles de colonnes et suppressions réutilisent ces empreintes
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import DUPLICATE_CACHE_SIZE
+from utils.fingerprint import dataframe_fingerprint, mark_modified
+
+
+KEEP_OPTIONS = ("first", "last")
+
+
+class DuplicateDetector:
+    """
+    Empreintes 64 bits des lignes d'un DataFrame (ou d'un sous-ensemble de colonnes)
+
+    Deux lignes de même empreinte sont considérées identiques: avec 64 bits,
+    une collision reste improbable (≈ n² / 2^65 pour n lignes).
+    """
+
+    def __init__(self, hashes: np.ndarray, columns: list, dtypes: tuple):
+        """
+        Args:
+            hashes: empreinte de chaque ligne, dans l'ordre des positions
+            columns: colonnes prises en compte
+            dtypes: types des colonnes au moment du hachage
+        """
+        self.hashes = hashes
+        self.columns = columns
+        self.dtypes = dtypes
+        self._masks = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, subset=None) -> "DuplicateDetector":
+        """Hacher toutes les lignes (une passe vectorisée par colonne)"""
+        columns = list(subset) if subset else df.columns.tolist()
+        return cls(row_hashes(df, columns), columns, _dtypes(df, columns))
+
+    def duplicated(self, keep: str = "first") -> np.ndarray:
+        """Masque des doublons (comme DataFrame.duplicated), mis en cache"""
+        if keep not in KEEP_OPTIONS:
+            raise ValueError(f"keep doit valoir {' ou '.join(KEEP_OPTIONS)}")
+        if keep not in self._masks:
+            self._masks[keep] = pd.Series(self.hashes).duplicated(keep=keep).to_numpy()
+        return self._masks[keep]
+
+    def count(self) -> int:
+        """Nombre de lignes en double (hors première occurrence)"""
+        return int(self.duplicated("first").sum())
+
+    def take(self, positions) -> "DuplicateDetector":
+        """Détecteur des lignes conservées (positions ou masque booléen)"""
+        return DuplicateDetector(self.hashes[positions], self.columns, self.dtypes)
+
+    def append(self, rows: pd.DataFrame):
+        """
+        Détecteur après ajout de lignes: seules les nouvelles sont hachées
+
+        Retourne None si les types ont changé (les empreintes ne seraient
+        plus comparables): le détecteur sera recalculé à la demande.
+        """
+        if _dtypes(rows, self.columns) != self.dtypes:
+            return None
+        hashes = np.concatenate([self.hashes, row_hashes(rows, self.columns)])
+        return DuplicateDetector(hashes, self.columns, self.dtypes)
+
+    def replace(self, positions, rows: pd.DataFrame):
+        """Détecteur après modification de lignes: seules celles-ci sont rehachées (None si types changés)"""
+        if _dtypes(rows, self.columns) != self.dtypes:
+            return None
+        hashes = self.hashes.copy()
+        hashes[positions] = row_hashes(rows, self.columns)
+        return DuplicateDetector(hashes, self.columns, self.dtypes)
+
+
+def _dtypes(df: pd.DataFrame, columns) -> tuple:
+    return tuple(str(df[col].dtype) for col in columns)
+
+
+# Multiplicateur impair de combinaison des empreintes de colonnes
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def row_hashes(df: pd.DataFrame, columns) -> np.ndarray:
+    """Empreinte 64 bits de chaque ligne sur les colonnes données"""
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for col in columns:
+            hashes = (hashes ^ column_hashes(df[col])) * _MIX
+    return hashes
+
+
+def column_hashes(series: pd.Series) -> np.ndarray:
+    """
+    Empreinte 64 bits de chaque valeur d'une colonne
+
+    Colonnes non numériques: factorisation puis hachage des seules valeurs
+    distinctes (bien plus rapide que de hacher chaque chaîne).
+    """
+    if pd.api.types.is_float_dtype(series):
+        # -0.0 + 0.0 == 0.0: même empreinte pour 0.0 et -0.0, égaux pour drop_duplicates
+        series = pd.Series(series.to_numpy(dtype=float, na_value=np.nan) + 0.0)
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+        return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+    try:
+        codes, uniques = pd.factorize(series)
+    except TypeError:
+        # Valeurs non hachables (listes, dicts...): repli sur leur représentation texte
+        codes, uniques = pd.factorize(series.astype(str))
+    unique_hashes = pd.util.hash_array(np.asarray(uniques, dtype=object), categorize=False)
+    missing_hash = pd.util.hash_array(np.array([None], dtype=object))[0]
+    return np.where(codes >= 0, unique_hashes[codes], missing_hash)
+
+
+# Détecteurs partagés: (empreinte du DataFrame, colonnes) -> DuplicateDetector
+_detector_cache = OrderedDict()
+_detector_lock = threading.Lock()
+
+
+def _subset_key(subset):
+    return tuple(subset) if subset else None
+
+
+def get_detector(df: pd.DataFrame, subset=None) -> DuplicateDetector:
+    """Détecteur du DataFrame, servi depuis le cache tant que les données n'ont pas changé"""
+    key = (dataframe_fingerprint(df), _subset_key(subset))
+    with _detector_lock:
+        if key in _detector_cache:
+            _detector_cache.move_to_end(key)
+            return _detector_cache[key]
+
+    detector = DuplicateDetector.from_frame(df, subset)
+    _store(key, detector)
+    return detector
+
+
+def _store(key, detector: DuplicateDetector):
+    """Enregistrer un détecteur dans le cache (éviction LRU)"""
+    with _detector_lock:
+        _detector_cache[key] = detector
+        _detector_cache.move_to_end(key)
+        while len(_detector_cache) > DUPLICATE_CACHE_SIZE:
+            _detector_cache.popitem(last=False)
+
+
+def count_duplicates(df: pd.DataFrame, subset=None) -> int:
+    """Nombre de doublons (sur toutes les colonnes ou sur `subset`)"""
+    return get_detector(df, subset).count()
+
+
+def drop_duplicates(df: pd.DataFrame, subset=None, keep: str = "first"):
+    """
+    Supprimer les doublons à partir des empreintes en cache
+
+    Returns:
+        (DataFrame sans doublons marqué par mark_modified, lignes supprimées)
+    """
+    old_key = dataframe_fingerprint(df)
+    duplicated = get_detector(df, subset).duplicated(keep)
+    removed = df[duplicated]
+    new_df = mark_modified(df[~duplicated])
+    rows_dropped(old_key, new_df, ~duplicated)
+    return new_df, removed
+
+
+def _derive(old_key: str, new_df: pd.DataFrame, update):
+    """Dériver les détecteurs en cache sous `old_key` pour la nouvelle version"""
+    new_key = dataframe_fingerprint(new_df)
+    with _detector_lock:
+        previous = [(key[1], det) for key, det in _detector_cache.items() if key[0] == old_key]
+    for subset, detector in previous:
+        derived = update(detector)
+        if derived is not None:
+            _store((new_key, subset), derived)
+
+
+def rows_dropped(old_key: str, new_df: pd.DataFrame, kept):
+    """Mettre à jour les détecteurs après suppression de lignes (`kept`: masque ou positions)"""
+    rows_changed(old_key, new_df, kept=kept)
+
+
+def rows_appended(old_key: str, new_df: pd.DataFrame, rows: pd.DataFrame):
+    """Mettre à jour les détecteurs après ajout de `rows` en fin de DataFrame"""
+    _derive(old_key, new_df, lambda detector: detector.append(rows))
+
+
+def rows_replaced(old_key: str, new_df: pd.DataFrame, positions):
+    """Mettre à jour les détecteurs après modification des lignes aux `positions`"""
+    rows_changed(old_key, new_df, replaced=positions)
+
+
+def rows_changed(old_key: str, new_df: pd.DataFrame, kept=None, replaced=None):
+    """
+    Mettre à jour les détecteurs après suppression puis modification de lignes
+
+    Args:
+        kept: lignes conservées de l'ancienne version (masque ou positions), None = toutes
+        replaced: positions, dans `new_df`, des lignes dont les valeurs ont changé
+    """
+    kept = None if kept is None else np.asarray(kept)
+    replaced = None if replaced is None else np.asarray(replaced)
+    rows = None if replaced is None else new_df.iloc[replaced]
+
+    def update(detector):
+        if kept is not None:
+            detector = detector.take(kept)
+        if replaced is not None and len(replaced):
+            detector = detector.replace(replaced, rows)
+        return detector
+
+    _derive(old_key, new_df, update)
@@ -0,0 +1,77 @@
+"""
+Cache des graphiques Plotly d'un rerun à l'autre
+Figures sérialisées (JSON) indexées par (empreinte du DataFrame, description
+du graphique); les plus anciennes sont évincées au-delà d'un budget mémoire
+"""
+import threading
+from collections import OrderedDict
+import plotly.io as pio
+from config import FIGURE_CACHE_MAX_BYTES
+from utils.fingerprint import dataframe_fingerprint
+
+
+# (empreinte, description) -> (JSON de la figure, note associée)
+_figure_cache = OrderedDict()
+_figure_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bytes": 0}
+
+
+def cached_figure(df, spec: tuple, build, max_bytes: int = FIGURE_CACHE_MAX_BYTES):
+    """
+    Figure décrite par `spec` sur `df`, construite une seule fois par version des données
+
+    Args:
+        spec: description hashable du graphique (type, variables, options...)
+        build: fonction sans argument qui renvoie la figure, ou (figure, note)
+               où note est un texte affiché avec le graphique (ex: sous-échantillonnage)
+        max_bytes: budget mémoire du cache (une figure plus grande n'est pas gardée)
+
+    Returns:
+        (figure, note), note None si la construction n'en fournit pas
+    """
+    key = (dataframe_fingerprint(df), spec)
+    with _figure_lock:
+        entry = _figure_cache.get(key)
+        if entry is not None:
+            _figure_cache.move_to_end(key)
+            _stats["hits"] += 1
+        else:
+            _stats["misses"] += 1
+    if entry is not None:
+        return pio.from_json(entry[0]), entry[1]
+
+    result = build()
+    fig, note = result if isinstance(result, tuple) else (result, None)
+    serialized = fig.to_json()
+    size = len(serialized)
+
+    with _figure_lock:
+        if size <= max_bytes and key not in _figure_cache:
+            _figure_cache[key] = (serialized, note)
+            _stats["bytes"] += size
+            while _stats["bytes"] > max_bytes:
+                _, (evicted, _) = _figure_cache.popitem(last=False)
+                _stats["bytes"] -= len(evicted)
+    return fig, note
+
+
+def cache_stats() -> dict:
+    """Compteurs du cache: hits, misses, entries, bytes"""
+    with _figure_lock:
+        return {**_stats, "entries": len(_figure_cache)}
+
+
+def stats_label() -> str:
+    """Résumé lisible des compteurs du cache"""
+    stats = cache_stats()
+    return (
+        f"Cache des graphiques: {stats['hits']} réutilisés, {stats['misses']} construits "
+        f"({stats['entries']} en mémoire, {stats['bytes'] / 1024 ** 2:.1f} Mo)"
+    )
+
+
+def clear_figure_cache():
+    """Vider le cache et remettre les compteurs à zéro"""
+    with _figure_lock:
+        _figure_cache.clear()
+        _stats.update(hits=0, misses=0, bytes=0)
@@ -0,0 +1,100 @@
+"""
+Empreinte d'un DataFrame
+Sert de clé aux caches (profil, graphiques, modèles) d'un rerun à l'autre
+"""
+import hashlib
+import threading
+import uuid
+import weakref
+import numpy as np
+import pandas as pd
+
+
+# Jeton de version posé par les opérations de nettoyage (df.attrs)
+VERSION_ATTR = "dataset_version"
+
+# Nombre de lignes échantillonnées pour le contrôle rapide du contenu
+_SAMPLED_ROWS = 256
+
+# id(DataFrame) -> (référence faible, contrôle rapide, empreinte du contenu)
+_content_memo = {}
+_memo_lock = threading.Lock()
+
+
+def mark_modified(df: pd.DataFrame) -> pd.DataFrame:
+    """Donner une nouvelle version au DataFrame (invalide les caches associés)"""
+    df.attrs[VERSION_ATTR] = uuid.uuid4().hex
+    return df
+
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Clé de cache d'un DataFrame: contenu complet et jeton de version
+
+    Deux DataFrames de même forme qui ne diffèrent que par des lignes non
+    échantillonnées (fichier révisé, copie modifiée) ont des clés différentes.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(df.attrs.get(VERSION_ATTR)).encode())
+    digest.update(content_digest(df).encode())
+    return digest.hexdigest()
+
+
+def content_digest(df: pd.DataFrame) -> str:
+    """
+    Empreinte du contenu seul (colonnes, types, index et toutes les valeurs)
+
+    Le hachage complet n'est calculé qu'une fois par objet: les appels
+    suivants le reprennent tant que le contrôle rapide (forme, version et
+    lignes échantillonnées) ne change pas. Une modification en place qui ne
+    touche aucune ligne échantillonnée doit passer par mark_modified.
+    """
+    check = _quick_check(df)
+    with _memo_lock:
+        entry = _content_memo.get(id(df))
+        if entry is not None and entry[0]() is df and entry[1] == check:
+            return entry[2]
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((df.shape, tuple(map(str, df.columns)), tuple(map(str, df.dtypes)))).encode())
+    digest.update(_hash_values(df))
+    content = digest.hexdigest()
+
+    key = id(df)
+    with _memo_lock:
+        _content_memo[key] = (weakref.ref(df, lambda _, key=key: _forget(key)), check, content)
+    return content
+
+
+def _forget(key):
+    """Rappel de la référence faible: le DataFrame a été libéré"""
+    with _memo_lock:
+        entry = _content_memo.get(key)
+        if entry is not None and entry[0]() is None:
+            del _content_memo[key]
+
+
+def _quick_check(df: pd.DataFrame) -> str:
+    """Contrôle en O(1) vis-à-vis du nombre de lignes: forme, types, version, échantillon fixe"""
+    digest = hashlib.blake2b(digest_size=16)
+    header = (
+        df.shape,
+        tuple(map(str, df.columns)),
+        tuple(map(str, df.dtypes)),
+        df.attrs.get(VERSION_ATTR),
+    )
+    digest.update(repr(header).encode())
+
+    if len(df):
+        positions = np.unique(np.linspace(0, len(df) - 1, min(len(df), _SAMPLED_ROWS)).astype(int))
+        digest.update(_hash_values(df.iloc[positions]))
+    return digest.hexdigest()
+
+
+def _hash_values(df: pd.DataFrame) -> bytes:
+    """Empreintes des lignes (index compris)"""
+    try:
+        return pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()
+    except TypeError:
+        # Cellules non hachables (listes, dicts...): repli sur la représentation texte
+        return pd.util.hash_pandas_object(df.astype(str), index=True).to_numpy().tobytes()
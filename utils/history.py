@@ -0,0 +1,170 @@
+"""
+Historique des versions du jeu de données (annuler / rétablir)
+Chaque version = positions de lignes sur une base immuable + colonnes modifiées;
+les colonnes inchangées ne sont jamais copiées
+"""
+import uuid
+import numpy as np
+import pandas as pd
+from config import HISTORY_MAX_VERSIONS
+from utils.fingerprint import VERSION_ATTR
+
+
+class _Version:
+    """Version: lignes de la base conservées et colonnes réécrites"""
+
+    def __init__(self, positions, columns, label, version_id, steps=()):
+        """
+        Args:
+            positions: positions des lignes de la base (None = toutes, dans l'ordre)
+            columns: dict colonne -> valeurs alignées sur `positions` (tableaux partagés)
+            label: description de l'opération qui a produit la version
+            version_id: jeton de version posé dans df.attrs (clé des caches)
+            steps: étapes de plan appliquées depuis la base (recette de la version)
+        """
+        self.positions = positions
+        self.columns = columns
+        self.label = label
+        self.version_id = version_id
+        self.steps = list(steps)
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire propre à la version (positions + colonnes réécrites)"""
+        size = 0 if self.positions is None else self.positions.nbytes
+        return size + sum(int(values.nbytes) for values in self.columns.values())
+
+
+class DatasetHistory:
+    """Versions successives d'un DataFrame, sans copie complète par version"""
+
+    def __init__(self, base: pd.DataFrame, label: str = "Import", max_versions: int = HISTORY_MAX_VERSIONS):
+        """
+        Args:
+            base: DataFrame d'origine (n'est jamais modifié)
+            label: libellé de la version initiale
+            max_versions: nombre maximal de versions gardées (les plus anciennes sont oubliées)
+        """
+        self.base = base
+        self.max_versions = max_versions
+        if VERSION_ATTR not in base.attrs:
+            base.attrs[VERSION_ATTR] = uuid.uuid4().hex
+        self._versions = [_Version(None, {}, label, base.attrs[VERSION_ATTR])]
+        self._index = 0
+        self._frame = base
+
+    @property
+    def current(self) -> pd.DataFrame:
+        """DataFrame de la version courante"""
+        return self._frame
+
+    @property
+    def can_undo(self) -> bool:
+        return self._index > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self._index < len(self._versions) - 1
+
+    @property
+    def labels(self) -> list:
+        """Libellés des versions, de la plus ancienne à la plus récente"""
+        return [version.label for version in self._versions]
+
+    @property
+    def position(self) -> int:
+        """Indice de la version courante dans `labels`"""
+        return self._index
+
+    @property
+    def steps(self) -> list:
+        """Étapes de nettoyage menant de la base à la version courante (voir utils.recipe)"""
+        return [dict(step) for step in self._versions[self._index].steps]
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire gardée par les versions, hors base"""
+        return sum(version.nbytes for version in self._versions)
+
+    def commit(self, new_df: pd.DataFrame, kept, changed_columns, label: str, steps=()) -> pd.DataFrame:
+        """
+        Enregistrer une nouvelle version dérivée de la version courante
+
+        Args:
+            new_df: résultat de l'opération (devient la version courante)
+            kept: positions, dans la version courante, des lignes conservées
+            changed_columns: colonnes dont des valeurs ont été modifiées
+            label: description de l'opération
+            steps: étapes de plan correspondantes (vide si l'opération n'en est pas une)
+
+        Les versions « rétablissables » sont abandonnées, comme dans un éditeur.
+        """
+        current = self._versions[self._index]
+        kept = np.asarray(kept, dtype=np.intp)
+        all_kept = len(kept) == len(self._frame)
+
+        if all_kept:
+            positions = current.positions
+        elif current.positions is None:
+            positions = kept
+        else:
+            positions = current.positions[kept]
+
+        # Colonnes réécrites auparavant: restreintes aux lignes conservées;
+        # colonnes réécrites maintenant: partagées avec new_df (pas de copie)
+        columns = {
+            col: values if all_kept else values[kept]
+            for col, values in current.columns.items() if col not in changed_columns
+        }
+        columns.update({col: new_df[col].array for col in changed_columns})
+
+        version_id = new_df.attrs.get(VERSION_ATTR) or uuid.uuid4().hex
+        new_df.attrs[VERSION_ATTR] = version_id
+
+        del self._versions[self._index + 1:]
+        self._versions.append(_Version(positions, columns, label, version_id, current.steps + list(steps)))
+        if len(self._versions) > self.max_versions:
+            del self._versions[:len(self._versions) - self.max_versions]
+        self._index = len(self._versions) - 1
+        self._frame = new_df
+        return new_df
+
+    def apply(self, plan, label: str = None):
+        """
+        Exécuter un CleaningPlan sur la version courante et l'enregistrer
+
+        Returns:
+            (nouveau DataFrame courant, rapport du plan)
+        """
+        result, report, kept, changed = plan.execute_with_changes(self._frame)
+        if result is not self._frame:
+            self.commit(result, kept, changed, label or " + ".join(plan.describe()), plan.steps)
+        return result, report
+
+    def undo(self) -> pd.DataFrame:
+        """Revenir à la version précédente"""
+        if self.can_undo:
+            self._index -= 1
+            self._frame = self._materialize(self._versions[self._index])
+        return self._frame
+
+    def redo(self) -> pd.DataFrame:
+        """Rétablir la version suivante"""
+        if self.can_redo:
+            self._index += 1
+            self._frame = self._materialize(self._versions[self._index])
+        return self._frame
+
+    def _materialize(self, version: _Version) -> pd.DataFrame:
+        """Reconstruire le DataFrame d'une version (même jeton: les caches restent valables)"""
+        if version.positions is None and not version.columns:
+            return self.base
+
+        frame = self.base.drop(columns=list(version.columns))
+        if version.positions is not None:
+            frame = frame.iloc[version.positions]
+        for col, values in version.columns.items():
+            frame[col] = values
+        frame = frame[self.base.columns]
+        frame.attrs[VERSION_ATTR] = version.version_id
+        return frame
@@ -0,0 +1,242 @@
+"""
+Imputation des valeurs manquantes numériques
+Moyenne / médiane (globales ou par groupe), propagation, interpolation sur un
+ordre (temps) et plus proches voisins via un index KD-tree. Un Imputer ajusté
+sur un jeu de données peut être réappliqué tel quel à un autre
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+from config import IMPUTER_MAX_FIT_ROWS, IMPUTER_KNN_NEIGHBORS, IMPUTER_KNN_BATCH, IMPUTER_CACHE_SIZE
+from utils.fingerprint import dataframe_fingerprint
+
+
+STRATEGIES = {
+    "mean": "Moyenne",
+    "median": "Médiane",
+    "forward_fill": "Forward Fill",
+    "group_mean": "Moyenne par groupe",
+    "group_median": "Médiane par groupe",
+    "interpolate": "Interpolation",
+    "knn": "Plus proches voisins",
+}
+GROUP_STRATEGIES = ("group_mean", "group_median")
+
+# Imputers ajustés: (empreinte, paramètres) -> Imputer
+_imputer_cache = OrderedDict()
+_imputer_lock = threading.Lock()
+
+
+class Imputer:
+    """Remplissage des colonnes numériques selon une stratégie, ajusté une fois"""
+
+    def __init__(self, strategy: str = "mean", columns=None, group_by: str = None,
+                 order_by: str = None, n_neighbors: int = IMPUTER_KNN_NEIGHBORS,
+                 max_fit_rows: int = IMPUTER_MAX_FIT_ROWS):
+        """
+        Args:
+            strategy: clé de STRATEGIES
+            columns: colonnes à remplir (défaut: colonnes numériques)
+            group_by: colonne de regroupement (group_mean, group_median)
+            order_by: colonne d'ordre, ex: date (interpolate, forward_fill; défaut: ordre des lignes)
+            n_neighbors: nombre de voisins moyennés (knn)
+            max_fit_rows: lignes de référence de l'index des voisins au plus (échantillon au-delà)
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Stratégie d'imputation inconnue: {strategy}")
+        if strategy in GROUP_STRATEGIES and not group_by:
+            raise ValueError("Une colonne de regroupement est nécessaire")
+        self.strategy = strategy
+        self.columns = None if columns is None else list(columns)
+        self.group_by = group_by
+        self.order_by = order_by
+        self.n_neighbors = n_neighbors
+        self.max_fit_rows = max_fit_rows
+        self.fitted = False
+
+    @property
+    def params(self) -> dict:
+        """Paramètres (clé du cache, description du plan)"""
+        return {
+            "strategy": self.strategy,
+            "columns": None if self.columns is None else tuple(self.columns),
+            "group_by": self.group_by,
+            "order_by": self.order_by,
+            "n_neighbors": self.n_neighbors,
+            "max_fit_rows": self.max_fit_rows,
+        }
+
+    def fit(self, df: pd.DataFrame) -> "Imputer":
+        """Apprendre les valeurs de remplacement (ou l'index des voisins) sur `df`"""
+        if self.columns is None:
+            self.columns = [
+                col for col in df.select_dtypes(include=[np.number]).columns
+                if col not in (self.group_by, self.order_by)
+            ]
+        values = _matrix(df, self.columns)
+
+        # Valeurs globales: dernier recours (groupe inconnu, aucun voisin utilisable...)
+        reducer = np.nanmedian if self.strategy in ("median", "group_median") else np.nanmean
+        self.fallback = _nan_reduce(values, reducer)
+
+        if self.strategy in GROUP_STRATEGIES:
+            frame = pd.DataFrame(values, columns=range(len(self.columns)))
+            frame["_key"] = df[self.group_by].to_numpy()
+            grouped = frame.groupby("_key", dropna=True, sort=False)
+            table = grouped.mean() if self.strategy == "group_mean" else grouped.median()
+            self.group_values = table[list(range(len(self.columns)))]
+
+        if self.strategy == "knn":
+            reference = _sample_rows(len(df), self.max_fit_rows)
+            self._fit_neighbors(values if reference is None else values[reference])
+
+        self.fitted = True
+        return self
+
+    def _fit_neighbors(self, sample: np.ndarray):
+        """Lignes de référence complètes, standardisées; index construits à la demande"""
+        complete = sample[~np.isnan(sample).any(axis=1)]
+        self.center = complete.mean(axis=0) if len(complete) else np.zeros(len(self.columns))
+        scale = complete.std(axis=0) if len(complete) else np.ones(len(self.columns))
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self.reference = complete
+        self._trees = {}
+
+    def _tree(self, features: tuple) -> KDTree:
+        """Index KD-tree sur un sous-ensemble de variables (un par motif de manquants)"""
+        if features not in self._trees:
+            scaled = (self.reference[:, features] - self.center[list(features)]) / self.scale[list(features)]
+            self._trees[features] = KDTree(scaled)
+        return self._trees[features]
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Colonnes remplies de `df` (mêmes lignes, mêmes colonnes `columns`)
+
+        Les cellules qu'aucune stratégie ne peut remplir reçoivent la valeur
+        globale apprise (sauf forward_fill: les manquants de tête restent vides).
+        """
+        if not self.fitted:
+            raise ValueError("Imputer non ajusté: appelez fit() d'abord")
+        values = _matrix(df, self.columns)
+        missing = np.isnan(values)
+        if not missing.any():
+            return pd.DataFrame(values, index=df.index, columns=self.columns)
+
+        if self.strategy == "forward_fill":
+            order = self._order(df)
+            ordered = pd.DataFrame(values[order]).ffill().to_numpy()
+            values[order] = ordered
+            return pd.DataFrame(values, index=df.index, columns=self.columns)
+
+        if self.strategy in GROUP_STRATEGIES:
+            keys = df[self.group_by].to_numpy()
+            by_group = self.group_values.reindex(keys).to_numpy(dtype=float)
+            values = np.where(missing, by_group, values)
+        elif self.strategy == "interpolate":
+            values = self._interpolate(df, values, missing)
+        elif self.strategy == "knn":
+            values = self._neighbors(values, missing)
+
+        still_missing = np.isnan(values)
+        values = np.where(still_missing, self.fallback, values)
+        return pd.DataFrame(values, index=df.index, columns=self.columns)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+    def _order(self, df) -> np.ndarray:
+        """Positions des lignes dans l'ordre de `order_by` (tri stable)"""
+        if not self.order_by:
+            return np.arange(len(df))
+        return np.argsort(_order_values(df[self.order_by]), kind="stable")
+
+    def _interpolate(self, df, values, missing) -> np.ndarray:
+        """Interpolation linéaire selon `order_by` (ou la position), valeurs extrêmes prolongées"""
+        x = _order_values(df[self.order_by]) if self.order_by else np.arange(len(df), dtype=float)
+        order = np.argsort(x, kind="stable")
+        x_sorted = x[order]
+        has_x = ~np.isnan(x_sorted)
+        for j in np.flatnonzero(missing.any(axis=0)):
+            y = values[order, j]
+            known = has_x & ~np.isnan(y)
+            targets = has_x & np.isnan(y)
+            if known.any() and targets.any():
+                y[targets] = np.interp(x_sorted[targets], x_sorted[known], y[known])
+                values[order, j] = y
+        return values
+
+    def _neighbors(self, values, missing) -> np.ndarray:
+        """Moyenne des k plus proches lignes complètes, sur les variables présentes de chaque ligne"""
+        if len(self.reference) == 0:
+            return values
+        k = min(self.n_neighbors, len(self.reference))
+        rows = np.flatnonzero(missing.any(axis=1))
+        # Un index par motif de manquants: chaque ligne est comparée sur ses seules variables présentes
+        patterns, inverse = np.unique(missing[rows], axis=0, return_inverse=True)
+        for p, pattern in enumerate(patterns):
+            features = tuple(np.flatnonzero(~pattern))
+            if not features:
+                continue
+            targets = np.flatnonzero(pattern)
+            tree = self._tree(features)
+            pattern_rows = rows[inverse.ravel() == p]
+            for start in range(0, len(pattern_rows), IMPUTER_KNN_BATCH):
+                batch = pattern_rows[start:start + IMPUTER_KNN_BATCH]
+                query = (values[np.ix_(batch, features)] - self.center[list(features)]) / self.scale[list(features)]
+                _, neighbors = tree.query(query, k=k)
+                values[np.ix_(batch, targets)] = self.reference[:, targets][neighbors].mean(axis=1)
+        return values
+
+
+def get_imputer(df: pd.DataFrame, **params) -> Imputer:
+    """Imputer ajusté sur `df`, partagé tant que les données ne changent pas"""
+    imputer = Imputer(**params)
+    key = (dataframe_fingerprint(df), tuple(sorted(imputer.params.items())))
+    with _imputer_lock:
+        if key in _imputer_cache:
+            _imputer_cache.move_to_end(key)
+            return _imputer_cache[key]
+
+    imputer.fit(df)
+    with _imputer_lock:
+        _imputer_cache[key] = imputer
+        _imputer_cache.move_to_end(key)
+        while len(_imputer_cache) > IMPUTER_CACHE_SIZE:
+            _imputer_cache.popitem(last=False)
+    return imputer
+
+
+def _matrix(df, columns) -> np.ndarray:
+    """Colonnes -> matrice float64 modifiable (NaN = manquant)"""
+    values = np.empty((len(df), len(columns)))
+    for j, col in enumerate(columns):
+        values[:, j] = df[col].to_numpy(dtype=float, na_value=np.nan)
+    return values
+
+
+def _order_values(series: pd.Series) -> np.ndarray:
+    """Clé d'ordre numérique (dates -> nanosecondes, NaN = inconnue)"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[ns]").astype("int64").astype(float)
+        values[series.isnull().to_numpy()] = np.nan
+        return values
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _sample_rows(n_rows: int, max_rows: int):
+    """Positions d'un échantillon fixe de `max_rows` lignes, None si inutile"""
+    if max_rows is None or n_rows <= max_rows:
+        return None
+    return np.sort(np.random.default_rng(0).choice(n_rows, size=max_rows, replace=False))
+
+
+def _nan_reduce(values, reducer) -> np.ndarray:
+    """Réduction par colonne en ignorant les NaN (colonne vide -> NaN, sans avertissement)"""
+    result = np.full(values.shape[1], np.nan)
+    present = ~np.isnan(values).all(axis=0)
+    if present.any():
+        result[present] = reducer(values[:, present], axis=0)
+    return result
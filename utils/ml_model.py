@@ -1,31 +1,109 @@
 """
 Modèles de prédiction et analyse
 """
+import copy
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.ensemble import (
+    RandomForestRegressor, RandomForestClassifier,
+    HistGradientBoostingRegressor, HistGradientBoostingClassifier
+)
+from sklearn.inspection import permutation_importance
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score
+from threadpoolctl import threadpool_limits
+from config import (
+    MODEL_PARALLEL_PREDICT_ROWS, HGB_ROW_THRESHOLD, HGB_MAX_ITER,
+    HGB_EARLY_STOPPING_ROUNDS, PERMUTATION_IMPORTANCE_ROWS
+)
+from utils.cpu_scheduler import get_scheduler
+
+
+BACKENDS = {
+    "auto": "Automatique (selon le volume)",
+    "rf": "Random Forest",
+    "hgb": "Gradient Boosting (histogrammes)",
+}
+
+# Paramètres d'entraînement par défaut (font partie de la clé du registre des modèles)
+DEFAULT_CONFIG = {"n_estimators": 100, "test_size": 0.2, "random_state": 42, "backend": "auto"}
+
+# Modalités au plus d'une variable catégorielle native (intervalles du gradient boosting)
+_HGB_MAX_CATEGORIES = 255
+
+
+def resolve_backend(backend: str, n_rows: int) -> str:
+    """Moteur effectif: "auto" -> gradient boosting au-delà de HGB_ROW_THRESHOLD lignes"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Moteur de prédiction inconnu: {backend}")
+    if backend == "auto":
+        return "hgb" if n_rows > HGB_ROW_THRESHOLD else "rf"
+    return backend
 
 
 class PredictionModel:
     """Classe pour gérer les modèles de prédiction"""
     
-    def __init__(self, df: pd.DataFrame, target_column: str):
+    def __init__(self, df: pd.DataFrame, target_column: str, n_estimators: int = DEFAULT_CONFIG["n_estimators"],
+                 test_size: float = DEFAULT_CONFIG["test_size"], random_state: int = DEFAULT_CONFIG["random_state"],
+                 n_jobs: int = None, backend: str = DEFAULT_CONFIG["backend"]):
+        """
+        Args:
+            n_jobs: cœurs souhaités pour l'entraînement (défaut: part de l'utilisateur
+                    accordée par le planificateur, voir utils.cpu_scheduler)
+            backend: "rf" (Random Forest), "hgb" (gradient boosting sur histogrammes:
+                     manquants et catégories natifs, arrêt anticipé) ou "auto"
+        """
         self.df = df.copy()
         self.target_column = target_column
+        self.n_estimators = n_estimators
+        self.test_size = test_size
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.backend = resolve_backend(backend, len(df))
         self.model = None
+        self.scores = None
+        self.importances = None
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.is_classification = False
         self._prepare_data()
+        self.feature_names = list(self.X.columns)
+        # Variables catégorielles traitées nativement par le gradient boosting
+        self.categorical_mask = [
+            col in self.label_encoders and len(self.label_encoders[col].classes_) <= _HGB_MAX_CATEGORIES
+            for col in self.feature_names
+        ]
+
+    @property
+    def config(self) -> dict:
+        """Paramètres d'entraînement (clé du registre des modèles)"""
+        return {"n_estimators": self.n_estimators, "test_size": self.test_size,
+                "random_state": self.random_state, "backend": self.backend}
+
+    def __getstate__(self):
+        """Sérialisation sans les données d'entraînement (df, X, y)"""
+        state = self.__dict__.copy()
+        for attr in ("df", "X", "y"):
+            state.pop(attr, None)
+        return state
+
+    def release_data(self):
+        """Libérer les données d'entraînement; le modèle entraîné reste utilisable"""
+        if self.model is None:
+            self.train()
+        for attr in ("df", "X", "y"):
+            self.__dict__.pop(attr, None)
+        return self
     
     def _prepare_data(self):
         """Préparer les données pour l'entraînement"""
         # Déterminer si c'est un problème de classification ou régression
         unique_values = self.df[self.target_column].nunique()
-        self.is_classification = unique_values < 20 or self.df[self.target_column].dtype == 'object'
+        self.is_classification = (
+            unique_values < 20 or not pd.api.types.is_numeric_dtype(self.df[self.target_column])
+        )
         
         # Séparer features et target
         self.X = self.df.drop(columns=[self.target_column])
@@ -40,12 +118,13 @@ class PredictionModel:
                 # For categorical/string-like columns, use LabelEncoder after filling NaN
                 try:
                     le = LabelEncoder()
-                    filled = self.X[col].fillna('__MISSING__').astype(str)
+                    # astype(object): une colonne `category` refuse une modalité inconnue
+                    filled = self.X[col].astype(object).fillna('__MISSING__').astype(str)
                     self.X[col] = le.fit_transform(filled)
                     self.label_encoders[col] = le
                 except Exception:
                     # Fallback: convert to string values then to codes
-                    self.X[col] = self.X[col].fillna('__MISSING__').astype(str).apply(lambda x: hash(x) % 1000000)
+                    self.X[col] = self.X[col].astype(object).fillna('__MISSING__').astype(str).apply(lambda x: hash(x) % 1000000)
 
             # Booleans -> int
             if self.X[col].dtype == 'bool':
@@ -55,14 +134,15 @@ class PredictionModel:
         if self.is_classification:
             if self.y.dtype == 'object' or not pd.api.types.is_numeric_dtype(self.y):
                 le = LabelEncoder()
-                self.y = le.fit_transform(self.y.fillna('__MISSING__').astype(str))
+                self.y = le.fit_transform(self.y.astype(object).fillna('__MISSING__').astype(str))
                 self.label_encoders['target'] = le
             else:
                 # coerce numeric target
                 self.y = pd.to_numeric(self.y, errors='coerce')
 
         # Pour les colonnes numériques restantes: remplir NaN par la moyenne
-        for col in self.X.columns:
+        # (Random Forest seulement: le gradient boosting apprend où envoyer les manquants)
+        for col in self.X.columns if self.backend == "rf" else []:
             if pd.api.types.is_numeric_dtype(self.X[col]):
                 if self.X[col].isnull().any():
                     try:
@@ -79,67 +159,135 @@ class PredictionModel:
                     if not pd.api.types.is_numeric_dtype(self.X[col]):
                         self.X[col] = pd.to_numeric(self.X[col], errors='coerce').fillna(0)
 
-            self.X = pd.DataFrame(
-                self.scaler.fit_transform(self.X),
-                columns=self.X.columns
-            )
+            if self.backend == "hgb":
+                # Arbres sur histogrammes: pas de normalisation, codes des catégories intacts
+                self.X = self.X.astype(float)
+            else:
+                self.X = pd.DataFrame(
+                    self.scaler.fit_transform(self.X),
+                    columns=self.X.columns
+                )
         except Exception as e:
             raise ValueError(f"Erreur lors de la préparation des données pour le modèle: {e}")
     
-    def train(self):
-        """Entraîner le modèle"""
+    def train(self, owner=None):
+        """
+        Entraîner le modèle sur les cœurs accordés par le planificateur
+
+        Args:
+            owner: utilisateur à qui les cœurs sont comptés (partage équitable)
+        """
         X_train, X_test, y_train, y_test = train_test_split(
-            self.X, self.y, test_size=0.2, random_state=42
+            self.X, self.y, test_size=self.test_size, random_state=self.random_state
         )
         
-        if self.is_classification:
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-            self.model.fit(X_train, y_train)
-            train_score = self.model.score(X_train, y_train)
-            test_score = self.model.score(X_test, y_test)
-        else:
-            self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+        # threadpool_limits: le gradient boosting (OpenMP) reste dans sa réservation
+        with get_scheduler().reserve(self.n_jobs, owner) as n_jobs, \
+                threadpool_limits(limits=n_jobs, user_api="openmp"):
+            self.model = self._build_estimator(n_jobs)
             self.model.fit(X_train, y_train)
             train_score = self.model.score(X_train, y_train)
             test_score = self.model.score(X_test, y_test)
+            self.importances = self._compute_importances(X_test, y_test)
+        if self.backend == "rf":
+            # Les prédictions réservent leurs propres cœurs
+            self.model.n_jobs = None
         
-        return {"train_score": train_score, "test_score": test_score}
+        self.scores = {"train_score": train_score, "test_score": test_score}
+        return self.scores
+
+    def _build_estimator(self, n_jobs: int):
+        """Estimateur du moteur choisi, non entraîné"""
+        if self.backend == "hgb":
+            estimator = HistGradientBoostingClassifier if self.is_classification else HistGradientBoostingRegressor
+            return estimator(
+                max_iter=HGB_MAX_ITER,
+                early_stopping=True,
+                n_iter_no_change=HGB_EARLY_STOPPING_ROUNDS,
+                categorical_features=self.categorical_mask if any(self.categorical_mask) else None,
+                random_state=self.random_state,
+            )
+        estimator = RandomForestClassifier if self.is_classification else RandomForestRegressor
+        return estimator(n_estimators=self.n_estimators, random_state=self.random_state, n_jobs=n_jobs)
+
+    def _compute_importances(self, X_test, y_test) -> np.ndarray:
+        """
+        Importance relative des variables (somme = 1)
+
+        Random Forest: réduction d'impureté. Gradient boosting: importance par
+        permutation sur un échantillon des données de test (baisse du score).
+        """
+        if self.backend == "rf":
+            return self.model.feature_importances_
+        sample = min(len(X_test), PERMUTATION_IMPORTANCE_ROWS)
+        result = permutation_importance(
+            self.model, X_test, y_test, n_repeats=3, max_samples=sample, random_state=self.random_state
+        )
+        importances = np.clip(result.importances_mean, 0, None)
+        total = importances.sum()
+        return importances / total if total > 0 else importances
     
     def predict(self, input_data: dict):
         """Faire une prédiction"""
+        return self.predict_batch(pd.DataFrame([input_data]))[0]
+
+    def predict_batch(self, frame: pd.DataFrame, owner=None) -> np.ndarray:
+        """
+        Prédictions pour toutes les lignes d'un DataFrame (mêmes colonnes que les données d'origine)
+
+        Les modalités inconnues sont codées 0. Random Forest: les valeurs manquantes
+        prennent la moyenne d'entraînement; gradient boosting: elles sont gardées.
+        Au-delà de MODEL_PARALLEL_PREDICT_ROWS lignes, la prédiction est répartie
+        sur les cœurs accordés par le planificateur.
+        """
         if self.model is None:
-            self.train()
-        
+            self.train(owner)
+
         # Préparer l'entrée
-        df_input = pd.DataFrame([input_data])
-        
-        for col in df_input.columns:
+        df_input = frame.reindex(columns=self.feature_names)
+        for col in self.feature_names:
             if col in self.label_encoders:
-                try:
-                    df_input[col] = self.label_encoders[col].transform(df_input[col])
-                except:
-                    df_input[col] = 0
-        
-        # Normaliser
-        df_input = pd.DataFrame(
-            self.scaler.transform(df_input),
-            columns=df_input.columns
-        )
-        
+                values = df_input[col].astype(object).fillna('__MISSING__').astype(str)
+                codes = pd.Index(self.label_encoders[col].classes_).get_indexer(values)
+                df_input[col] = np.where(codes >= 0, codes, 0)
+            elif pd.api.types.is_bool_dtype(df_input[col]):
+                df_input[col] = df_input[col].astype(int)
+            else:
+                df_input[col] = pd.to_numeric(df_input[col], errors='coerce')
+
+        values = df_input.to_numpy(dtype=float, na_value=np.nan)
+        if self.backend == "hgb":
+            df_input = pd.DataFrame(values, columns=self.feature_names)
+        else:
+            # Manquants -> moyenne d'entraînement, puis normaliser
+            values = np.where(np.isnan(values), self.scaler.mean_, values)
+            df_input = pd.DataFrame(
+                self.scaler.transform(pd.DataFrame(values, columns=self.feature_names)),
+                columns=self.feature_names
+            )
+
         # Prédire
-        prediction = self.model.predict(df_input)[0]
-        
+        if len(df_input) >= MODEL_PARALLEL_PREDICT_ROWS:
+            # Copie superficielle (arbres partagés): le modèle en cache n'est pas modifié
+            estimator = copy.copy(self.model)
+            with get_scheduler().reserve(owner=owner) as n_jobs, \
+                    threadpool_limits(limits=n_jobs, user_api="openmp"):
+                if self.backend == "rf":
+                    estimator.n_jobs = n_jobs
+                predictions = estimator.predict(df_input)
+        else:
+            predictions = self.model.predict(df_input)
+
         if self.is_classification and 'target' in self.label_encoders:
-            prediction = self.label_encoders['target'].inverse_transform([int(prediction)])[0]
-        
-        return prediction
+            predictions = self.label_encoders['target'].inverse_transform(predictions.astype(int))
+        return predictions
     
     def get_feature_importance(self):
         """Obtenir l'importance des features"""
         if self.model is None:
             self.train()
         
-        importances = self.model.feature_importances_
-        feature_names = self.X.columns
+        importances = self.importances
+        feature_names = self.feature_names
         
         return dict(zip(feature_names, importances))
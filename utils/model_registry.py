@@ -0,0 +1,119 @@
+"""
+Registre des modèles de prédiction entraînés
+Un modèle est identifié par (empreinte du contenu, cible, variables, paramètres):
+gardé en mémoire (LRU) et sur disque par utilisateur, il n'est réentraîné que
+si les données ou les paramètres changent
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import joblib
+import pandas as pd
+from config import MODEL_CACHE_SIZE, MODEL_DISK_MAX_FILES, MODEL_PERSISTENCE_ENABLED
+from utils.fingerprint import content_digest
+from utils.ml_model import PredictionModel, DEFAULT_CONFIG, resolve_backend
+
+
+MODELS_DIRNAME = ".models"
+
+# Modèles entraînés: (empreinte du contenu, cible, variables, paramètres) -> PredictionModel (sans données)
+_model_cache = OrderedDict()
+_model_lock = threading.Lock()
+
+
+def model_key(df: pd.DataFrame, target_column: str, **config) -> tuple:
+    """
+    Clé du registre (paramètres complétés par les valeurs par défaut, moteur "auto" résolu)
+
+    Empreinte de toutes les valeurs, sans le jeton de version: un autre jeu de
+    données de même forme ne retrouve pas le modèle, le même contenu le
+    retrouve d'une session à l'autre.
+    """
+    config = {**DEFAULT_CONFIG, **config}
+    config["backend"] = resolve_backend(config["backend"], len(df))
+    features = tuple(str(col) for col in df.columns if col != target_column)
+    return content_digest(df), str(target_column), features, tuple(sorted(config.items()))
+
+
+def model_path(models_dir, key: tuple) -> Path:
+    """Fichier joblib d'un modèle dans le dossier de l'utilisateur"""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+    return Path(models_dir) / f"{digest}.joblib"
+
+
+def get_trained_model(df: pd.DataFrame, target_column: str, models_dir=None, owner=None,
+                      n_jobs: int = None, **config):
+    """
+    Modèle entraîné sur `df` pour `target_column`, réutilisé tant que rien ne change
+
+    Args:
+        models_dir: dossier de persistance de l'utilisateur (None: mémoire seulement)
+        owner: utilisateur à qui les cœurs d'entraînement sont comptés
+        n_jobs: cœurs souhaités (sans effet sur le modèle obtenu, hors clé)
+        config: paramètres de PredictionModel (défaut: DEFAULT_CONFIG)
+
+    Returns:
+        (modèle, origine) avec origine "memory", "disk" ou "trained"
+    """
+    key = model_key(df, target_column, **config)
+    with _model_lock:
+        if key in _model_cache:
+            _model_cache.move_to_end(key)
+            return _model_cache[key], "memory"
+
+    path = model_path(models_dir, key) if models_dir is not None and MODEL_PERSISTENCE_ENABLED else None
+    model, source = (_load(path) if path else None), "disk"
+    if model is None:
+        model = PredictionModel(df, target_column, n_jobs=n_jobs, **dict(key[3]))
+        model.train(owner)
+        model.release_data()
+        source = "trained"
+        if path:
+            _save(model, path)
+
+    with _model_lock:
+        _model_cache[key] = model
+        _model_cache.move_to_end(key)
+        while len(_model_cache) > MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+    return model, source
+
+
+def clear_model_cache():
+    """Vider le registre en mémoire (les fichiers restent sur disque)"""
+    with _model_lock:
+        _model_cache.clear()
+
+
+def _load(path: Path):
+    """Modèle sauvegardé, None s'il est absent ou illisible (ex: autre version de scikit-learn)"""
+    if not path.exists():
+        return None
+    try:
+        model = joblib.load(path)
+    except Exception:
+        return None
+    if not isinstance(model, PredictionModel) or model.model is None:
+        return None
+    os.utime(path)  # Récemment utilisé: protégé de l'éviction
+    return model
+
+
+def _save(model: PredictionModel, path: Path) -> bool:
+    """Écriture atomique du modèle, puis éviction des plus anciens; False si impossible"""
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, tmp_path, compress=3)
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return False
+
+    saved = sorted(path.parent.glob("*.joblib"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in saved[MODEL_DISK_MAX_FILES:]:
+        old.unlink(missing_ok=True)
+    return True
@@ -0,0 +1,182 @@
+"""
+Détection des valeurs aberrantes sur plusieurs colonnes à la fois
+Bornes de toutes les colonnes calculées en une passe vectorisée (IQR, z-score,
+MAD, percentiles), puis suppression des lignes ou plafonnement des valeurs
+"""
+import threading
+import warnings
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import (
+    OUTLIER_IQR_FACTOR, OUTLIER_ZSCORE_THRESHOLD, OUTLIER_MAD_THRESHOLD,
+    OUTLIER_PERCENTILES, OUTLIER_CACHE_SIZE
+)
+from utils.fingerprint import dataframe_fingerprint
+
+
+METHODS = {"iqr": "IQR", "zscore": "Z-score", "mad": "MAD", "percentile": "Percentiles"}
+ACTIONS = {"drop": "Supprimer les lignes", "clip": "Plafonner aux bornes"}
+
+# Constantes du z-score modifié (Iglewicz et Hoaglin)
+_MAD_SCALE = 0.6745
+_MEAN_AD_SCALE = 1.253314
+
+# Rapports partagés: (empreinte, colonnes, méthode, seuil, approché) -> DataFrame
+_report_cache = OrderedDict()
+_report_lock = threading.Lock()
+
+
+def default_threshold(method: str):
+    """Seuil par défaut d'une méthode (config)"""
+    if method not in METHODS:
+        raise ValueError(f"Méthode de détection inconnue: {method}")
+    return {
+        "iqr": OUTLIER_IQR_FACTOR,
+        "zscore": OUTLIER_ZSCORE_THRESHOLD,
+        "mad": OUTLIER_MAD_THRESHOLD,
+        "percentile": tuple(OUTLIER_PERCENTILES),
+    }[method]
+
+
+def compute_bounds(values: np.ndarray, method: str = "iqr", threshold=None,
+                   approximate: bool = False, stats: pd.DataFrame = None):
+    """
+    Bornes basse et haute de chaque colonne d'une matrice float64 (NaN = manquant)
+
+    Args:
+        values: matrice lignes x colonnes
+        method: "iqr", "zscore", "mad" ou "percentile"
+        threshold: facteur (iqr), nombre d'écarts-types (zscore), z-score modifié
+                   (mad) ou couple de quantiles (percentile); défaut: config
+        approximate: quantiles par sketch (iqr, percentile)
+        stats: statistiques du profil en cache, dans l'ordre des colonnes
+               (q25/q75 pour iqr, mean/std pour zscore): évitent un recalcul
+
+    Returns:
+        (bornes basses, bornes hautes), un tableau par colonne
+    """
+    with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+        # Colonnes entièrement vides: statistiques NaN, aucune valeur aberrante
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+
+        if method == "iqr":
+            if stats is not None:
+                q1, q3 = stats["q25"].to_numpy(dtype=float), stats["q75"].to_numpy(dtype=float)
+            else:
+                q1, q3 = _quantiles(values, [0.25, 0.75], approximate)
+            method_stats = {"q1": q1, "q3": q3}
+        elif method == "zscore":
+            if stats is not None:
+                mean, std = stats["mean"].to_numpy(dtype=float), stats["std"].to_numpy(dtype=float)
+            else:
+                mean, std = np.nanmean(values, axis=0), np.nanstd(values, axis=0, ddof=1)
+            method_stats = {"mean": mean, "std": std}
+        elif method == "mad":
+            median = np.nanmedian(values, axis=0)
+            deviation = np.abs(values - median)
+            method_stats = {"median": median, "mad": np.nanmedian(deviation, axis=0),
+                            "mean_ad": np.nanmean(deviation, axis=0)}
+        else:
+            threshold = default_threshold(method) if threshold is None else threshold
+            low, high = _quantiles(values, list(threshold), approximate)
+            method_stats = {"low": low, "high": high}
+
+    return bounds_from_stats(method, threshold, method_stats)
+
+
+def bounds_from_stats(method: str, threshold, stats: dict):
+    """
+    Bornes à partir des statistiques de la méthode (calculées en mémoire ou par blocs)
+
+    Args:
+        stats: q1, q3 (iqr); mean, std (zscore); median, mad, mean_ad (mad);
+               low, high (percentile), un tableau par colonne
+    """
+    threshold = default_threshold(method) if threshold is None else threshold
+    if method == "iqr":
+        iqr = stats["q3"] - stats["q1"]
+        return stats["q1"] - threshold * iqr, stats["q3"] + threshold * iqr
+    if method == "zscore":
+        return stats["mean"] - threshold * stats["std"], stats["mean"] + threshold * stats["std"]
+    if method == "mad":
+        # MAD nulle (plus de la moitié des valeurs identiques): écart absolu moyen
+        spread = np.where(stats["mad"] > 0, stats["mad"] / _MAD_SCALE, _MEAN_AD_SCALE * stats["mean_ad"])
+        return stats["median"] - threshold * spread, stats["median"] + threshold * spread
+    return stats["low"], stats["high"]
+
+
+def _quantiles(values, qs, approximate):
+    """Quantiles de chaque colonne (tri exact ou sketch)"""
+    if approximate:
+        from utils.profiler import build_sketches
+        sketches = build_sketches(values, range(values.shape[1]))
+        result = np.array([sketches[j].quantile(qs) for j in range(values.shape[1])], dtype=float)
+        return result.T.reshape(len(qs), values.shape[1])
+    return np.nanquantile(values, qs, axis=0)
+
+
+def outlier_flags(values: np.ndarray, lower, upper):
+    """Cellules sous la borne basse et au-dessus de la borne haute (NaN: ni l'un ni l'autre)"""
+    with np.errstate(invalid="ignore"):
+        return values < lower, values > upper
+
+
+def outlier_report(df: pd.DataFrame, columns, method: str = "iqr", threshold=None,
+                   approximate: bool = None) -> pd.DataFrame:
+    """
+    Bornes et nombre de valeurs aberrantes par colonne, avant toute modification
+
+    Le résultat est mis en cache pour la version courante du DataFrame.
+
+    Returns:
+        DataFrame (index = colonnes): lower, upper, below, above, outliers, percent
+    """
+    from utils.profiler import get_profile, numeric_matrix
+
+    columns = list(columns)
+    threshold = default_threshold(method) if threshold is None else threshold
+    threshold = tuple(threshold) if isinstance(threshold, (list, tuple)) else threshold
+    key = (dataframe_fingerprint(df), tuple(map(str, columns)), method, threshold, bool(approximate))
+    with _report_lock:
+        if key in _report_cache:
+            _report_cache.move_to_end(key)
+            return _report_cache[key]
+
+    values = numeric_matrix(df, columns)
+    stats = None
+    if method in ("iqr", "zscore"):
+        numeric = get_profile(df, approximate=approximate).numeric
+        if all(col in numeric.index for col in columns):
+            stats = numeric.loc[columns]
+    lower, upper = compute_bounds(values, method, threshold, approximate, stats)
+    below, above = outlier_flags(values, lower, upper)
+    below, above = below.sum(axis=0), above.sum(axis=0)
+
+    report = pd.DataFrame({
+        "lower": lower,
+        "upper": upper,
+        "below": below,
+        "above": above,
+        "outliers": below + above,
+        "percent": 100 * (below + above) / max(len(df), 1),
+    }, index=columns)
+
+    with _report_lock:
+        _report_cache[key] = report
+        _report_cache.move_to_end(key)
+        while len(_report_cache) > OUTLIER_CACHE_SIZE:
+            _report_cache.popitem(last=False)
+    return report
+
+
+def clip_series(series: pd.Series, lower: float, upper: float) -> pd.Series:
+    """Plafonner une colonne (winsorisation); les entiers gardent leur type"""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        # Bornes ramenées à l'entier intérieur: les valeurs conservées sont inchangées
+        lower = None if np.isnan(lower) else np.ceil(lower)
+        upper = None if np.isnan(upper) else np.floor(upper)
+    else:
+        lower = None if np.isnan(lower) else lower
+        upper = None if np.isnan(upper) else upper
+    return series.clip(lower=lower, upper=upper)
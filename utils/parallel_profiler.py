@@ -0,0 +1,118 @@
+"""
+Profilage numérique parallèle (pool de processus)
+Les colonnes sont converties directement dans un segment de mémoire partagée;
+chaque worker lit ses colonnes sans que le DataFrame soit sérialisé
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+
+
+# Pool partagé par les sessions (démarrage "spawn": sûr avec les threads de Streamlit)
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """Pool de `workers` processus, créé à la première utilisation puis réutilisé"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _executor_workers = workers
+        return _executor
+
+
+def _reset_executor():
+    """Abandonner un pool cassé (worker tué): il sera recréé au prochain appel"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor, _executor_workers = None, 0
+
+
+def profile_numeric_parallel(df, columns, workers: int, batch_columns: int,
+                             approximate: bool = False):
+    """
+    Statistiques numériques de `columns`, réparties par lots sur `workers` processus
+
+    Args:
+        df: DataFrame source
+        columns: colonnes numériques convertibles en float64
+        workers: nombre de processus
+        batch_columns: colonnes par tâche (borne la mémoire de chaque worker)
+        approximate: quartiles par sketch (voir utils.sketches)
+
+    Returns:
+        (liste de (colonnes, dict de statistiques), dict des sketches ou None),
+        ou None si le pool est indisponible (l'appelant calcule alors en série)
+    """
+    from utils.profiler import numeric_matrix
+
+    shards = []
+    sketches = {} if approximate else None
+    # Un segment par vague de `workers` lots: la mémoire partagée reste bornée
+    wave = workers * batch_columns
+    for start in range(0, len(columns), wave):
+        wave_columns = columns[start:start + wave]
+        shape = (len(df), len(wave_columns))
+        segment = shared_memory.SharedMemory(create=True, size=max(shape[0] * shape[1] * 8, 1))
+        try:
+            # Conversion écrite directement dans le segment: pas de copie intermédiaire
+            shared = np.ndarray(shape, dtype=float, buffer=segment.buf, order="F")
+            numeric_matrix(df, wave_columns, out=shared)
+            del shared
+
+            tasks = [
+                (offset, min(offset + batch_columns, len(wave_columns)))
+                for offset in range(0, len(wave_columns), batch_columns)
+            ]
+            executor = _get_executor(workers)
+            futures = [
+                executor.submit(_profile_shard, segment.name, shape, low, high, approximate)
+                for low, high in tasks
+            ]
+            for (low, high), future in zip(tasks, futures):
+                stats, shard_sketches = future.result()
+                shards.append((wave_columns[low:high], stats))
+                if approximate:
+                    sketches.update(zip(wave_columns[low:high], shard_sketches))
+        except (BrokenProcessPool, OSError):
+            _reset_executor()
+            return None
+        finally:
+            segment.close()
+            segment.unlink()
+
+    return shards, sketches
+
+
+def _profile_shard(segment_name, shape, low, high, approximate):
+    """Worker: statistiques des colonnes [low, high) du segment partagé"""
+    from utils.profiler import moment_stats, order_stats, build_sketches, sketch_order_stats
+
+    segment = shared_memory.SharedMemory(name=segment_name)
+    try:
+        values = np.ndarray(shape, dtype=float, buffer=segment.buf, order="F")[:, low:high]
+        stats = moment_stats(values)
+        if approximate:
+            sketches = build_sketches(values, range(high - low))
+            sketches = [sketches[j] for j in range(high - low)]
+            stats.update(sketch_order_stats(sketches))
+        else:
+            sketches = None
+            stats.update(order_stats(values, stats["count"]))
+        # Les vues sur le segment doivent disparaître avant sa fermeture
+        del values
+        return stats, sketches
+    finally:
+        segment.close()
@@ -0,0 +1,533 @@
+"""
+Profilage statistique des colonnes en une passe vectorisée
+Un seul objet DataProfile alimente l'analyse, les rapports et l'assistant IA
+"""
+import threading
+import warnings
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import (
+    PROFILE_CACHE_SIZE, APPROX_QUANTILES, HLL_ROW_THRESHOLD, MAX_TRACKED_CATEGORIES, SAMPLE_SIZE,
+    PROFILE_WORKERS, PARALLEL_PROFILE_MIN_CELLS
+)
+from utils.fingerprint import dataframe_fingerprint
+from utils.duplicates import count_duplicates
+from utils.sketches import QuantileSketch, HyperLogLog
+from utils.streaming import NON_NUMERIC_REMARK, merge_moments
+
+
+# Taille maximale (octets) d'un lot de colonnes numériques converti en float64
+_NUMERIC_BATCH_BYTES = 64 * 1024 * 1024
+
+NUMERIC_FIELDS = ["count", "null_count", "mean", "std", "m2", "min", "q25", "median", "q75", "max"]
+CATEGORICAL_FIELDS = ["unique_values", "most_common", "null_count"]
+
+
+class DataProfile:
+    """Profil d'un DataFrame: résumé global + statistiques par colonne"""
+
+    def __init__(self, rows, columns, dtypes, numeric, categorical, remarks,
+                 duplicates, memory_usage, sketches=None, approx_distinct=None):
+        """
+        Args:
+            rows: nombre de lignes
+            columns: liste des colonnes (ordre d'origine)
+            dtypes: dict colonne -> dtype
+            numeric: DataFrame (index = colonnes numériques, colonnes = NUMERIC_FIELDS)
+            categorical: DataFrame (index = colonnes qualitatives, colonnes = CATEGORICAL_FIELDS)
+            remarks: dict colonne numérique non convertible -> remarque
+            duplicates: nombre de lignes dupliquées
+            memory_usage: mémoire occupée (octets)
+            sketches: dict colonne numérique -> QuantileSketch (profil approché), sinon None
+            approx_distinct: colonnes dont le nombre de valeurs uniques est estimé (HyperLogLog)
+        """
+        self.rows = rows
+        self.columns = columns
+        self.dtypes = dtypes
+        self.numeric = numeric
+        self.categorical = categorical
+        self.remarks = remarks
+        self.duplicates = duplicates
+        self.memory_usage = memory_usage
+        self.sketches = sketches
+        self.approx_distinct = set(approx_distinct or ())
+
+    @property
+    def approximate(self) -> bool:
+        """Quartiles et médianes issus de sketches (erreur de rang bornée)"""
+        return self.sketches is not None
+
+    def distinct_label(self, col) -> str:
+        """Nombre de valeurs uniques à afficher, préfixé de ≈ s'il est estimé"""
+        return format_distinct(int(self.categorical.loc[col, "unique_values"]), col in self.approx_distinct)
+
+    @property
+    def missing(self) -> pd.Series:
+        """Valeurs manquantes par colonne, dans l'ordre d'origine"""
+        missing = pd.concat([self.numeric["null_count"], self.categorical["null_count"]])
+        for col in self.remarks:
+            missing[col] = self.remarks[col]["null_count"]
+        return missing.reindex(self.columns).astype(int)
+
+    @property
+    def missing_total(self) -> int:
+        return int(self.missing.sum())
+
+    def column_stats(self) -> dict:
+        """Statistiques par colonne au format historique de get_column_stats"""
+        stats = {}
+        for col in self.columns:
+            if col in self.numeric.index:
+                row = self.numeric.loc[col]
+                stats[col] = {
+                    "type": "Quantitative",
+                    "min": row["min"],
+                    "max": row["max"],
+                    "mean": row["mean"],
+                    "median": row["median"],
+                    "std": row["std"],
+                    "null_count": int(row["null_count"]),
+                    "remark": None
+                }
+            elif col in self.remarks:
+                stats[col] = {
+                    "type": "Quantitative",
+                    "min": None,
+                    "max": None,
+                    "mean": None,
+                    "median": None,
+                    "std": None,
+                    "null_count": self.remarks[col]["null_count"],
+                    "remark": self.remarks[col]["remark"]
+                }
+            else:
+                row = self.categorical.loc[col]
+                stats[col] = {
+                    "type": "Qualitative",
+                    "unique_values": int(row["unique_values"]),
+                    "most_common": row["most_common"],
+                    "null_count": int(row["null_count"])
+                }
+        return stats
+
+
+# Cache des profils partagé par les onglets et les reruns: empreinte -> DataProfile
+_profile_cache = OrderedDict()
+_profile_lock = threading.Lock()
+
+
+# Suffixe de clé des profils approchés (mis en cache à côté des profils exacts)
+_APPROX_SUFFIX = ":approx"
+
+
+def get_profile(df: pd.DataFrame, approximate: bool = None) -> DataProfile:
+    """
+    Profil du DataFrame, servi depuis le cache tant que les données n'ont pas changé
+
+    Args:
+        df: DataFrame à profiler
+        approximate: quartiles par sketch plutôt que par tri (défaut: APPROX_QUANTILES)
+    """
+    if approximate is None:
+        approximate = APPROX_QUANTILES
+    key = dataframe_fingerprint(df) + (_APPROX_SUFFIX if approximate else "")
+    with _profile_lock:
+        if key in _profile_cache:
+            _profile_cache.move_to_end(key)
+            return _profile_cache[key]
+
+    profile = build_profile(df, approximate=approximate)
+    store_profile(key, profile)
+    return profile
+
+
+def store_profile(key: str, profile: DataProfile):
+    """Enregistrer un profil dans le cache (éviction LRU)"""
+    with _profile_lock:
+        _profile_cache[key] = profile
+        _profile_cache.move_to_end(key)
+        while len(_profile_cache) > PROFILE_CACHE_SIZE:
+            _profile_cache.popitem(last=False)
+
+
+def update_profile(old_key: str, new_df: pd.DataFrame, removed_rows: pd.DataFrame = None,
+                   filled: dict = None, duplicates: int = None, rewritten: list = None):
+    """
+    Dériver le profil de `new_df` de celui mis en cache sous `old_key`
+
+    Args:
+        old_key: empreinte du DataFrame avant l'opération
+        new_df: DataFrame après l'opération (déjà marqué par mark_modified)
+        removed_rows: lignes supprimées par l'opération
+        filled: dict colonne -> valeurs écrites dans les cellules auparavant vides
+        duplicates: nombre de doublons après l'opération, s'il est connu
+        rewritten: colonnes numériques dont des valeurs présentes ont été
+                   réécrites (ex: plafonnement): statistiques recalculées
+
+    Effectifs, sommes, manquants et moments sont mis à jour par différence;
+    seules les statistiques d'ordre (min, quartiles, max, mode, uniques)
+    des colonnes touchées sont recalculées. Les profils exact et approché
+    sont mis à jour s'ils sont en cache. Retourne le profil exact dérivé,
+    ou None s'il n'était pas en cache (il sera calculé à la demande).
+    """
+    new_key = dataframe_fingerprint(new_df)
+    derived = None
+    for suffix in ("", _APPROX_SUFFIX):
+        with _profile_lock:
+            old = _profile_cache.get(old_key + suffix)
+        if old is None or new_df.columns.tolist() != old.columns:
+            continue
+        profile = _derive_profile(old, new_df, removed_rows, filled, duplicates, rewritten)
+        # Doublons calculés une fois, partagés par le second profil
+        duplicates = profile.duplicates
+        store_profile(new_key + suffix, profile)
+        if not suffix:
+            derived = profile
+    return derived
+
+
+def _derive_profile(old: DataProfile, new_df, removed_rows, filled, duplicates, rewritten=None) -> DataProfile:
+    """Appliquer une opération de nettoyage à un profil existant (voir update_profile)"""
+    filled = filled or {}
+    numeric = old.numeric.copy()
+    categorical = old.categorical.copy()
+    touched_numeric, touched_categorical = set(), set()
+
+    if removed_rows is not None and len(removed_rows):
+        removed = moment_stats(numeric_matrix(removed_rows, numeric.index))
+        _subtract_moments(numeric, removed)
+        touched_numeric.update(numeric.index[removed["count"] > 0])
+
+        for col in categorical.index:
+            removed_nulls = int(removed_rows[col].isnull().sum())
+            categorical.loc[col, "null_count"] -= removed_nulls
+            if removed_nulls < len(removed_rows):
+                touched_categorical.add(col)
+
+    for col, values in filled.items():
+        if len(values) == 0:
+            continue
+        if col in numeric.index:
+            values = pd.Series(values).to_numpy(dtype=float, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            row = numeric.loc[col]
+            n, mean, m2 = merge_moments(
+                row["count"], 0.0 if row["count"] == 0 else row["mean"], row["m2"],
+                len(values), values.mean(), ((values - values.mean()) ** 2).sum()
+            )
+            numeric.loc[col, ["count", "mean", "m2"]] = [n, mean, m2]
+            numeric.loc[col, "null_count"] -= len(values)
+            touched_numeric.add(col)
+        elif col in categorical.index:
+            categorical.loc[col, "null_count"] -= len(values)
+            touched_categorical.add(col)
+
+    # Valeurs réécrites ou différences instables (plus de la moitié retirée): moments recalculés
+    rewritten = [col for col in rewritten or [] if col in numeric.index]
+    touched_numeric.update(rewritten)
+    unstable = [col for col in touched_numeric
+                if col in rewritten or numeric.loc[col, "count"] < old.numeric.loc[col, "count"] / 2]
+    if unstable:
+        recomputed = moment_stats(numeric_matrix(new_df, unstable))
+        for field in ("count", "null_count", "mean", "m2"):
+            numeric.loc[unstable, field] = recomputed[field]
+
+    counts = numeric["count"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        numeric["std"] = np.where(counts > 1, np.sqrt(numeric["m2"].to_numpy(dtype=float) / (counts - 1)), np.nan)
+
+    # Statistiques d'ordre: recalcul limité aux colonnes touchées
+    # (un sketch ne sait pas retirer de valeurs: ceux des colonnes touchées sont reconstruits)
+    touched = [col for col in numeric.index if col in touched_numeric]
+    sketches = dict(old.sketches) if old.approximate else None
+    if touched:
+        values = numeric_matrix(new_df, touched)
+        if sketches is None:
+            ordered = order_stats(values, numeric.loc[touched, "count"].to_numpy(dtype=int))
+        else:
+            sketches.update(build_sketches(values, touched))
+            ordered = sketch_order_stats([sketches[col] for col in touched])
+        for field in ORDER_FIELDS:
+            numeric.loc[touched, field] = ordered[field]
+
+    approx_distinct = set(old.approx_distinct)
+    if touched_categorical:
+        refreshed, refreshed_approx = _profile_categorical(
+            new_df, [col for col in categorical.index if col in touched_categorical]
+        )
+        categorical.loc[refreshed.index, ["unique_values", "most_common"]] = refreshed[["unique_values", "most_common"]]
+        approx_distinct = (approx_distinct - set(refreshed.index)) | refreshed_approx
+
+    remarks = {
+        col: {"null_count": int(new_df[col].isnull().sum()), "remark": info["remark"]}
+        for col, info in old.remarks.items()
+    }
+
+    return DataProfile(
+        rows=len(new_df),
+        columns=new_df.columns.tolist(),
+        dtypes=new_df.dtypes.to_dict(),
+        numeric=numeric,
+        categorical=categorical,
+        remarks=remarks,
+        duplicates=count_duplicates(new_df) if duplicates is None else duplicates,
+        memory_usage=int(new_df.memory_usage(deep=True).sum()),
+        sketches=sketches,
+        approx_distinct=approx_distinct
+    )
+
+
+def _subtract_moments(numeric: pd.DataFrame, removed: dict):
+    """Retirer (effectif, moyenne, M2) d'un sous-ensemble - Chan inversé, vectorisé"""
+    n = numeric["count"].to_numpy(dtype=float)
+    mean = numeric["mean"].to_numpy(dtype=float)
+    m2 = numeric["m2"].to_numpy(dtype=float)
+    n_b = removed["count"].astype(float)
+    mean_b = np.where(n_b > 0, removed["mean"], 0.0)
+    m2_b = removed["m2"]
+
+    n_a = n - n_b
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_a = np.where(n_a > 0, (n * np.nan_to_num(mean) - n_b * mean_b) / n_a, np.nan)
+        delta = mean_b - mean_a
+        m2_a = np.where(n_a > 0, m2 - m2_b - delta ** 2 * n_a * n_b / n, 0.0)
+
+    changed = n_b > 0
+    numeric["count"] = n_a.astype(int)
+    numeric["null_count"] = numeric["null_count"].to_numpy() - removed["null_count"]
+    numeric["mean"] = np.where(changed, mean_a, mean)
+    numeric["m2"] = np.where(changed, np.maximum(m2_a, 0.0), m2)
+
+
+def build_profile(df: pd.DataFrame, approximate: bool = False, workers: int = None) -> DataProfile:
+    """
+    Calculer le profil complet d'un DataFrame
+
+    Args:
+        approximate: quartiles par sketch plutôt que par tri
+        workers: processus pour le bloc numérique (défaut: PROFILE_WORKERS)
+    """
+    numeric_cols = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    categorical_cols = [col for col in df.columns if col not in set(numeric_cols)]
+
+    numeric, remarks, sketches = _profile_numeric(df, numeric_cols, approximate, workers)
+    categorical, approx_distinct = _profile_categorical(df, categorical_cols)
+
+    return DataProfile(
+        rows=len(df),
+        columns=df.columns.tolist(),
+        dtypes=df.dtypes.to_dict(),
+        numeric=numeric,
+        categorical=categorical,
+        remarks=remarks,
+        duplicates=count_duplicates(df),
+        memory_usage=int(df.memory_usage(deep=True).sum()),
+        sketches=sketches,
+        approx_distinct=approx_distinct
+    )
+
+
+def _profile_numeric(df, columns, approximate=False, workers=None):
+    """
+    Bloc numérique: un tri par colonne (ou un sketch si `approximate`)
+    donne min, quartiles et max, une passe vectorisée donne effectif,
+    moyenne et M2. Les gros tableaux sont répartis sur `workers` processus.
+    """
+    remarks = {}
+    blocks = []
+    sketches = {} if approximate else None
+    batch_size = max(1, _NUMERIC_BATCH_BYTES // max(len(df) * 8, 1))
+
+    convertible = []
+    for col in columns:
+        try:
+            df[col].to_numpy(dtype=float, na_value=np.nan)[:1]
+            convertible.append(col)
+        except (ValueError, TypeError):
+            remarks[col] = {"null_count": int(df[col].isnull().sum()), "remark": NON_NUMERIC_REMARK}
+
+    workers = PROFILE_WORKERS if workers is None else workers
+    if workers > 1 and len(convertible) > 1 and len(df) * len(convertible) >= PARALLEL_PROFILE_MIN_CELLS:
+        from utils.parallel_profiler import profile_numeric_parallel
+        # Au moins un lot par worker
+        parallel_batch = max(1, min(batch_size, -(-len(convertible) // workers)))
+        result = profile_numeric_parallel(df, convertible, workers, parallel_batch, approximate)
+        if result is not None:
+            shards, sketches = result
+            blocks = [pd.DataFrame(stats, index=batch) for batch, stats in shards]
+            convertible = []  # Tout est calculé; sinon repli en série ci-dessous
+
+    for start in range(0, len(convertible), batch_size):
+        batch = convertible[start:start + batch_size]
+        values = numeric_matrix(df, batch)
+        if approximate:
+            stats = moment_stats(values)
+            batch_sketches = build_sketches(values, batch)
+            stats.update(sketch_order_stats([batch_sketches[col] for col in batch]))
+            sketches.update(batch_sketches)
+        else:
+            stats = numeric_block_stats(values)
+        blocks.append(pd.DataFrame(stats, index=batch))
+
+    if blocks:
+        numeric = pd.concat(blocks)
+    else:
+        numeric = pd.DataFrame(columns=NUMERIC_FIELDS, dtype=float)
+    return numeric[NUMERIC_FIELDS], remarks, sketches
+
+
+ORDER_FIELDS = ["min", "q25", "median", "q75", "max"]
+
+
+def numeric_block_stats(values: np.ndarray) -> dict:
+    """Statistiques de chaque colonne d'une matrice float64 (NaN = manquant)"""
+    stats = moment_stats(values)
+    stats.update(order_stats(values, stats["count"]))
+    return stats
+
+
+def moment_stats(values: np.ndarray) -> dict:
+    """Effectif, manquants, moyenne, M2 et écart-type (une passe vectorisée)"""
+    n_rows = values.shape[0]
+    nulls = np.isnan(values).sum(axis=0)
+    counts = n_rows - nulls
+
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        means = np.nansum(values, axis=0) / counts
+        m2 = np.nansum((values - means) ** 2, axis=0)
+        std = np.sqrt(m2 / (counts - 1))
+
+    return {
+        "count": counts,
+        "null_count": nulls,
+        "mean": np.where(counts > 0, means, np.nan),
+        "std": np.where(counts > 1, std, np.nan),
+        "m2": np.where(counts > 0, m2, 0.0),
+    }
+
+
+def order_stats(values: np.ndarray, counts: np.ndarray) -> dict:
+    """Min, quartiles et max à partir d'un seul tri par colonne"""
+    n_rows, n_cols = values.shape
+    if n_rows == 0:
+        return {field: np.full(n_cols, np.nan) for field in ORDER_FIELDS}
+
+    # NaN triés en fin de colonne: les positions valides sont [0, count)
+    ordered = np.sort(values, axis=0)
+    cols = np.arange(n_cols)
+
+    def quantile(q):
+        pos = (counts - 1) * q
+        lower = np.clip(np.floor(pos).astype(int), 0, n_rows - 1)
+        upper = np.clip(np.ceil(pos).astype(int), 0, n_rows - 1)
+        low_val, high_val = ordered[lower, cols], ordered[upper, cols]
+        result = low_val + (high_val - low_val) * (pos - lower)
+        return np.where(counts > 0, result, np.nan)
+
+    return {
+        "min": quantile(0.0),
+        "q25": quantile(0.25),
+        "median": quantile(0.5),
+        "q75": quantile(0.75),
+        "max": quantile(1.0),
+    }
+
+
+def build_sketches(values: np.ndarray, columns) -> dict:
+    """Un QuantileSketch par colonne d'une matrice float64 (NaN ignorés)"""
+    return {col: QuantileSketch(seed=0).update(values[:, j]) for j, col in enumerate(columns)}
+
+
+def sketch_order_stats(sketches: list) -> dict:
+    """Min et max exacts, quartiles approchés à partir des sketches"""
+    quantiles = np.array([sketch.quantile([0.0, 0.25, 0.5, 0.75, 1.0]) for sketch in sketches])
+    quantiles = quantiles.reshape(len(sketches), len(ORDER_FIELDS))
+    return {field: quantiles[:, i] for i, field in enumerate(ORDER_FIELDS)}
+
+
+def numeric_matrix(df, columns, out: np.ndarray = None) -> np.ndarray:
+    """
+    Colonnes numériques -> matrice float64 (ordre Fortran, NaN = manquant)
+
+    Args:
+        out: matrice (len(df), len(columns)) à remplir, ex: vue sur une mémoire partagée
+    """
+    values = np.empty((len(df), len(columns)), order="F") if out is None else out
+    for j, col in enumerate(columns):
+        values[:, j] = df[col].to_numpy(dtype=float, na_value=np.nan)
+    return values
+
+
+def _profile_categorical(df, columns):
+    """
+    Bloc qualitatif: un seul value_counts par colonne (uniques, mode, manquants)
+
+    Au-delà de HLL_ROW_THRESHOLD lignes, une colonne à forte cardinalité
+    (type identifiant) n'est pas comptée exactement: uniques estimés par
+    HyperLogLog, mode calculé sur un échantillon. Retourne aussi
+    l'ensemble de ces colonnes.
+    """
+    rows = {}
+    approx_distinct = set()
+    for col in columns:
+        series = df[col]
+        distinct = HyperLogLog().update(series).count() if _use_hll(series) else 0
+        if distinct > MAX_TRACKED_CATEGORIES:
+            positions = np.linspace(0, len(series) - 1, min(len(series), SAMPLE_SIZE)).astype(int)
+            rows[col] = {
+                "unique_values": distinct,
+                "most_common": _mode_from_counts(series.iloc[positions].value_counts(dropna=True)),
+                "null_count": int(series.isnull().sum()),
+            }
+            approx_distinct.add(col)
+            continue
+
+        counts = series.value_counts(dropna=True)
+        counts = counts[counts > 0]  # modalités inutilisées d'une colonne `category`
+        rows[col] = {
+            "unique_values": len(counts),
+            "most_common": _mode_from_counts(counts),
+            "null_count": len(df) - int(counts.sum()),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index", columns=CATEGORICAL_FIELDS), approx_distinct
+
+
+def count_distinct(series: pd.Series, approximate: bool = None):
+    """
+    Nombre de valeurs distinctes (hors manquants) -> (nombre, estimé ?)
+
+    Par défaut, HyperLogLog au-delà de HLL_ROW_THRESHOLD lignes, sauf pour
+    une colonne `category` dont les modalités sont déjà dénombrées.
+    """
+    if approximate is None:
+        approximate = _use_hll(series)
+    if approximate:
+        return HyperLogLog().update(series).count(), True
+    return int(series.nunique()), False
+
+
+def _use_hll(series: pd.Series) -> bool:
+    """Comptage approché automatique: grand volume, hors colonne `category`"""
+    return len(series) >= HLL_ROW_THRESHOLD and not isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def format_distinct(count: int, approximate: bool) -> str:
+    """Libellé d'un nombre de valeurs uniques (≈ si estimé)"""
+    return f"≈ {count:,}" if approximate else f"{count:,}"
+
+
+def _mode_from_counts(counts: pd.Series):
+    """Mode à partir des effectifs; en cas d'égalité, la plus petite valeur (comme Series.mode)"""
+    if counts.empty:
+        return None
+    ties = counts.index[counts.to_numpy() == counts.iloc[0]]
+    if len(ties) == 1:
+        return ties[0]
+    try:
+        return min(ties)
+    except TypeError:
+        return ties[0]
@@ -0,0 +1,497 @@
+"""
+Recettes de nettoyage: export JSON des étapes et rejeu par blocs sur le fichier complet
+Les étapes qui dépendent de statistiques globales (moyenne, quartiles, doublons)
+les obtiennent par des passes d'agrégation préalables: le rejeu par blocs donne
+le même résultat qu'une exécution en mémoire
+"""
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import CHUNK_SIZE, RECIPE_SKETCH_EPSILON
+from utils.cleaning_plan import CleaningPlan, MISSING_LABEL, describe_step
+from utils.dataset_cache import PARQUET_AVAILABLE
+from utils.duplicates import row_hashes
+from utils.outliers import bounds_from_stats, outlier_flags, clip_series
+from utils.sketches import QuantileSketch
+from utils.streaming import iter_chunks
+
+
+RECIPE_FORMAT = 1
+
+# Méthodes de remplissage qui demandent tout le fichier en mémoire (tri global, index des voisins)
+_UNSUPPORTED_FILL = {
+    "group_median": "médiane par groupe",
+    "interpolate": "interpolation",
+    "knn": "plus proches voisins",
+}
+
+
+def export_recipe(steps, source: str = None, read_options: dict = None) -> str:
+    """
+    Recette JSON: étapes de plan (vérifiées), fichier source et options de lecture
+
+    Args:
+        steps: étapes de CleaningPlan (ex: DatasetHistory.steps)
+        source: fichier sur lequel la recette a été construite (seul le nom est gardé)
+        read_options: feuille / plage de lignes Excel (voir iter_chunks)
+    """
+    recipe = {
+        "format": RECIPE_FORMAT,
+        "source": Path(source).name if source else None,
+        "read_options": read_options or {},
+        "steps": CleaningPlan(steps).steps,
+    }
+    return json.dumps(recipe, ensure_ascii=False, indent=2, default=_json_value)
+
+
+def load_recipe(text) -> dict:
+    """Lire une recette JSON (texte ou octets); les étapes sont revérifiées"""
+    try:
+        recipe = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Recette illisible: {e}")
+    if not isinstance(recipe, dict) or recipe.get("format") != RECIPE_FORMAT:
+        raise ValueError("Format de recette inconnu")
+    recipe["steps"] = CleaningPlan(recipe.get("steps", [])).steps
+    recipe["read_options"] = recipe.get("read_options") or {}
+    return recipe
+
+
+def check_replayable(steps):
+    """Lever ValueError si une étape ne peut pas être rejouée par blocs"""
+    for step in steps:
+        if step["op"] != "fill_missing":
+            continue
+        if step["method"] in _UNSUPPORTED_FILL:
+            raise ValueError(
+                f"Étape non rejouable par blocs ({_UNSUPPORTED_FILL[step['method']]}): "
+                f"{describe_step(step)}"
+            )
+        if step["method"] == "forward_fill" and step.get("order_by"):
+            raise ValueError(f"Étape non rejouable par blocs (tri global nécessaire): {describe_step(step)}")
+
+
+def replay_recipe(steps, file_path, output_path=None, read_options: dict = None,
+                  chunksize: int = CHUNK_SIZE) -> dict:
+    """
+    Rejouer des étapes de nettoyage sur tout un fichier, bloc par bloc
+
+    Une passe de lecture fixe les types de colonnes, puis chaque étape qui en a
+    besoin reçoit ses statistiques globales par des passes d'agrégation sur la
+    sortie des étapes précédentes. La passe finale écrit le résultat en Parquet
+    (CSV si pyarrow est absent).
+
+    Mémoire: bornée par un bloc, sauf la suppression des doublons qui garde
+    une empreinte de 8 octets par ligne.
+
+    Returns:
+        dict: rows_in, rows_out, output (chemin écrit), steps (rapport par étape,
+        comme CleaningPlan.execute)
+    """
+    steps = CleaningPlan(steps).steps
+    check_replayable(steps)
+    file_path = Path(file_path)
+    read_options = dict(read_options or {})
+    if output_path is None:
+        suffix = ".parquet" if PARQUET_AVAILABLE else ".csv"
+        output_path = file_path.with_name(f"{file_path.stem}.nettoye{suffix}")
+
+    schema = _read_schema(file_path, chunksize, read_options)
+
+    def source():
+        return iter_chunks(str(file_path), chunksize, dtype=schema, **read_options)
+
+    stages = []
+    for step in steps:
+        stage = _STAGES[step["op"]](step, schema)
+        prefix = list(stages)
+        stage.prepare(lambda consume, prefix=prefix: _scan(prefix, source, consume))
+        stages.append(stage)
+
+    rows_in = sum(len(chunk) for chunk in source())
+    rows_out = _write(_replay(stages, source), Path(output_path), schema)
+    return {
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "output": str(output_path),
+        "steps": [stage.report() for stage in stages],
+    }
+
+
+def _json_value(value):
+    """Types numpy -> types JSON"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Valeur non sérialisable: {value!r}")
+
+
+def _read_schema(file_path, chunksize, read_options) -> dict:
+    """
+    Type de chaque colonne sur tout le fichier (un bloc seul peut se tromper:
+    entiers sans manquant, colonne vide lue comme float...)
+    """
+    kinds = {}
+    for chunk in iter_chunks(str(file_path), chunksize, **read_options):
+        for col in chunk.columns:
+            series = chunk[col]
+            if pd.api.types.is_bool_dtype(series):
+                kind = "bool"
+            elif pd.api.types.is_integer_dtype(series):
+                kind = "int"
+            elif pd.api.types.is_float_dtype(series):
+                kind = "float"
+            else:
+                kind = "str"
+            kinds.setdefault(col, set()).add(kind)
+
+    schema = {}
+    for col, found in kinds.items():
+        if found == {"int"}:
+            schema[col] = "int64"
+        elif found <= {"int", "float"}:
+            schema[col] = "float64"
+        elif found == {"bool"}:
+            schema[col] = "bool"
+        else:
+            schema[col] = "str"
+    return schema
+
+
+def _replay(stages, source):
+    """Blocs de sortie des étapes `stages` (leur état par bloc est remis à zéro)"""
+    for stage in stages:
+        stage.reset()
+    for chunk in source():
+        for stage in stages:
+            chunk = stage.apply(chunk)
+        yield chunk
+
+
+def _scan(stages, source, consume):
+    """Passe d'agrégation: chaque bloc de sortie de `stages` est donné à `consume`"""
+    for chunk in _replay(stages, source):
+        consume(chunk)
+
+
+def _write(chunks, output_path: Path, schema) -> int:
+    """Écrire les blocs (Parquet par groupes de lignes, sinon CSV); retourne le nombre de lignes"""
+    rows = 0
+    if PARQUET_AVAILABLE and output_path.suffix == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(str(output_path), table.schema)
+                elif table.schema != writer.schema:
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in schema.items()}).to_parquet(output_path)
+        return rows
+
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(output_path, mode="w" if header else "a", header=header, index=False)
+        header = False
+        rows += len(chunk)
+    if header:
+        pd.DataFrame(columns=list(schema)).to_csv(output_path, index=False)
+    return rows
+
+
+def _matrix(chunk, columns) -> np.ndarray:
+    """Colonnes d'un bloc -> matrice float64 (NaN = manquant)"""
+    values = np.empty((len(chunk), len(columns)))
+    for j, col in enumerate(columns):
+        values[:, j] = chunk[col].to_numpy(dtype=float, na_value=np.nan)
+    return values
+
+
+def _moments(scan, extract, n_columns) -> dict:
+    """Effectif, moyenne et écart-type (ddof=1) par colonne, fusionnés bloc par bloc (Chan)"""
+    count = np.zeros(n_columns)
+    mean = np.zeros(n_columns)
+    m2 = np.zeros(n_columns)
+
+    def consume(chunk):
+        nonlocal count, mean, m2
+        values = extract(chunk)
+        present = ~np.isnan(values)
+        n_b = present.sum(axis=0).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(n_b > 0, np.nansum(values, axis=0) / n_b, 0.0)
+            m2_b = np.nansum(np.where(present, values - mean_b, 0.0) ** 2, axis=0)
+            total = count + n_b
+            delta = mean_b - mean
+            mean = np.where(total > 0, mean + delta * n_b / total, 0.0)
+            m2 = np.where(total > 0, m2 + m2_b + delta ** 2 * count * n_b / total, 0.0)
+        count = total
+
+    scan(consume)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "count": count,
+            "mean": np.where(count > 0, mean, np.nan),
+            "std": np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan),
+        }
+
+
+def _exact_quantiles(scan, extract, qs, n_columns) -> np.ndarray:
+    """
+    Quantiles exacts (interpolation linéaire, comme numpy) sans garder les colonnes
+
+    Une passe construit un sketch par colonne; il encadre chaque rang cherché
+    par une fenêtre de valeurs. Une seconde passe compte les valeurs sous la
+    fenêtre et garde celles de la fenêtre: le rang exact s'y lit après tri.
+    Fenêtre manquée (rare): elle est élargie et la passe recommencée.
+
+    Returns:
+        tableau (len(qs), n_columns), NaN pour une colonne vide
+    """
+    sketches = [QuantileSketch(epsilon=RECIPE_SKETCH_EPSILON, seed=0) for _ in range(n_columns)]
+
+    def sketch(chunk):
+        values = extract(chunk)
+        for j, column_sketch in enumerate(sketches):
+            column_sketch.update(values[:, j])
+
+    scan(sketch)
+
+    result = np.full((len(qs), n_columns), np.nan)
+    margin = 3 * RECIPE_SKETCH_EPSILON
+    windows = []
+    for i, q in enumerate(qs):
+        for j, column_sketch in enumerate(sketches):
+            n = column_sketch.count
+            if n == 0:
+                continue
+            # Indice virtuel et poids de numpy (méthode "linear")
+            virtual = n * q + (1 + q * -1) - 1
+            low_rank = int(np.clip(np.floor(virtual), 0, n - 1))
+            high_rank = min(low_rank + 1, n - 1)
+            lower, upper = column_sketch.quantile([max(q - margin, 0.0), min(q + margin, 1.0)])
+            windows.append({"i": i, "j": j, "ranks": (low_rank, high_rank),
+                            "gamma": virtual - np.floor(virtual), "lower": lower, "upper": upper})
+
+    while windows:
+        below = np.zeros(len(windows), dtype=np.int64)
+        inside = [[] for _ in windows]
+
+        def collect(chunk):
+            values = extract(chunk)
+            for w, window in enumerate(windows):
+                column = values[:, window["j"]]
+                below[w] += np.count_nonzero(column < window["lower"])
+                inside[w].append(column[(column >= window["lower"]) & (column <= window["upper"])])
+
+        scan(collect)
+
+        missed = []
+        for window, n_below, parts in zip(windows, below, inside):
+            values = np.sort(np.concatenate(parts)) if parts else np.empty(0)
+            low_rank, high_rank = window["ranks"]
+            if n_below <= low_rank and high_rank < n_below + len(values):
+                a, b = values[low_rank - n_below], values[high_rank - n_below]
+                result[window["i"], window["j"]] = _lerp(a, b, window["gamma"])
+                continue
+            if n_below > low_rank:
+                window["lower"] = -np.inf
+            if high_rank >= n_below + len(values):
+                window["upper"] = np.inf
+            missed.append(window)
+        windows = missed
+
+    return result
+
+
+def _lerp(a, b, t):
+    """Interpolation linéaire calculée comme numpy (résultat identique au bit près)"""
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+class _Stage:
+    """Étape rejouée par blocs: statistiques globales préparées, état remis à zéro à chaque passe"""
+
+    def __init__(self, step, schema):
+        self.step = step
+        self.schema = schema
+        self.reset()
+
+    def prepare(self, scan):
+        """Calculer les statistiques globales; `scan(consume)` parcourt la sortie des étapes précédentes"""
+
+    def reset(self):
+        self.rows_removed = 0
+        self.cells_filled = 0
+        self.cells_clipped = 0
+
+    def apply(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def report(self) -> dict:
+        return {
+            "step": describe_step(self.step),
+            "rows_removed": self.rows_removed,
+            "cells_filled": self.cells_filled,
+            "cells_clipped": self.cells_clipped,
+        }
+
+
+class _DropDuplicates(_Stage):
+    """Doublons: masque global des lignes gardées, calculé sur les empreintes de toutes les lignes"""
+
+    def prepare(self, scan):
+        columns = self.step["subset"] or list(self.schema)
+        parts = []
+        scan(lambda chunk: parts.append(row_hashes(chunk, columns)))
+        hashes = np.concatenate(parts) if parts else np.empty(0, dtype=np.uint64)
+        self.keep = ~pd.Series(hashes).duplicated(keep=self.step["keep"]).to_numpy()
+
+    def reset(self):
+        super().reset()
+        self.position = 0
+
+    def apply(self, chunk):
+        keep = self.keep[self.position:self.position + len(chunk)]
+        self.position += len(chunk)
+        self.rows_removed += int(len(chunk) - keep.sum())
+        return chunk[keep]
+
+
+class _FillMissing(_Stage):
+    """Remplissage: valeurs globales (moyenne, médiane, moyenne par groupe) ou dernière valeur propagée"""
+
+    def __init__(self, step, schema):
+        keys = {step.get("group_by"), step.get("order_by")}
+        self.numeric = [col for col, dtype in schema.items() if dtype in ("int64", "float64") and col not in keys]
+        self.text = [col for col, dtype in schema.items() if dtype == "str" and col not in keys]
+        super().__init__(step, schema)
+
+    def prepare(self, scan):
+        method = self.step["method"]
+        extract = lambda chunk: _matrix(chunk, self.numeric)  # noqa: E731
+        if method in ("median",):
+            self.values = _exact_quantiles(scan, extract, [0.5], len(self.numeric))[0]
+        elif method in ("mean", "group_mean"):
+            self.values = _moments(scan, extract, len(self.numeric))["mean"]
+
+        if method == "group_mean":
+            sums, counts = [], []
+
+            def aggregate(chunk):
+                frame = pd.DataFrame(extract(chunk), columns=range(len(self.numeric)))
+                frame["_key"] = chunk[self.step["group_by"]].to_numpy()
+                grouped = frame.groupby("_key", dropna=True, sort=False)
+                sums.append(grouped.sum())
+                counts.append(grouped.count())
+
+            scan(aggregate)
+            if sums:
+                total = pd.concat(sums).groupby(level=0).sum()
+                count = pd.concat(counts).groupby(level=0).sum()
+                self.group_values = total / count.where(count > 0)
+            else:
+                self.group_values = pd.DataFrame(columns=range(len(self.numeric)), dtype=float)
+
+    def reset(self):
+        super().reset()
+        self.last = np.full(len(self.numeric), np.nan)
+
+    def apply(self, chunk):
+        for col in self.text:
+            missing = int(chunk[col].isnull().sum())
+            if missing:
+                chunk[col] = chunk[col].fillna(MISSING_LABEL)
+                self.cells_filled += missing
+
+        values = _matrix(chunk, self.numeric)
+        missing = np.isnan(values)
+        if not missing.any():
+            self._remember(values)
+            return chunk
+
+        method = self.step["method"]
+        if method == "forward_fill":
+            # Propagation dans le bloc, puis dernière valeur du bloc précédent pour la tête
+            values = pd.DataFrame(values).ffill().to_numpy()
+            values = np.where(np.isnan(values), self.last, values)
+        else:
+            if method == "group_mean":
+                by_group = self.group_values.reindex(chunk[self.step["group_by"]].to_numpy())
+                values = np.where(missing, by_group.to_numpy(dtype=float), values)
+            values = np.where(np.isnan(values), self.values, values)
+        self._remember(values)
+
+        for j in np.flatnonzero(missing.any(axis=0)):
+            col = self.numeric[j]
+            chunk[col] = values[:, j]
+            self.cells_filled += int(missing[:, j].sum() - np.isnan(values[:, j]).sum())
+        return chunk
+
+    def _remember(self, values):
+        """Dernière valeur présente de chaque colonne (forward fill d'un bloc à l'autre)"""
+        if self.step["method"] == "forward_fill" and len(values):
+            last = pd.DataFrame(values).ffill().to_numpy()[-1]
+            self.last = np.where(np.isnan(last), self.last, last)
+
+
+class _Outliers(_Stage):
+    """Valeurs aberrantes: bornes calculées sur tout le fichier, puis masque ou plafonnement par bloc"""
+
+    def prepare(self, scan):
+        columns = self.step["columns"]
+        method, threshold = self.step["method"], self.step["threshold"]
+        extract = lambda chunk: _matrix(chunk, columns)  # noqa: E731
+
+        # Quantiles exacts même si l'étape était en quantiles approchés (le rejeu n'est pas interactif)
+        if method == "iqr":
+            q1, q3 = _exact_quantiles(scan, extract, [0.25, 0.75], len(columns))
+            stats = {"q1": q1, "q3": q3}
+        elif method == "percentile":
+            low, high = _exact_quantiles(scan, extract, list(threshold), len(columns))
+            stats = {"low": low, "high": high}
+        elif method == "zscore":
+            stats = _moments(scan, extract, len(columns))
+        else:
+            median = _exact_quantiles(scan, extract, [0.5], len(columns))[0]
+            deviation = lambda chunk: np.abs(extract(chunk) - median)  # noqa: E731
+            stats = {
+                "median": median,
+                "mad": _exact_quantiles(scan, deviation, [0.5], len(columns))[0],
+                "mean_ad": _moments(scan, deviation, len(columns))["mean"],
+            }
+        self.lower, self.upper = bounds_from_stats(method, threshold, stats)
+
+    def apply(self, chunk):
+        columns = self.step["columns"]
+        below, above = outlier_flags(_matrix(chunk, columns), self.lower, self.upper)
+        flagged = below | above
+
+        if self.step["op"] == "drop_outliers":
+            keep = ~flagged.any(axis=1)
+            self.rows_removed += int(len(chunk) - keep.sum())
+            return chunk[keep]
+
+        for j in np.flatnonzero(flagged.any(axis=0)):
+            col = columns[j]
+            chunk[col] = clip_series(chunk[col], self.lower[j], self.upper[j])
+            self.cells_clipped += int(flagged[:, j].sum())
+        return chunk
+
+
+_STAGES = {
+    "drop_duplicates": _DropDuplicates,
+    "fill_missing": _FillMissing,
+    "drop_outliers": _Outliers,
+    "clip_outliers": _Outliers,
+}
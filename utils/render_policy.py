@@ -0,0 +1,52 @@
+"""
+Politique de rendu des graphiques selon leur volume
+- traces scatter/line en WebGL (scattergl) au-delà d'un nombre de points,
+  seuils mesurés par benchmarks/bench_webgl.py (voir config.py)
+- barres agrégées par catégorie côté serveur (une barre par catégorie)
+"""
+import numpy as np
+import pandas as pd
+from config import WEBGL_THRESHOLD, WEBGL_LINE_THRESHOLD, BAR_AGGREGATION_THRESHOLD, BAR_MAX_CATEGORIES
+
+
+def render_mode(n_points: int, kind: str = "scatter") -> str:
+    """Mode de rendu Plotly Express ("webgl" ou "svg") d'une trace "scatter" ou "line" de `n_points` points"""
+    threshold = WEBGL_LINE_THRESHOLD if kind == "line" else WEBGL_THRESHOLD
+    return "webgl" if n_points > threshold else "svg"
+
+
+def aggregate_bars(df: pd.DataFrame, x: str, y: str, max_categories: int = BAR_MAX_CATEGORIES,
+                   threshold: int = BAR_AGGREGATION_THRESHOLD):
+    """
+    Barres y par catégorie de x, sommées côté serveur
+
+    px.bar empile une barre par ligne: la somme par catégorie donne la même
+    hauteur totale avec une seule barre. Seules les `max_categories` catégories
+    de plus grand total (en valeur absolue) sont gardées.
+
+    Returns:
+        (DataFrame à tracer, info) avec info None si rien n'a été agrégé
+        (peu de lignes ou y non numérique)
+    """
+    if len(df) <= threshold or x == y or not pd.api.types.is_numeric_dtype(df[y]) \
+            or pd.api.types.is_bool_dtype(df[y]):
+        return df, None
+
+    totals = df.groupby(x, sort=False, observed=True)[y].sum()
+    n_categories = len(totals)
+    if n_categories > max_categories:
+        keep = np.argsort(-np.abs(totals.to_numpy(dtype=float, na_value=0.0)), kind="stable")[:max_categories]
+        totals = totals.iloc[np.sort(keep)]
+    if pd.api.types.is_numeric_dtype(totals.index) or pd.api.types.is_datetime64_any_dtype(totals.index):
+        totals = totals.sort_index()
+
+    info = {"shown": len(totals), "categories": n_categories, "rows": len(df)}
+    return totals.reset_index(), info
+
+
+def bar_caption(info: dict, y: str) -> str:
+    """Légende indiquant que les barres sont agrégées"""
+    caption = f"Barres agrégées: somme de {y} par catégorie ({info['rows']:,} lignes)"
+    if info["shown"] < info["categories"]:
+        caption += f", {info['shown']} catégories de plus grand total sur {info['categories']:,}"
+    return caption
@@ -7,6 +7,8 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from io import StringIO, BytesIO
+from utils.profiler import get_profile
+from utils.correlation import correlation_matrix
 
 
 class ReportGenerator:
@@ -23,25 +25,35 @@ class ReportGenerator:
         self.df = df
         self.filename = filename
         self.timestamp = datetime.now()
+        self._profile = None
+
+    @property
+    def profile(self):
+        """Profil statistique du DataFrame, calculé une seule fois"""
+        if self._profile is None:
+            self._profile = get_profile(self.df)
+        return self._profile
     
     def get_summary_stats(self):
         """Récupère les statistiques résumées"""
+        missing_total = self.profile.missing_total
         return {
             'lignes': len(self.df),
             'colonnes': len(self.df.columns),
             'types': self.df.dtypes.value_counts().to_dict(),
-            'missing_total': int(self.df.isnull().sum().sum()),
-            'missing_pct': (self.df.isnull().sum().sum() / (len(self.df) * len(self.df.columns))) * 100,
-            'doublons': int(self.df.duplicated().sum()),
-            'completness_pct': 100 - (self.df.isnull().sum().sum() / (len(self.df) * len(self.df.columns))) * 100
+            'missing_total': missing_total,
+            'missing_pct': (missing_total / (len(self.df) * len(self.df.columns))) * 100,
+            'doublons': self.profile.duplicates,
+            'completness_pct': 100 - (missing_total / (len(self.df) * len(self.df.columns))) * 100
         }
     
     def get_missing_analysis(self):
         """Analyse détaillée des valeurs manquantes par colonne"""
         missing_info = []
+        missing = self.profile.missing
         
         for col in self.df.columns:
-            nan_count = int(self.df[col].isnull().sum())
+            nan_count = int(missing[col])
             nan_pct = (nan_count / len(self.df)) * 100
             
             missing_info.append({
@@ -61,17 +73,19 @@ class ReportGenerator:
         
         stats = []
         for col in numeric_df.columns:
-            col_data = numeric_df[col]
+            if col not in self.profile.numeric.index:
+                continue
+            col_stats = self.profile.numeric.loc[col]
             
             stats.append({
                 'Colonne': col,
-                'Min': f"{col_data.min():.2f}",
-                'Max': f"{col_data.max():.2f}",
-                'Moyenne': f"{col_data.mean():.2f}",
-                'Médiane': f"{col_data.median():.2f}",
-                'Écart-type': f"{col_data.std():.2f}",
-                'Q1': f"{col_data.quantile(0.25):.2f}",
-                'Q3': f"{col_data.quantile(0.75):.2f}"
+                'Min': f"{col_stats['min']:.2f}",
+                'Max': f"{col_stats['max']:.2f}",
+                'Moyenne': f"{col_stats['mean']:.2f}",
+                'Médiane': f"{col_stats['median']:.2f}",
+                'Écart-type': f"{col_stats['std']:.2f}",
+                'Q1': f"{col_stats['q25']:.2f}",
+                'Q3': f"{col_stats['q75']:.2f}"
             })
         
         return pd.DataFrame(stats)
@@ -553,7 +567,7 @@ class ReportGenerator:
             if numeric_df.shape[1] >= 2:
                 elements.append(PageBreak())
                 elements.append(Paragraph("5. Matrice de Corrélations (numériques)", heading_style))
-                corr = numeric_df.corr().round(3)
+                corr = correlation_matrix(self.df, columns=numeric_df.columns).round(3)
                 # Build table header
                 corr_data = [ [""] + corr.columns.tolist() ]
                 for idx in corr.index:
@@ -0,0 +1,168 @@
+"""
+Sketches probabilistes fusionnables (calcul par blocs, mémoire bornée)
+- QuantileSketch: quantiles approchés (compacteurs de type KLL)
+- HyperLogLog: nombre approché de valeurs distinctes
+"""
+import math
+import numpy as np
+import pandas as pd
+from config import QUANTILE_SKETCH_EPSILON, HLL_PRECISION
+
+
+class QuantileSketch:
+    """
+    Sketch de quantiles fusionnable à erreur de rang bornée
+
+    Chaque niveau h contient des valeurs de poids 2^h. Quand un niveau
+    dépasse sa capacité, il est trié et une valeur sur deux (décalage
+    aléatoire) monte au niveau suivant. L'erreur de rang est d'environ
+    `epsilon * n`; la mémoire est en O(log(n) / epsilon).
+    """
+
+    def __init__(self, epsilon: float = QUANTILE_SKETCH_EPSILON, seed: int = None):
+        """
+        Args:
+            epsilon: erreur de rang relative visée (0.01 = ±1% des rangs)
+            seed: graine des décalages aléatoires
+        """
+        self.epsilon = epsilon
+        self.capacity = max(16, int(math.ceil(4.0 / epsilon)))
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values) -> "QuantileSketch":
+        """Ajouter un lot de valeurs (NaN ignorés)"""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fusionner un autre sketch (ex: calculé sur un autre bloc)"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        """Compacter chaque niveau qui dépasse sa capacité"""
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.capacity:
+                level = np.sort(level)
+                # Nombre pair d'éléments compactés; le reste éventuel reste au niveau h
+                n_compact = len(level) - (len(level) % 2)
+                offset = self._rng.integers(2)
+                promoted = level[offset:n_compact:2]
+                self.levels[h] = level[n_compact:]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def quantile(self, q):
+        """Quantile(s) approché(s); q scalaire ou liste dans [0, 1]"""
+        scalar = np.isscalar(q)
+        qs = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.count == 0:
+            result = np.full(len(qs), np.nan)
+            return result[0] if scalar else result
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, cumulative = values[order], np.cumsum(weights[order])
+
+        # Rang cible (convention linéaire de pandas), borné par les extrêmes exacts
+        ranks = qs * (cumulative[-1] - 1)
+        idx = np.clip(np.searchsorted(cumulative, ranks, side="right"), 0, len(values) - 1)
+        result = values[idx]
+        result = np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+        return result[0] if scalar else result
+
+    @property
+    def size(self) -> int:
+        """Nombre de valeurs conservées"""
+        return sum(len(level) for level in self.levels)
+
+
+class HyperLogLog:
+    """
+    Comptage approché des valeurs distinctes, fusionnable
+
+    Chaque valeur est hachée sur 64 bits: les `precision` premiers bits
+    choisissent un registre, qui garde le rang maximal du premier bit à 1
+    des bits restants. Mémoire fixe de 2^precision octets; erreur type
+    d'environ 1.04 / sqrt(2^precision).
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        # Les bits restants (64 - precision) doivent tenir dans la mantisse d'un float64
+        if not 11 <= precision <= 18:
+            raise ValueError("La précision HyperLogLog doit être comprise entre 11 et 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values) -> "HyperLogLog":
+        """Ajouter une Series ou un tableau de valeurs (NaN ignorés)"""
+        series = pd.Series(values) if not isinstance(values, pd.Series) else values
+        series = series.dropna()
+        if series.empty:
+            return self
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            # 1 et 1.0 doivent tomber dans le même registre d'un bloc à l'autre
+            series = series.astype(float)
+        # categorize=False: pas de factorisation préalable (pas de table des valeurs distinctes)
+        hashes = pd.util.hash_pandas_object(series, index=False, categorize=False).to_numpy()
+        self._add_hashes(hashes)
+        return self
+
+    def update_hashes(self, hashes: np.ndarray) -> "HyperLogLog":
+        """Ajouter des empreintes 64 bits déjà calculées (ex: empreintes de lignes)"""
+        self._add_hashes(np.asarray(hashes, dtype=np.uint64))
+        return self
+
+    def _add_hashes(self, hashes: np.ndarray):
+        """Mettre à jour les registres avec des empreintes 64 bits"""
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << suffix_bits) - 1)
+        # frexp donne le nombre de bits significatifs (exact: rest < 2^53)
+        bit_length = np.frexp(rest.astype(float))[1]
+        rank = (suffix_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fusionner un autre sketch de même précision"""
+        if other.precision != self.precision:
+            raise ValueError("Précisions HyperLogLog différentes")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        """Estimation du nombre de valeurs distinctes"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Petites cardinalités: comptage linéaire des registres vides
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
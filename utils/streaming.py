@@ -0,0 +1,384 @@
+"""
+Ingestion en flux des gros fichiers
+Lecture par blocs: seuls un échantillon et des agrégats restent en mémoire.
+Seul le suivi exact des doublons grandit avec le fichier (8 octets par ligne
+unique); il est borné à STREAM_EXACT_DUPLICATE_ROWS lignes, au-delà desquelles
+les doublons sont estimés par HyperLogLog
+"""
+from itertools import islice
+import numpy as np
+import pandas as pd
+from config import CHUNK_SIZE, SAMPLE_SIZE, MAX_TRACKED_CATEGORIES, STREAM_EXACT_DUPLICATE_ROWS
+from utils.duplicates import row_hashes
+from utils.sketches import QuantileSketch, HyperLogLog
+
+
+NON_NUMERIC_REMARK = (
+    "Remarque: Cette colonne contient des valeurs non numériques (ex: 'Laptop'), "
+    "impossible de convertir toutes les valeurs en nombre. Veuillez nettoyer les valeurs "
+    "ou forcer la conversion avant d'obtenir des statistiques numériques."
+)
+
+
+def iter_chunks(file_path: str, chunksize: int = CHUNK_SIZE, sheet_name=None,
+                start_row: int = 0, end_row: int = None, dtype=None):
+    """
+    Itérer sur un fichier CSV ou Excel par blocs de `chunksize` lignes
+
+    Args:
+        sheet_name: feuille Excel à lire (par défaut la feuille active)
+        start_row: première ligne de données lue (0 = juste après l'en-tête)
+        end_row: ligne de fin, exclue (None = jusqu'au bout)
+        dtype: types imposés (dict colonne -> type), identiques d'un bloc à l'autre
+    """
+    file_path = str(file_path)
+    nrows = None if end_row is None else max(end_row - start_row, 0)
+
+    if file_path.endswith(('.csv', '.CSV')):
+        if nrows == 0:
+            yield pd.read_csv(file_path, nrows=0, dtype=dtype)
+            return
+        yield from pd.read_csv(
+            file_path,
+            chunksize=chunksize,
+            skiprows=range(1, start_row + 1) if start_row else None,
+            nrows=nrows,
+            dtype=dtype
+        )
+    elif file_path.endswith('.xlsx'):
+        chunks = iter_excel_chunks(file_path, chunksize, sheet_name, start_row, end_row)
+        yield from (chunks if dtype is None else (chunk.astype(dtype) for chunk in chunks))
+    elif file_path.endswith('.xls'):
+        # Ancien format binaire: pas de lecture en flux possible avec openpyxl
+        df = pd.read_excel(file_path, sheet_name=sheet_name or 0,
+                           skiprows=range(1, start_row + 1) if start_row else None, nrows=nrows,
+                           dtype=dtype)
+        for start in range(0, max(len(df), 1), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        raise ValueError("Format de fichier non supporté pour la lecture par blocs")
+
+
+def list_excel_sheets(file_path: str) -> list:
+    """Noms des feuilles d'un classeur Excel"""
+    if str(file_path).endswith('.xls'):
+        return pd.ExcelFile(file_path).sheet_names
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def iter_excel_chunks(file_path: str, chunksize: int = CHUNK_SIZE, sheet_name=None,
+                      start_row: int = 0, end_row: int = None):
+    """Lecture en flux d'un .xlsx (openpyxl en mode read_only, ligne par ligne)"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = _excel_header(next(rows, ()))
+
+        # Lignes Excel numérotées à partir de 1, l'en-tête occupe la ligne 1
+        rows = sheet.iter_rows(
+            min_row=start_row + 2,
+            max_row=None if end_row is None else end_row + 1,
+            values_only=True
+        )
+
+        emitted = False
+        while True:
+            block = list(islice(rows, chunksize))
+            if not block:
+                break
+            # Lignes entièrement vides ignorées; lignes recalées sur la largeur de l'en-tête
+            block = [
+                (tuple(row) + (None,) * len(header))[:len(header)]
+                for row in block if any(value is not None for value in row)
+            ]
+            if block:
+                yield pd.DataFrame.from_records(block, columns=header)
+                emitted = True
+
+        if not emitted:
+            yield pd.DataFrame(columns=header)
+    finally:
+        workbook.close()
+
+
+def _excel_header(cells) -> list:
+    """Noms de colonnes à la manière de pandas (Unnamed: i, doublons suffixés)"""
+    header, seen = [], {}
+    for i, cell in enumerate(cells):
+        name = f"Unnamed: {i}" if cell is None else str(cell)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+def merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Fusionner deux (effectif, moyenne, M2) - algorithme parallèle de Chan"""
+    n = n_a + n_b
+    if n == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+    return n, mean, m2
+
+
+class StreamingDataset:
+    """Jeu de données lu par blocs, résumé par un échantillon et des agrégats"""
+
+    def __init__(self, file_path, chunksize=CHUNK_SIZE, sample_size=SAMPLE_SIZE,
+                 track_duplicates=True, seed=42, sheet_name=None, start_row=0, end_row=None,
+                 exact_duplicate_rows=STREAM_EXACT_DUPLICATE_ROWS):
+        """
+        Initialise le lecteur en flux
+
+        Args:
+            file_path: chemin du fichier source
+            chunksize: nombre de lignes par bloc
+            sample_size: taille de l'échantillon uniforme conservé
+            track_duplicates: suivre les doublons
+            seed: graine de l'échantillonnage
+            sheet_name, start_row, end_row: feuille et plage de lignes (voir iter_chunks)
+            exact_duplicate_rows: lignes uniques suivies exactement (8 octets chacune);
+                au-delà, doublons estimés par HyperLogLog (mémoire fixe)
+        """
+        self.file_path = str(file_path)
+        self.chunksize = chunksize
+        self.sample_size = sample_size
+        self.track_duplicates = track_duplicates
+        self.exact_duplicate_rows = exact_duplicate_rows
+        self.read_options = {"sheet_name": sheet_name, "start_row": start_row, "end_row": end_row}
+        self._rng = np.random.default_rng(seed)
+
+        self.rows = 0
+        self.columns = []
+        self.memory_bytes = 0
+        self.null_counts = {}
+        self.numeric = {}
+        self.sketches = {}
+        self.distinct = {}
+        self.categories = {}
+        self.truncated = set()
+        self.remarks = {}
+        self._row_hashes = np.empty(0, dtype=np.uint64)
+        self._pending_hashes = []
+        self._row_hll = None
+        self._sample = None
+        self._sample_keys = np.empty(0)
+
+    def ingest(self):
+        """Lire tout le fichier bloc par bloc et construire les agrégats"""
+        for chunk in iter_chunks(self.file_path, self.chunksize, **self.read_options):
+            self._update(chunk)
+        return self
+
+    def _update(self, chunk: pd.DataFrame):
+        """Mettre à jour les agrégats et l'échantillon avec un bloc"""
+        if not self.columns:
+            self.columns = chunk.columns.tolist()
+
+        self.memory_bytes += int(chunk.memory_usage(deep=True).sum())
+
+        for col in self.columns:
+            series = chunk[col]
+            self.null_counts[col] = self.null_counts.get(col, 0) + int(series.isnull().sum())
+            self.distinct.setdefault(col, HyperLogLog()).update(series)
+
+            if col not in self.categories and pd.api.types.is_numeric_dtype(series):
+                self._update_numeric(col, series)
+            else:
+                if col in self.numeric:
+                    # Valeurs non numériques apparues après coup
+                    self.sketches.pop(col, None)
+                    if self.numeric.pop(col)["count"] > 0:
+                        self.remarks[col] = NON_NUMERIC_REMARK
+                self._update_categories(col, series)
+
+        if self.track_duplicates:
+            self._add_row_hashes(row_hashes(chunk, self.columns))
+
+        self._update_sample(chunk)
+        self.rows += len(chunk)
+
+    def _add_row_hashes(self, hashes):
+        """Empiler les empreintes de lignes; compactage amorti par np.unique"""
+        if self._row_hll is not None:
+            self._row_hll.update_hashes(hashes)
+            return
+        self._pending_hashes.append(np.unique(hashes))
+        pending = sum(len(h) for h in self._pending_hashes)
+        if pending >= max(len(self._row_hashes), self.chunksize) \
+                or len(self._row_hashes) + pending > self.exact_duplicate_rows:
+            self._compact_row_hashes()
+        if len(self._row_hashes) > self.exact_duplicate_rows:
+            # Suivi exact trop coûteux: bascule vers un comptage approché en mémoire fixe
+            self._row_hll = HyperLogLog().update_hashes(self._row_hashes)
+            self._row_hashes = np.empty(0, dtype=np.uint64)
+
+    @property
+    def duplicates_approximate(self) -> bool:
+        """Doublons estimés (HyperLogLog) plutôt que comptés exactement"""
+        return self._row_hll is not None
+
+    def _compact_row_hashes(self):
+        """Fusionner les empreintes en attente dans l'ensemble trié"""
+        if self._pending_hashes:
+            self._row_hashes = np.unique(np.concatenate([self._row_hashes] + self._pending_hashes))
+            self._pending_hashes = []
+
+    def _update_numeric(self, col, series):
+        """Agrégats exacts (effectif, moyenne, M2, min, max) et sketch de quantiles"""
+        values = series.dropna().to_numpy(dtype=float)
+        agg = self.numeric.setdefault(
+            col, {"count": 0, "mean": 0.0, "m2": 0.0, "min": np.inf, "max": -np.inf}
+        )
+        if len(values) == 0:
+            return
+
+        chunk_mean = values.mean()
+        chunk_m2 = ((values - chunk_mean) ** 2).sum()
+        agg["count"], agg["mean"], agg["m2"] = merge_moments(
+            agg["count"], agg["mean"], agg["m2"], len(values), chunk_mean, chunk_m2
+        )
+        agg["min"] = min(agg["min"], series.min())
+        agg["max"] = max(agg["max"], series.max())
+        self.sketches.setdefault(col, QuantileSketch(seed=0)).update(values)
+
+    def _update_categories(self, col, series):
+        """Comptage des modalités, borné à MAX_TRACKED_CATEGORIES"""
+        counts = series.value_counts()
+        if col in self.categories:
+            counts = self.categories[col].add(counts, fill_value=0)
+        if len(counts) > MAX_TRACKED_CATEGORIES:
+            counts = counts.nlargest(MAX_TRACKED_CATEGORIES)
+            self.truncated.add(col)
+        self.categories[col] = counts
+
+    def _update_sample(self, chunk):
+        """Échantillon uniforme sans remise (clés aléatoires, k plus petites)"""
+        keys = self._rng.random(len(chunk))
+        chunk = chunk.set_axis(pd.RangeIndex(self.rows, self.rows + len(chunk)))
+
+        if self._sample is None:
+            pool, pool_keys = chunk, keys
+        else:
+            pool = pd.concat([self._sample, chunk])
+            pool_keys = np.concatenate([self._sample_keys, keys])
+
+        if len(pool) > self.sample_size:
+            keep = np.argpartition(pool_keys, self.sample_size)[:self.sample_size]
+            pool, pool_keys = pool.iloc[keep], pool_keys[keep]
+
+        self._sample, self._sample_keys = pool, pool_keys
+
+    @property
+    def sample(self) -> pd.DataFrame:
+        """Échantillon conservé, dans l'ordre d'origine des lignes"""
+        if self._sample is None:
+            return pd.DataFrame(columns=self.columns)
+        return self._sample.sort_index()
+
+    def quartiles(self, col) -> dict:
+        """Q1, médiane et Q3 approchés d'une colonne numérique (sketch fusionné)"""
+        q25, median, q75 = self.sketches[col].quantile([0.25, 0.5, 0.75])
+        return {"q25": q25, "median": median, "q75": q75}
+
+    def distinct_counts(self) -> dict:
+        """
+        Valeurs uniques par colonne -> (nombre, estimé ?)
+
+        Exact pour une colonne qualitative dont toutes les modalités sont
+        suivies; sinon estimé par le HyperLogLog fusionné sur tous les blocs.
+        """
+        counts = {}
+        for col in self.columns:
+            if col in self.categories and col not in self.truncated:
+                counts[col] = (len(self.categories[col]), False)
+            else:
+                counts[col] = (self.distinct[col].count(), True)
+        return counts
+
+    def get_summary(self) -> dict:
+        """Résumé au même format que get_data_summary"""
+        self._compact_row_hashes()
+        if not self.track_duplicates:
+            duplicates = None
+        elif self._row_hll is not None:
+            duplicates = max(self.rows - self._row_hll.count(), 0)
+        else:
+            duplicates = self.rows - len(self._row_hashes)
+        return {
+            "rows": self.rows,
+            "columns": len(self.columns),
+            "duplicates": duplicates,
+            "duplicates_approximate": self.duplicates_approximate,
+            "missing_values": dict(self.null_counts),
+            "memory_usage": self.memory_bytes / 1024**2  # En MB
+        }
+
+    def get_column_stats(self) -> dict:
+        """
+        Statistiques au même format que get_column_stats
+
+        Min, max, moyenne et écart-type sont exacts; la médiane provient
+        du sketch de quantiles alimenté par tous les blocs.
+        """
+        stats = {}
+
+        for col in self.columns:
+            if col in self.numeric:
+                agg = self.numeric[col]
+                has_values = agg["count"] > 0
+                stats[col] = {
+                    "type": "Quantitative",
+                    "min": agg["min"] if has_values else None,
+                    "max": agg["max"] if has_values else None,
+                    "mean": agg["mean"] if has_values else None,
+                    "median": self.quartiles(col)["median"] if has_values else None,
+                    "std": np.sqrt(agg["m2"] / (agg["count"] - 1)) if agg["count"] > 1 else None,
+                    "null_count": self.null_counts[col],
+                    "remark": None
+                }
+            elif col in self.remarks:
+                stats[col] = {
+                    "type": "Quantitative",
+                    "min": None,
+                    "max": None,
+                    "mean": None,
+                    "median": None,
+                    "std": None,
+                    "null_count": self.null_counts[col],
+                    "remark": self.remarks[col]
+                }
+            else:
+                counts = self.categories.get(col, pd.Series(dtype=float))
+                stats[col] = {
+                    "type": "Qualitative",
+                    "unique_values": len(counts),
+                    "most_common": counts.idxmax() if not counts.empty else None,
+                    "null_count": self.null_counts[col]
+                }
+                if col in self.truncated:
+                    stats[col]["unique_values"] = self.distinct[col].count()
+                    stats[col]["remark"] = (
+                        f"Plus de {MAX_TRACKED_CATEGORIES} valeurs distinctes: nombre estimé (HyperLogLog)"
+                    )
+
+        return stats
+
+    def load_full(self) -> pd.DataFrame:
+        """Charger le fichier complet en mémoire (à la demande de l'utilisateur)"""
+        return pd.concat(iter_chunks(self.file_path, self.chunksize, **self.read_options),
+                         ignore_index=True)